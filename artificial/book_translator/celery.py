@@ -1,5 +1,10 @@
 import os
 from celery import Celery
+from celery.signals import (
+    before_task_publish, task_prerun, worker_init, worker_process_init, worker_process_shutdown, worker_ready
+)
+
+from core import cpu_resources, metrics
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'book_translator.settings')
@@ -16,6 +21,30 @@ app.config_from_object('django.conf:settings', namespace='CELERY')
 # Load task modules from all registered Django apps.
 app.autodiscover_tasks()
 
+# Prometheus metrics: queue wait of every task, and an exporter in the main
+# worker process aggregating the samples of the prefork children
+before_task_publish.connect(metrics.stamp_published_at)
+task_prerun.connect(metrics.observe_queue_wait)
+
+@worker_init.connect
+def clear_worker_metrics(**kwargs):
+    metrics.clear_multiproc_dir()
+
+@worker_ready.connect
+def start_worker_metrics(**kwargs):
+    from django.conf import settings
+    metrics.start_worker_exporter(settings.WORKER_METRICS_PORT)
+
+# Torch threads (and cores with WORKER_CPU_PINNING) of each pool child, so the
+# children together use the container's CPU quota instead of all the host cores each
+@worker_process_init.connect
+def allocate_worker_cpus(**kwargs):
+    cpu_resources.configure_worker_process()
+
+@worker_process_shutdown.connect
+def release_worker_metrics(pid=None, **kwargs):
+    metrics.mark_process_dead(pid)
+
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
     print(f'Request: {self.request!r}')
\ No newline at end of file
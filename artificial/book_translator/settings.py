@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -24,9 +25,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-lm98b%$ffk+(#z6+a-fbw4@h1vlp@d14@0+9jorh#$y%u&ur6k'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# (DEBUG=0 in the ASGI production profile, which also keeps connection.queries from growing)
+DEBUG = os.environ.get('DEBUG', '1') == '1'
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.environ.get('DJANGO_ALLOWED_HOSTS', '').split(',') if host]
 
 
 # Application definition
@@ -90,6 +92,42 @@ DATABASES = {
     }
 }
 
+# A local SQLite file instead of PostgreSQL, for benchmarks and development
+# without a database server (full-text search of translations needs PostgreSQL)
+if os.environ.get('SQLITE_PATH'):
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ['SQLITE_PATH'],
+        }
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Redis in production, in-process locmem when running tests (or when requested explicitly)
+
+if 'test' in sys.argv or os.environ.get('DJANGO_CACHE_BACKEND') == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('CACHE_URL', 'redis://localhost:6379/1'),
+        }
+    }
+
+# Lifetime of cached responses for completed translations (seconds)
+TRANSLATION_CACHE_TIMEOUT = int(os.environ.get('TRANSLATION_CACHE_TIMEOUT', 24 * 60 * 60))
+
+# Compaction of completed translations out of the chunk table
+TRANSLATION_COMPACTION_ENABLED = os.environ.get('TRANSLATION_COMPACTION_ENABLED', '1') == '1'
+TRANSLATION_COMPACTION_BLOCK_CHARS = int(os.environ.get('TRANSLATION_COMPACTION_BLOCK_CHARS', 64 * 1024))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -140,7 +178,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_TRACK_STARTED = True
 CELERY_TASK_TIME_LIMIT = 30 * 60  # 30 minutes time limit
-CELERY_WORKER_CONCURRENCY = 16    # Number of worker processes
+CELERY_WORKER_CONCURRENCY = int(os.environ.get('CELERY_WORKER_CONCURRENCY', 16))    # Number of worker processes
 CELERY_WORKER_AUTOSCALE = (4, 16) # Min 4 workers, Max 16 workers
 # CELERY_WORKER_MAX_MEMORY_PER_CHILD = 200000  # 200MB per worker
 CELERY_WORKER_MAX_TASKS_PER_CHILD = 100  # 100 tasks per worker
@@ -152,6 +190,151 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 
+# Task priorities on Redis (0 = served first, 9 = last); prefetch one task at a
+# time so workers pick up newly queued high-priority chunks immediately
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': list(range(10)),
+    'sep': ':',
+    'queue_order_strategy': 'priority',
+}
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Chunk scheduling: 'in_order' prioritizes the lowest chunk indexes of every
+# translation so readers can start early, 'unordered' treats all chunks alike
+TRANSLATION_SCHEDULING_MODE = os.environ.get('TRANSLATION_SCHEDULING_MODE', 'in_order')
+# Number of chunks that make up the first readable page (time-to-first-page metric)
+TRANSLATION_FIRST_PAGE_CHUNKS = int(os.environ.get('TRANSLATION_FIRST_PAGE_CHUNKS', 20))
+
+# Language pairs whose chunk tasks go to a dedicated queue "translate.<src>-<tgt>"
+# (e.g. "en-fr,en-de"), so workers started with -Q translate.en-fr keep that model
+# warm. Other pairs use the default queue.
+TRANSLATION_PAIR_QUEUES = [pair.strip() for pair in os.environ.get('TRANSLATION_PAIR_QUEUES', '').split(',') if pair.strip()]
+
+# Strip lines repeated at the same position (top/bottom) on at least
+# BOOK_BOILERPLATE_MIN_PAGES pages and BOOK_BOILERPLATE_MIN_RATIO of all pages
+# of a PDF (running headers, footers, page numbers) before segmentation
+BOOK_BOILERPLATE_REMOVAL_ENABLED = os.environ.get('BOOK_BOILERPLATE_REMOVAL_ENABLED', '1') == '1'
+BOOK_BOILERPLATE_MIN_PAGES = int(os.environ.get('BOOK_BOILERPLATE_MIN_PAGES', 3))
+BOOK_BOILERPLATE_MIN_RATIO = float(os.environ.get('BOOK_BOILERPLATE_MIN_RATIO', 0.2))
+
+# Books added by URL are downloaded through a pooled session. Each network wait
+# is bounded by the connect/read timeouts and the whole transfer by
+# BOOK_DOWNLOAD_MAX_SECONDS; interrupted downloads are retried with an HTTP Range
+# request that resumes where the previous attempt stopped.
+BOOK_DOWNLOAD_CONNECT_TIMEOUT = float(os.environ.get('BOOK_DOWNLOAD_CONNECT_TIMEOUT', 5))
+BOOK_DOWNLOAD_READ_TIMEOUT = float(os.environ.get('BOOK_DOWNLOAD_READ_TIMEOUT', 30))
+BOOK_DOWNLOAD_MAX_SECONDS = int(os.environ.get('BOOK_DOWNLOAD_MAX_SECONDS', 300))
+BOOK_DOWNLOAD_MAX_RETRIES = int(os.environ.get('BOOK_DOWNLOAD_MAX_RETRIES', 3))
+BOOK_DOWNLOAD_POOL_SIZE = int(os.environ.get('BOOK_DOWNLOAD_POOL_SIZE', 10))
+
+# Resumable uploads (/api/books/uploads): the file is sent in byte ranges of up
+# to UPLOAD_MAX_RANGE_SIZE, written to disk as it arrives, and may be larger than
+# the 50MB of single-request uploads. Unfinished sessions expire after
+# UPLOAD_SESSION_TTL seconds (see the cleanup_uploads command).
+UPLOAD_MAX_SIZE = int(os.environ.get('UPLOAD_MAX_SIZE', 1024 * 1024 * 1024))  # 1GB
+UPLOAD_MAX_RANGE_SIZE = int(os.environ.get('UPLOAD_MAX_RANGE_SIZE', 16 * 1024 * 1024))
+UPLOAD_SESSION_TTL = int(os.environ.get('UPLOAD_SESSION_TTL', 24 * 60 * 60))
+
+# Bulk ingestion (/api/books/bulk and the ingest_books command): at most
+# BULK_INGEST_MAX_ITEMS books per job; downloads and extractions run
+# BULK_INGEST_CONCURRENCY at a time in one pipeline task
+BULK_INGEST_MAX_ITEMS = int(os.environ.get('BULK_INGEST_MAX_ITEMS', 10000))
+BULK_INGEST_CONCURRENCY = int(os.environ.get('BULK_INGEST_CONCURRENCY', 8))
+BULK_INGEST_TIME_LIMIT = int(os.environ.get('BULK_INGEST_TIME_LIMIT', 6 * 60 * 60))  # Seconds
+
+# Pass page numbers, URLs, code, number tables, chapter markers and text already
+# in the target language through without running the model
+TRANSLATION_SKIP_CLASSIFIER_ENABLED = os.environ.get('TRANSLATION_SKIP_CLASSIFIER_ENABLED', '1') == '1'
+
+# Hugging Face revision of the MarianMT models. Part of Translation.model_version,
+# so completed translations are only reused for duplicate books with the same model.
+TRANSLATION_MODEL_REVISION = os.environ.get('TRANSLATION_MODEL_REVISION', 'main')
+TRANSLATION_MODEL_CACHE_SIZE = int(os.environ.get('TRANSLATION_MODEL_CACHE_SIZE', 4))  # Models kept loaded per process (LRU)
+# Model behind translate_text: "marian" (the Helsinki-NLP models), "tiny" (a small
+# randomly initialised Marian model, only the tokenizer is downloaded) or "fake"
+# (a deterministic stand-in that sleeps for the configured latency). The last two
+# are for benchmarks and development without the model weights.
+TRANSLATION_BACKEND = os.environ.get('TRANSLATION_BACKEND', 'marian')
+FAKE_TRANSLATOR_LATENCY_MS = float(os.environ.get('FAKE_TRANSLATOR_LATENCY_MS', 20))  # Per call
+FAKE_TRANSLATOR_MS_PER_TOKEN = float(os.environ.get('FAKE_TRANSLATOR_MS_PER_TOKEN', 0))
+# Per language pair inference configuration saved by `manage.py sweep_inference --save`
+# (beams and precision used by default, recommended batch size, threads and max length).
+# Kept with the model cache, which the web and worker containers share.
+INFERENCE_CONFIG_PATH = os.environ.get('INFERENCE_CONFIG_PATH', os.path.join(BASE_DIR, 'ml_models', 'inference_config.json'))
+
+# CPU allocation of the worker's pool children (core.cpu_resources). Each child
+# sets its torch threads to its share of the CPU budget (the cgroup quota, e.g.
+# the docker-compose cpus limit), or to a fixed count; 0 keeps torch's default
+# of one thread per host core. WORKER_PROCESSES must match the worker's
+# concurrency when it is started with -c. Pinning binds each child to its own cores.
+WORKER_PROCESSES = int(os.environ.get('WORKER_PROCESSES', CELERY_WORKER_CONCURRENCY))
+WORKER_TORCH_THREADS = os.environ.get('WORKER_TORCH_THREADS', 'auto')  # 'auto' or threads per child
+WORKER_TORCH_INTEROP_THREADS = int(os.environ.get('WORKER_TORCH_INTEROP_THREADS', 1))
+WORKER_CPU_PINNING = os.environ.get('WORKER_CPU_PINNING', '0') == '1'
+
+# Admission control of new translation jobs. A job's token cost is estimated
+# from the extracted text (or the file size before extraction) and compared with
+# the pending eager work and the measured worker throughput.
+ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', '1') == '1'
+ADMISSION_MAX_PENDING_TOKENS = int(os.environ.get('ADMISSION_MAX_PENDING_TOKENS', 5_000_000))  # Reject (429) beyond this backlog
+ADMISSION_MAX_WAIT_SECONDS = int(os.environ.get('ADMISSION_MAX_WAIT_SECONDS', 6 * 60 * 60))  # Reject when the backlog takes longer
+ADMISSION_QUEUE_WAIT_SECONDS = int(os.environ.get('ADMISSION_QUEUE_WAIT_SECONDS', 5 * 60))  # Answer 202 with an ETA beyond this wait
+ADMISSION_MAX_RETRY_AFTER = 60 * 60
+ADMISSION_WORKER_SLOTS = int(os.environ.get('ADMISSION_WORKER_SLOTS', CELERY_WORKER_CONCURRENCY))  # Chunk tasks running in parallel across workers
+ADMISSION_DEFAULT_TOKENS_PER_SECOND = float(os.environ.get('ADMISSION_DEFAULT_TOKENS_PER_SECOND', 50))  # Per slot, until measured
+ADMISSION_DEFAULT_CHARS_PER_TOKEN = 4.0
+ADMISSION_DEFAULT_BOOK_CHARS = 500_000  # Used for books that are not downloaded yet
+ADMISSION_EWMA_ALPHA = 0.05  # Weight of each new chunk measurement
+ADMISSION_PENDING_CACHE_SECONDS = 5
+ESTIMATE_DEFAULT_OUTPUT_RATIO = 1.1  # Output/input tokens of a pair until measured
+
+# Lazy (translate-on-read) mode
+LAZY_TRANSLATION_PREFETCH_PAGES = int(os.environ.get('LAZY_TRANSLATION_PREFETCH_PAGES', 2))  # Pages queued ahead of the reader
+LAZY_TRANSLATION_PREFETCH_CHUNKS = int(os.environ.get('LAZY_TRANSLATION_PREFETCH_CHUNKS', 20))  # Chunks queued after a single-chunk read
+LAZY_TRANSLATION_WAIT_SECONDS = 10  # How long a read waits for its chunks before returning what is ready
+LAZY_TRANSLATION_DISPATCH_TTL = 10 * 60  # Window in which a queued chunk is not queued again
+
+# Synchronous snippet translation (POST /api/translations/snippet)
+SNIPPET_MAX_CHARS = int(os.environ.get('SNIPPET_MAX_CHARS', 1000))  # Hard cap on the input size
+SNIPPET_MAX_LENGTH = 256  # Upper bound on generated tokens
+SNIPPET_BATCH_WINDOW_MS = int(os.environ.get('SNIPPET_BATCH_WINDOW_MS', 10))  # Micro-batching window
+SNIPPET_BATCH_MAX_SIZE = int(os.environ.get('SNIPPET_BATCH_MAX_SIZE', 16))
+SNIPPET_TIMEOUT_SECONDS = 30
+# Language pairs loaded when the web process starts, e.g. "en-es,en-fr"
+SNIPPET_WARM_PAIRS = os.environ.get('SNIPPET_WARM_PAIRS', '').split(',')
+
+# Translation progress events (Redis pub/sub + Server-Sent Events)
+TRANSLATION_EVENTS_ENABLED = os.environ.get('TRANSLATION_EVENTS_ENABLED', '1') == '1'
+TRANSLATION_EVENTS_REDIS_URL = os.environ.get('TRANSLATION_EVENTS_REDIS_URL', CELERY_BROKER_URL)
+TRANSLATION_EVENTS_HEARTBEAT_SECONDS = 15
+TRANSLATION_EVENTS_MAX_STREAM_SECONDS = 5 * 60  # Clients reconnect with Last-Event-ID afterwards
+TRANSLATION_EVENTS_RETRY_MS = 3000
+TRANSLATION_EVENTS_HISTORY = 500  # Events kept per translation for reconnect replay
+TRANSLATION_EVENTS_TTL_SECONDS = 24 * 60 * 60
+
+# Prometheus metrics. The web process serves them on /metrics; the main Celery
+# worker process serves those of all its pool children on this port (0 disables).
+# Set PROMETHEUS_MULTIPROC_DIR in the environment of multi-process services.
+WORKER_METRICS_PORT = int(os.environ.get('WORKER_METRICS_PORT', 9808))
+
+# Per-translation traces (GET /api/translations/{id}/trace, export_trace command).
+# Stage aggregates are always stored; individual chunk spans for one chunk in N.
+TRACING_ENABLED = os.environ.get('TRACING_ENABLED', '1') == '1'
+TRACE_CHUNK_SAMPLE_EVERY = int(os.environ.get('TRACE_CHUNK_SAMPLE_EVERY', 50))
+
+# Opt-in task profiling (core/profiling.py); reports go to MEDIA_ROOT/profiles.
+# Translations created with "profile": true are always profiled, other runs of
+# the listed tasks with probability TASK_PROFILING_RATE (e.g. 0.01).
+TASK_PROFILING_RATE = float(os.environ.get('TASK_PROFILING_RATE', 0))
+TASK_PROFILING_TASKS = os.environ.get(
+    'TASK_PROFILING_TASKS', 'prepare_translation,translate_chunk,create_complete_translation_file'
+).split(',')
+TASK_PROFILER = os.environ.get('TASK_PROFILER', 'sampling')  # sampling (collapsed stacks) or cprofile
+TASK_PROFILING_SAMPLE_INTERVAL = float(os.environ.get('TASK_PROFILING_SAMPLE_INTERVAL', 0.005))  # Seconds between stack samples
+TASK_PROFILING_TRACEMALLOC = os.environ.get('TASK_PROFILING_TRACEMALLOC', '1') == '1'
+TASK_PROFILING_TRACEMALLOC_FRAMES = 10
+TASK_PROFILING_TOP_ALLOCATIONS = 25
+
 
 # Ensure log directory exists
 os.makedirs(os.path.join(BASE_DIR, 'logs'), exist_ok=True)
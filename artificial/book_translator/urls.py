@@ -9,23 +9,33 @@ from django.views.generic import RedirectView
 from ninja import NinjaAPI
 
 from books.api import books_api
+from books.async_api import books_async_api
 from translations.api import translations_api
+from translations.async_api import translations_async_api
+from core.metrics import metrics_view
+from core.renderers import ORJSONRenderer
 
 # Create a combined API router
 api = NinjaAPI(
     title="Book Translation Service",
     version="1.0.0",
     description="Complete API for translating books with ML-based chunk processing",
+    renderer=ORJSONRenderer(),
 )
 
 # Add the sub-routers
 api.add_router("/books", books_api)
 api.add_router("/translations", translations_api)
+# Async variants of the read endpoints, for ASGI deployments
+api.add_router("/async/books", books_async_api)
+api.add_router("/async/translations", translations_async_api)
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     # API endpoints
     path('api/', api.urls),
+    # Prometheus scrape endpoint
+    path('metrics', metrics_view, name='metrics'),
     # Redirect root to API docs
     path('', RedirectView.as_view(url='/api/docs', permanent=False), name='home'),
 ]
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'book_translator.settings')
 
 application = get_wsgi_application()
+
+# Load the snippet translation models configured in SNIPPET_WARM_PAIRS
+from core.snippets import warm_up_snippet_models  # noqa: E402
+
+warm_up_snippet_models()
@@ -1,9 +1,30 @@
 from django.contrib import admin
-from .models import Book
+from .models import Book, IngestJob, SourceSegment, UploadSession
 
 @admin.register(Book)
 class BookAdmin(admin.ModelAdmin):
     list_display = ('title', 'author', 'source_language', 'target_language', 'file_format', 'created_at')
     list_filter = ('source_language', 'target_language', 'file_format', 'created_at')
     search_fields = ('title', 'author')
-    readonly_fields = ('created_at',)
\ No newline at end of file
+    readonly_fields = ('created_at',)
+
+@admin.register(SourceSegment)
+class SourceSegmentAdmin(admin.ModelAdmin):
+    list_display = ('id', 'book', 'chunk_size', 'segment_index')
+    list_filter = ('chunk_size',)
+    search_fields = ('book__title', 'text')
+    raw_id_fields = ('book',)
+
+@admin.register(UploadSession)
+class UploadSessionAdmin(admin.ModelAdmin):
+    list_display = ('id', 'title', 'file_format', 'received_size', 'total_size', 'book', 'expires_at')
+    list_filter = ('file_format',)
+    search_fields = ('title',)
+    readonly_fields = ('created_at', 'updated_at')
+    raw_id_fields = ('book',)
+
+@admin.register(IngestJob)
+class IngestJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'source', 'status', 'total_items', 'extract', 'created_at', 'finished_at')
+    list_filter = ('status', 'source')
+    readonly_fields = ('created_at', 'finished_at')
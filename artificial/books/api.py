@@ -1,22 +1,42 @@
 from ninja import Router, File, UploadedFile
 from typing import List
-from django.http import HttpRequest
-from django.shortcuts import get_object_or_404
+from uuid import UUID
 from django.conf import settings
-import os
-import uuid
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from pathlib import Path
+from pydantic import ValidationError
+import re
+import zipfile
 
-from .models import Book
+from .ingest import (
+    candidates_from_manifest, candidates_from_zip, collect_candidates, create_ingest_job, read_manifest,
+    save_ingest_archive, serialize_ingest_job
+)
+from .models import Book, IngestJob, UploadSession
 from .schemas import (
     BookBase, BookCreateFromURL, BookOut, 
-    BookList, ErrorResponse, FileFormatEnum
+    BookList, BookEstimateOut, BoilerplateReportOut, ErrorResponse, FileFormatEnum,
+    UploadSessionCreate, UploadSessionOut, UploadFinalize, UploadFinalizeOut,
+    IngestJobOut, LanguageEnum
 )
-from .tasks import download_book_from_url
+from .serializers import BOOK_VALUE_FIELDS, serialize_book, serialize_book_row
+from .storage import store_blob
+from .tasks import download_book_from_url, run_ingest_pipeline
+from .uploads import create_session, finalize_session, write_range
+from core.languages import get_supported_languages
+from translations.api import create_multi_translation
+from translations.estimation import estimate_translation
+from translations.schemas import MultiTranslationCreate
+from core.renderers import orjson_response
 
 # Create the API router for the books app
 books_api = Router(tags=["Books"])
 
+# "Content-Range: bytes <first>-<last>/<total>" of an upload range
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
 @books_api.post("/from-url", response={201: BookOut, 400: ErrorResponse})
 def create_book_from_url(request: HttpRequest, book_data: BookCreateFromURL):
     """Create a new book for translation from a URL"""
@@ -34,16 +54,7 @@ def create_book_from_url(request: HttpRequest, book_data: BookCreateFromURL):
         # Queue a background task to download the book
         download_book_from_url.delay(book.id)
         
-        return 201, BookOut(
-            id=book.id,
-            title=book.title,
-            author=book.author,
-            source_language=book.source_language,
-            target_language=book.target_language,
-            created_at=book.created_at,
-            url=book.url,
-            file_format=book.file_format
-        )
+        return 201, serialize_book(book)
     except Exception as e:
         return 400, ErrorResponse(detail=str(e))
 
@@ -68,17 +79,8 @@ def create_book_from_file(
         if extension not in valid_extensions:
             return 400, ErrorResponse(detail=f"Unsupported file format. Supported formats: {', '.join(valid_extensions)}")
         
-        # Save the uploaded file
-        file_name = f"{uuid.uuid4()}_{file.name}"
-        file_path = os.path.join(settings.MEDIA_ROOT, 'books', file_name)
-        
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        # Save the file
-        with open(file_path, 'wb') as dest:
-            for chunk in file.chunks():
-                dest.write(chunk)
+        # Save the uploaded file, hashing it on the way; duplicates share the stored blob
+        file_name, content_hash, _ = store_blob(file.chunks(), extension)
         
         # Create the book record
         book = Book.objects.create(
@@ -86,57 +88,242 @@ def create_book_from_file(
             author=author or "",
             source_language=source_language,
             target_language=target_language,
-            file=f"books/{file_name}",
-            file_format=extension
+            file=file_name,
+            file_format=extension,
+            content_hash=content_hash
         )
         
-        return 201, BookOut(
-            id=book.id,
-            title=book.title,
-            author=book.author,
-            source_language=book.source_language,
-            target_language=book.target_language,
-            created_at=book.created_at,
-            file=book.file.url if book.file else None,
-            file_format=book.file_format
+        return 201, serialize_book(book)
+    except Exception as e:
+        return 400, ErrorResponse(detail=str(e))
+
+@books_api.post("/bulk", response={202: IngestJobOut, 400: ErrorResponse})
+def bulk_ingest_books(
+    request: HttpRequest,
+    source_language: LanguageEnum = LanguageEnum.ENGLISH,
+    target_language: LanguageEnum = LanguageEnum.SPANISH,
+    extract: bool = False,
+    chunk_size: int = 1,
+    archive: UploadedFile = File(None),
+    manifest: UploadedFile = File(None)
+):
+    """
+    Create many books at once from a ZIP archive and/or a JSON manifest
+    
+    The archive's book files (or the entries of its manifest.json) are stored
+    one at a time by a background pipeline, or the manifest lists {"title",
+    "url" or "file", ...} entries. Books are created with bulk inserts; URL
+    downloads (and the extraction of every book with extract=true) run in the
+    pipeline with bounded concurrency. GET /bulk/{job_id} reports the status of each item.
+    """
+    if archive is None and manifest is None:
+        return 400, ErrorResponse(detail="Upload a ZIP archive, a JSON manifest, or both")
+    
+    defaults = {'source_language': source_language.value, 'target_language': target_language.value}
+    try:
+        if archive is not None:
+            # Entries of an uploaded manifest refer to files of the archive
+            entries = read_manifest(manifest.read()) if manifest is not None else None
+            candidates = collect_candidates(candidates_from_zip(zipfile.ZipFile(archive.file), defaults, entries))
+            # Only the archive is saved here; the pipeline stores its files
+            job = create_ingest_job(candidates, source='zip', extract=extract, chunk_size=chunk_size,
+                                    archive=save_ingest_archive(archive.chunks()))
+        else:
+            candidates = candidates_from_manifest(read_manifest(manifest.read()), defaults)
+            job = create_ingest_job(candidates, source='manifest', extract=extract, chunk_size=chunk_size)
+    except (zipfile.BadZipFile, ValueError) as e:
+        return 400, ErrorResponse(detail=str(e))
+    
+    run_ingest_pipeline.delay(job.id)
+    return 202, serialize_ingest_job(job)
+
+@books_api.get("/bulk/{job_id}", response={200: IngestJobOut, 404: ErrorResponse})
+def get_ingest_job(request: HttpRequest, job_id: int):
+    """Get the per-item report of a bulk ingestion"""
+    job = IngestJob.objects.filter(id=job_id).first()
+    if job is None:
+        return 404, ErrorResponse(detail=f"Ingest job {job_id} not found")
+    return orjson_response(serialize_ingest_job(job))
+
+def serialize_upload_session(session: UploadSession) -> dict:
+    return {
+        'id': session.id,
+        'title': session.title,
+        'file_format': session.file_format,
+        'total_size': session.total_size,
+        'received_size': session.received_size,
+        'expires_at': session.expires_at,
+        'book_id': session.book_id,
+    }
+
+def _set_upload_range(response: HttpResponse, received_size: int):
+    """Tell the client which bytes are stored, so it resumes after them"""
+    if received_size:
+        response['Range'] = f"bytes=0-{received_size - 1}"
+
+@books_api.post("/uploads", response={201: UploadSessionOut, 400: ErrorResponse, 413: ErrorResponse})
+def create_upload_session(request: HttpRequest, data: UploadSessionCreate):
+    """
+    Start a resumable upload of a book file
+    
+    The file is then sent with PUT /uploads/{id} in byte ranges (Content-Range
+    header) and turned into a book with POST /uploads/{id}/finalize.
+    """
+    if data.total_size <= 0:
+        return 400, ErrorResponse(detail="total_size must be positive")
+    if data.total_size > settings.UPLOAD_MAX_SIZE:
+        return 413, ErrorResponse(detail=f"File size must be no more than {settings.UPLOAD_MAX_SIZE // (1024 * 1024)}MB")
+    
+    session = create_session(
+        title=data.title,
+        author=data.author,
+        source_language=data.source_language.value,
+        target_language=data.target_language.value,
+        file_format=data.file_format.value,
+        total_size=data.total_size
+    )
+    return 201, serialize_upload_session(session)
+
+@books_api.get("/uploads/{upload_id}", response={200: UploadSessionOut, 404: ErrorResponse})
+def get_upload_session(request: HttpRequest, response: HttpResponse, upload_id: UUID):
+    """Get the progress of an upload, to find where to resume it"""
+    session = UploadSession.objects.filter(id=upload_id).first()
+    if session is None:
+        return 404, ErrorResponse(detail=f"Upload {upload_id} not found")
+    _set_upload_range(response, session.received_size)
+    return 200, serialize_upload_session(session)
+
+@books_api.put("/uploads/{upload_id}", response={
+    200: UploadSessionOut, 400: ErrorResponse, 404: ErrorResponse,
+    409: ErrorResponse, 410: ErrorResponse, 413: ErrorResponse
+})
+def upload_range(request: HttpRequest, response: HttpResponse, upload_id: UUID):
+    """
+    Upload a byte range of the file, given by the Content-Range header
+    
+    Ranges must start at or before the received size; the body is streamed to
+    disk, and whatever arrived before a dropped connection is kept.
+    """
+    session = UploadSession.objects.filter(id=upload_id).first()
+    if session is None:
+        return 404, ErrorResponse(detail=f"Upload {upload_id} not found")
+    if session.book_id:
+        return 410, ErrorResponse(detail=f"Upload {upload_id} is already finalized")
+    if session.expires_at < timezone.now():
+        return 410, ErrorResponse(detail=f"Upload {upload_id} has expired")
+    
+    match = CONTENT_RANGE_RE.match(request.headers.get('Content-Range', ''))
+    if not match:
+        return 400, ErrorResponse(detail="A Content-Range header 'bytes <first>-<last>/<total>' is required")
+    first, last, total = (int(value) for value in match.groups())
+    if total != session.total_size or last < first or last >= total:
+        return 400, ErrorResponse(detail=f"Invalid range {first}-{last}/{total} for a file of {session.total_size} bytes")
+    
+    length = last - first + 1
+    if length > settings.UPLOAD_MAX_RANGE_SIZE:
+        return 413, ErrorResponse(detail=f"Ranges must be no more than {settings.UPLOAD_MAX_RANGE_SIZE} bytes")
+    content_length = request.headers.get('Content-Length')
+    if content_length is not None and (not content_length.isdigit() or int(content_length) != length):
+        return 400, ErrorResponse(detail=f"Content-Length {content_length} does not match the range length {length}")
+    if first > session.received_size:
+        _set_upload_range(response, session.received_size)
+        return 409, ErrorResponse(detail=f"Range starts after the received data; resume at byte {session.received_size}")
+    
+    session.received_size = write_range(session, first, request, length)
+    _set_upload_range(response, session.received_size)
+    return 200, serialize_upload_session(session)
+
+@books_api.post("/uploads/{upload_id}/finalize", response={
+    201: UploadFinalizeOut, 400: ErrorResponse, 404: ErrorResponse, 409: ErrorResponse
+})
+def finalize_upload(request: HttpRequest, response: HttpResponse, upload_id: UUID, data: UploadFinalize):
+    """
+    Create the book of a complete upload, and optionally its translations
+    
+    With translate=true the translations are requested as with POST
+    /api/translations/multi; admission control may queue or refuse them, in
+    which case the book is still created and the refusal is reported.
+    """
+    session = UploadSession.objects.filter(id=upload_id).first()
+    if session is None:
+        return 404, ErrorResponse(detail=f"Upload {upload_id} not found")
+    if session.received_size < session.total_size:
+        _set_upload_range(response, session.received_size)
+        return 409, ErrorResponse(
+            detail=f"Upload is incomplete: {session.received_size} of {session.total_size} bytes received"
         )
+    
+    try:
+        book = finalize_session(session.id)
     except Exception as e:
         return 400, ErrorResponse(detail=str(e))
+    
+    result = {'book': serialize_book(book)}
+    if data.translate:
+        # The book exists from here on; a translation request that cannot be made is reported, not raised
+        try:
+            translation_data = MultiTranslationCreate(
+                book_id=book.id,
+                target_languages=data.target_languages or [book.target_language],
+                max_length=data.max_length,
+                chunk_size=data.chunk_size,
+                mode=data.mode
+            )
+        except ValidationError as e:
+            result['translation_status'] = 400
+            result['translation_error'] = str(e)
+            return 201, result
+        status, payload = create_multi_translation(request, response, translation_data)
+        result['translation_status'] = status
+        if status in (201, 202):
+            result['translations'] = payload
+        else:
+            result['translation_error'] = payload.detail
+    return 201, result
 
 @books_api.get("", response=List[BookOut])
 def list_books(request: HttpRequest):
     """List all books in the system"""
-    books = Book.objects.all()
-    return [
-        BookOut(
-            id=book.id,
-            title=book.title,
-            author=book.author,
-            source_language=book.source_language,
-            target_language=book.target_language,
-            created_at=book.created_at,
-            url=book.url,
-            file=book.file.url if book.file else None,
-            file_format=book.file_format
-        )
-        for book in books
-    ]
+    rows = Book.objects.values(*BOOK_VALUE_FIELDS)
+    return orjson_response([serialize_book_row(row) for row in rows])
 
 @books_api.get("/{book_id}", response={200: BookOut, 404: ErrorResponse})
 def get_book(request: HttpRequest, book_id: int):
     """Get details of a specific book"""
+    row = Book.objects.filter(id=book_id).values(*BOOK_VALUE_FIELDS).first()
+    if row is None:
+        return 404, ErrorResponse(detail=f"Book with ID {book_id} not found")
+    return orjson_response(serialize_book_row(row))
+
+@books_api.get("/{book_id}/boilerplate", response={200: BoilerplateReportOut, 404: ErrorResponse})
+def get_book_boilerplate_report(request: HttpRequest, book_id: int):
+    """Get the running headers, footers and page numbers removed when the book was extracted"""
+    row = Book.objects.filter(id=book_id).values('boilerplate_report').first()
+    if row is None:
+        return 404, ErrorResponse(detail=f"Book with ID {book_id} not found")
+    if row['boilerplate_report'] is None:
+        return 404, ErrorResponse(detail=f"Book {book_id} has not been extracted yet or its format has no pages")
+    return orjson_response(row['boilerplate_report'])
+
+@books_api.get("/{book_id}/estimate", response={200: BookEstimateOut, 400: ErrorResponse, 404: ErrorResponse})
+def estimate_book_translation(request: HttpRequest, book_id: int, target: str, chunk_size: int = 1, max_length: int = 400):
+    """
+    Estimate the cost and ETA of translating a book into a target language
+    
+    The book is extracted and segmented on the first call (the segments are
+    reused by the translation itself) and tokenized with the pair's tokenizer.
+    """
+    book = Book.objects.filter(id=book_id).first()
+    if book is None:
+        return 404, ErrorResponse(detail=f"Book with ID {book_id} not found")
+    if target not in get_supported_languages():
+        return 400, ErrorResponse(detail=f"Unsupported language: {target}")
+    if target == book.source_language:
+        return 400, ErrorResponse(detail=f"Target language {target} is the book's source language")
+    if not book.file:
+        return 400, ErrorResponse(detail=f"Book {book_id} has no file yet")
+    
     try:
-        book = get_object_or_404(Book, id=book_id)
-        return 200, BookOut(
-            id=book.id,
-            title=book.title,
-            author=book.author,
-            source_language=book.source_language,
-            target_language=book.target_language,
-            created_at=book.created_at,
-            url=book.url,
-            file=book.file.url if book.file else None,
-            file_format=book.file_format
-        )
-    except Book.DoesNotExist:
-        return 404, ErrorResponse(detail=f"Book with ID {book_id} not found")
\ No newline at end of file
+        return orjson_response(estimate_translation(book, target, chunk_size=chunk_size, max_length=max_length))
+    except Exception as e:
+        return 400, ErrorResponse(detail=str(e))
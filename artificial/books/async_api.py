@@ -0,0 +1,25 @@
+from ninja import Router
+from typing import List
+from django.http import HttpRequest
+
+from .models import Book
+from .schemas import BookOut, ErrorResponse
+from .serializers import BOOK_VALUE_FIELDS, serialize_book_row
+from core.renderers import orjson_response
+
+# Async variants of the read endpoints of the books router, mounted under /api/async/books
+books_async_api = Router(tags=["Books (async)"])
+
+@books_async_api.get("", response=List[BookOut])
+async def list_books(request: HttpRequest):
+    """List all books in the system"""
+    rows = Book.objects.values(*BOOK_VALUE_FIELDS)
+    return orjson_response([serialize_book_row(row) async for row in rows])
+
+@books_async_api.get("/{book_id}", response={200: BookOut, 404: ErrorResponse})
+async def get_book(request: HttpRequest, book_id: int):
+    """Get details of a specific book"""
+    row = await Book.objects.filter(id=book_id).values(*BOOK_VALUE_FIELDS).afirst()
+    if row is None:
+        return 404, ErrorResponse(detail=f"Book with ID {book_id} not found")
+    return orjson_response(serialize_book_row(row))
@@ -0,0 +1,392 @@
+import itertools
+import json
+import logging
+import os
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .models import Book, IngestJob, MAX_BOOK_FILE_SIZE
+from .schemas import FileFormatEnum, LanguageEnum
+from .segmentation import get_or_create_segments
+from .storage import download_backoff, download_path, store_blob, store_download
+from core.downloader import DownloadError, discard_partial
+
+logger = logging.getLogger(__name__)
+
+# Item statuses of the report
+PENDING = "pending"        # File in the uploaded archive, stored by the pipeline
+STORED = "stored"          # File stored, book created
+QUEUED = "queued"          # Book created, file to be downloaded
+DOWNLOADED = "downloaded"
+SEGMENTED = "segmented"    # Extracted and split, ready to translate
+FAILED = "failed"
+REJECTED = "rejected"      # Invalid entry, no book created
+
+FORMATS = [file_format.value for file_format in FileFormatEnum]
+LANGUAGES = [language.value for language in LanguageEnum]
+
+# Seconds between saves of the report while the pipeline runs
+REPORT_SAVE_INTERVAL = 2.0
+
+# Uploaded archives wait here until the pipeline has stored their files
+INGEST_DIR = os.path.join('books', 'ingest')
+
+
+def read_manifest(data) -> List[Dict]:
+    """Parse a JSON manifest: a list of entries, or {"books": [...]}"""
+    manifest = json.loads(data)
+    if isinstance(manifest, dict):
+        manifest = manifest.get('books')
+    if not isinstance(manifest, list):
+        raise ValueError("The manifest must be a JSON list of books or an object with a 'books' list")
+    return manifest
+
+
+def _entry_format(entry: Dict, name: str) -> Optional[str]:
+    file_format = entry.get('file_format')
+    if file_format:
+        return file_format
+    extension = os.path.splitext(name)[1].lstrip('.').lower()
+    return extension if extension in FORMATS else None
+
+
+def _candidate(entry: Dict, defaults: Dict, name: str, opener: Optional[Callable] = None,
+               size: Optional[int] = None) -> Dict:
+    """
+    Turn a manifest entry or an archive/directory file into a candidate book:
+    its fields, where its content comes from, and the error that rejects it
+    """
+    candidate = {
+        'name': name,
+        'title': entry.get('title') or os.path.splitext(os.path.basename(name))[0],
+        'author': entry.get('author') or "",
+        'source_language': entry.get('source_language') or defaults['source_language'],
+        'target_language': entry.get('target_language') or defaults['target_language'],
+        'url': entry.get('url'),
+        'file_format': _entry_format(entry, name if opener else ''),
+        'opener': opener,
+        'error': None,
+    }
+    if candidate['source_language'] not in LANGUAGES or candidate['target_language'] not in LANGUAGES:
+        candidate['error'] = f"Unsupported language: {candidate['source_language']} -> {candidate['target_language']}"
+    elif candidate['file_format'] is not None and candidate['file_format'] not in FORMATS:
+        candidate['error'] = f"Unsupported file format: {candidate['file_format']}"
+    elif opener is None and not candidate['url']:
+        candidate['error'] = "Entry has neither a url nor a file"
+    elif opener is None and not str(candidate['url']).startswith(('http://', 'https://')):
+        candidate['error'] = f"Unsupported URL: {candidate['url']}"
+    elif opener is not None and candidate['file_format'] is None:
+        candidate['error'] = f"Unsupported file format. Supported formats: {', '.join(FORMATS)}"
+    elif size is not None and size > MAX_BOOK_FILE_SIZE:
+        candidate['error'] = f"File size must be no more than {MAX_BOOK_FILE_SIZE // (1024 * 1024)}MB"
+    return candidate
+
+
+def _is_book_file(name: str) -> bool:
+    base = os.path.basename(name)
+    return (
+        not base.startswith('.')
+        and '__MACOSX' not in name.split('/')
+        and os.path.splitext(base)[1].lstrip('.').lower() in FORMATS
+    )
+
+
+def candidates_from_manifest(entries: List[Dict], defaults: Dict,
+                             open_file: Optional[Callable[[str], Optional[tuple]]] = None) -> Iterator[Dict]:
+    """
+    Candidates of manifest entries. Entries with a "file" are resolved with
+    open_file(name) -> (opener, size), or None when the file does not exist.
+    """
+    for position, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            yield {**_candidate({}, defaults, f"entry {position}"), 'error': "Manifest entries must be objects"}
+            continue
+        name = entry.get('file') or entry.get('url') or f"entry {position}"
+        if entry.get('file'):
+            resolved = open_file(entry['file']) if open_file else None
+            if resolved is None:
+                yield {**_candidate(entry, defaults, name), 'url': None, 'error': f"File not found: {entry['file']}"}
+                continue
+            opener, size = resolved
+            yield _candidate({**entry, 'url': None}, defaults, name, opener, size)
+        else:
+            yield _candidate(entry, defaults, name)
+
+
+def candidates_from_zip(archive: zipfile.ZipFile, defaults: Dict, entries: Optional[List[Dict]] = None) -> Iterator[Dict]:
+    """
+    Candidates of a ZIP archive: the given manifest entries, else its
+    manifest.json if there is one, else every book file in it
+    """
+    members = {info.filename: info for info in archive.infolist() if not info.is_dir()}
+
+    def open_member(name):
+        info = members.get(name)
+        if info is None:
+            return None
+        return (lambda: archive.open(info)), info.file_size
+
+    if entries is None and 'manifest.json' in members:
+        entries = read_manifest(archive.read('manifest.json'))
+    if entries is not None:
+        yield from candidates_from_manifest(entries, defaults, open_member)
+        return
+
+    for name in sorted(members):
+        if _is_book_file(name):
+            opener, size = open_member(name)
+            yield _candidate({}, defaults, name, opener, size)
+
+
+def candidates_from_directory(path: str, defaults: Dict) -> Iterator[Dict]:
+    """Candidates of a local directory: its manifest.json if there is one, else every book file below it"""
+    def open_path(name):
+        file_path = os.path.join(path, name)
+        if not os.path.isfile(file_path):
+            return None
+        return (lambda: open(file_path, 'rb')), os.path.getsize(file_path)
+
+    manifest_path = os.path.join(path, 'manifest.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'rb') as f:
+            entries = read_manifest(f.read())
+        yield from candidates_from_manifest(entries, defaults, open_path)
+        return
+
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for file_name in sorted(files):
+            name = os.path.relpath(os.path.join(root, file_name), path)
+            if _is_book_file(name):
+                opener, size = open_path(name)
+                yield _candidate({}, defaults, name, opener, size)
+
+
+def _file_chunks(opener: Callable) -> Iterator[bytes]:
+    with opener() as f:
+        while True:
+            chunk = f.read(1024 * 1024)
+            if not chunk:
+                return
+            yield chunk
+
+
+def collect_candidates(candidates: Iterable[Dict]) -> List[Dict]:
+    """The candidates as a list, refused before anything is stored when there are too many"""
+    candidates = list(itertools.islice(candidates, settings.BULK_INGEST_MAX_ITEMS + 1))
+    if len(candidates) > settings.BULK_INGEST_MAX_ITEMS:
+        raise ValueError(f"A bulk ingestion may contain at most {settings.BULK_INGEST_MAX_ITEMS} books")
+    return candidates
+
+
+def save_ingest_archive(chunks: Iterable[bytes]) -> str:
+    """Save an uploaded archive for run_ingest_job and return its storage name"""
+    directory = os.path.join(settings.MEDIA_ROOT, INGEST_DIR)
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(dir=directory, suffix='.zip')
+    with os.fdopen(fd, 'wb') as f:
+        for chunk in chunks:
+            f.write(chunk)
+    return os.path.relpath(path, settings.MEDIA_ROOT)
+
+
+def _book_fields(candidate: Dict) -> Dict:
+    return {
+        'title': candidate['title'],
+        'author': candidate['author'],
+        'source_language': candidate['source_language'],
+        'target_language': candidate['target_language'],
+        'file_format': candidate['file_format'],
+    }
+
+
+def _create_books(books: List[tuple]):
+    """bulk_create the books and record their ids in their report items"""
+    Book.objects.bulk_create([book for _, book in books], batch_size=500)
+    for item, book in books:
+        item['book_id'] = book.id
+
+
+def create_ingest_job(candidates: Iterable[Dict], source: str, extract: bool = False, chunk_size: int = 1,
+                      archive: str = "") -> IngestJob:
+    """
+    Store the files of the candidates one at a time into content-addressed
+    storage, create all their books with bulk_create and record the job with
+    its per-item report. Files of an uploaded archive saved as `archive` are
+    left pending for run_ingest_job, as are downloads and extractions.
+    """
+    items = []
+    books = []
+    for index, candidate in enumerate(collect_candidates(candidates)):
+        item = {'index': index, 'name': candidate['name'], 'title': candidate['title'],
+                'book_id': None, 'status': REJECTED, 'error': candidate['error']}
+        items.append(item)
+        if candidate['error']:
+            continue
+
+        if candidate['opener'] and archive:
+            # Book fields until the pipeline stores the file and creates the book
+            item['book'] = _book_fields(candidate)
+            item['status'] = PENDING
+            continue
+
+        book = Book(**_book_fields(candidate))
+        if candidate['opener']:
+            try:
+                file_name, content_hash, _ = store_blob(_file_chunks(candidate['opener']), candidate['file_format'])
+            except Exception as e:
+                item['error'] = str(e)
+                continue
+            book.file = file_name
+            book.content_hash = content_hash
+            item['status'] = STORED
+        else:
+            book.url = candidate['url']
+            item['status'] = QUEUED
+        books.append((item, book))
+
+    _create_books(books)
+
+    job = IngestJob.objects.create(
+        source=source,
+        extract=extract,
+        chunk_size=chunk_size,
+        total_items=len(items),
+        items=items,
+        archive=archive
+    )
+    logger.info(f"Ingest job {job.id}: {len(books)} book(s) created from {len(items)} {source} item(s)")
+    return job
+
+
+def store_archive_items(job: IngestJob):
+    """Store the pending files of the job's uploaded archive one at a time, create their books and drop the archive"""
+    path = os.path.join(settings.MEDIA_ROOT, job.archive)
+    books = []
+    try:
+        with zipfile.ZipFile(path) as archive:
+            for item in job.items:
+                if item['status'] != PENDING:
+                    continue
+                book = Book(**item.pop('book'))
+                try:
+                    file_name, content_hash, _ = store_blob(
+                        _file_chunks(lambda: archive.open(item['name'])), book.file_format
+                    )
+                except Exception as e:
+                    item.update(status=FAILED, error=str(e))
+                    continue
+                book.file = file_name
+                book.content_hash = content_hash
+                item['status'] = STORED
+                books.append((item, book))
+        _create_books(books)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+    job.archive = ""
+    job.save(update_fields=['items', 'archive'])
+    logger.info(f"Ingest job {job.id}: {len(books)} book(s) created from the uploaded archive")
+
+
+def _fetch_book(book_id: int, extract: bool, chunk_size: int) -> Dict:
+    """Download (with resumed retries) and optionally segment one book; runs in a pipeline thread"""
+    status = None
+    try:
+        book = Book.objects.get(id=book_id)
+        if not book.file:
+            for attempt in range(settings.BOOK_DOWNLOAD_MAX_RETRIES + 1):
+                try:
+                    store_download(book)
+                    break
+                except DownloadError as e:
+                    if not e.retryable or attempt == settings.BOOK_DOWNLOAD_MAX_RETRIES:
+                        raise
+                    time.sleep(download_backoff(attempt))
+            status = DOWNLOADED
+        if extract:
+            get_or_create_segments(book, chunk_size)
+            status = SEGMENTED
+        return {'status': status, 'error': None}
+    except Exception as e:
+        logger.error(f"Ingestion of book {book_id} failed: {str(e)}")
+        discard_partial(download_path(book_id))
+        return {'status': FAILED, 'error': str(e)}
+    finally:
+        # Each pipeline thread has its own database connection
+        connection.close()
+
+
+def run_ingest_job(job_id: int, concurrency: Optional[int] = None) -> IngestJob:
+    """
+    Store the files of a job's uploaded archive, then download its queued
+    books (and extract every book when the job asks for it) with at most
+    `concurrency` in flight, saving the report as items finish
+    """
+    concurrency = concurrency or settings.BULK_INGEST_CONCURRENCY
+    job = IngestJob.objects.get(id=job_id)
+    job.status = 'processing'
+    job.save(update_fields=['status'])
+    try:
+        if job.archive:
+            store_archive_items(job)
+
+        work = [
+            item for item in job.items
+            if item['status'] == QUEUED or (job.extract and item['status'] in (STORED, DOWNLOADED))
+        ]
+        last_save = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {
+                executor.submit(_fetch_book, item['book_id'], job.extract, job.chunk_size): item
+                for item in work
+            }
+            for future in as_completed(futures):
+                futures[future].update(future.result())
+                if time.monotonic() - last_save > REPORT_SAVE_INTERVAL:
+                    job.save(update_fields=['items'])
+                    last_save = time.monotonic()
+    except Exception as e:
+        # Otherwise the job would report processing forever to the clients polling it
+        close_old_connections()
+        job.status = 'failed'
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['items', 'status', 'error', 'finished_at'])
+        raise
+
+    close_old_connections()
+    job.status = 'completed'
+    job.finished_at = timezone.now()
+    job.save(update_fields=['items', 'status', 'finished_at'])
+    logger.info(f"Ingest job {job.id} completed: {status_counts(job.items)}")
+    return job
+
+
+def status_counts(items: List[Dict]) -> Dict[str, int]:
+    counts = {}
+    for item in items:
+        counts[item['status']] = counts.get(item['status'], 0) + 1
+    return counts
+
+
+def serialize_ingest_job(job: IngestJob) -> Dict:
+    return {
+        'id': job.id,
+        'status': job.status,
+        'source': job.source,
+        'extract': job.extract,
+        'total_items': job.total_items,
+        'error': job.error or None,
+        'counts': status_counts(job.items),
+        # Without the book fields kept on pending items
+        'items': [{key: value for key, value in item.items() if key != 'book'} for item in job.items],
+        'created_at': job.created_at,
+        'finished_at': job.finished_at,
+    }
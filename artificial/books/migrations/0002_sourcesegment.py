@@ -0,0 +1,28 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SourceSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('chunk_size', models.IntegerField(help_text='Sentences per segment used when splitting the book')),
+                ('segment_index', models.IntegerField(help_text='The index of this segment in the book')),
+                ('text', models.TextField()),
+                ('book', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='books.book')),
+            ],
+            options={
+                'ordering': ['segment_index'],
+                'unique_together': {('book', 'chunk_size', 'segment_index')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 13:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_sourcesegment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='boilerplate_report',
+            field=models.JSONField(blank=True, help_text='Running headers, footers and page numbers removed at extraction time', null=True),
+        ),
+    ]
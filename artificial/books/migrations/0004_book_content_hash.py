@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_book_boilerplate_report'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='book',
+            name='content_hash',
+            field=models.CharField(blank=True, db_index=True, help_text='SHA-256 of the file content; books with the same hash share one stored file', max_length=64),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:00
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0004_book_content_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=255)),
+                ('author', models.CharField(blank=True, max_length=255)),
+                ('source_language', models.CharField(default='en', max_length=50)),
+                ('target_language', models.CharField(max_length=50)),
+                ('file_format', models.CharField(max_length=10)),
+                ('total_size', models.BigIntegerField(help_text='Size of the whole file in bytes')),
+                ('received_size', models.BigIntegerField(default=0, help_text='Bytes received from the start of the file')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('book', models.ForeignKey(blank=True, help_text='The book created when the upload was finalized', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='upload_sessions', to='books.book')),
+            ],
+        ),
+    ]
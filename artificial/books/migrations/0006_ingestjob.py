@@ -0,0 +1,27 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestJob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed')], default='pending', max_length=20)),
+                ('source', models.CharField(help_text='zip, manifest or directory', max_length=20)),
+                ('extract', models.BooleanField(default=False, help_text='Extract and segment the books after storing them')),
+                ('chunk_size', models.IntegerField(default=1)),
+                ('total_items', models.IntegerField(default=0)),
+                ('items', models.JSONField(default=list, help_text='Per-item report: name, title, book_id, status, error')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
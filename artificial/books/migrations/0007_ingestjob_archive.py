@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0006_ingestjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestjob',
+            name='archive',
+            field=models.CharField(blank=True, help_text='Uploaded ZIP archive whose files the pipeline stores', max_length=255),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 23:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0007_ingestjob_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingestjob',
+            name='error',
+            field=models.TextField(blank=True, help_text='Why the pipeline stopped, when failed'),
+        ),
+        migrations.AlterField(
+            model_name='ingestjob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('completed', 'Completed'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
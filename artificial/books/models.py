@@ -1,11 +1,14 @@
+import uuid
 from django.db import models
 from django.core.validators import FileExtensionValidator
 from django.core.exceptions import ValidationError
 
+# 50MB file size limit, for uploads and URL downloads alike
+MAX_BOOK_FILE_SIZE = 50 * 1024 * 1024
+
 def validate_book_file(file):
     """Validate the size of the uploaded book file."""
-    # 50MB file size limit
-    max_size = 50 * 1024 * 1024
+    max_size = MAX_BOOK_FILE_SIZE
     if file.size > max_size:
         raise ValidationError(f'File size must be no more than {max_size/1024/1024}MB')
 
@@ -42,6 +45,17 @@ class Book(models.Model):
             ('md', 'Markdown'),
         ]
     )
+    content_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        db_index=True,
+        help_text="SHA-256 of the file content; books with the same hash share one stored file"
+    )
+    boilerplate_report = models.JSONField(
+        null=True,
+        blank=True,
+        help_text="Running headers, footers and page numbers removed at extraction time"
+    )
     
     def __str__(self):
         return f"{self.title} ({self.source_language} → {self.target_language})"
@@ -62,4 +76,65 @@ class Book(models.Model):
                 self.file_format = 'html'
             elif filename.endswith('.md'):
                 self.file_format = 'md'
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+class SourceSegment(models.Model):
+    """A segment of a book's extracted text, shared by every translation of the book"""
+    book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='segments')
+    chunk_size = models.IntegerField(help_text="Sentences per segment used when splitting the book")
+    segment_index = models.IntegerField(help_text="The index of this segment in the book")
+    text = models.TextField()
+    
+    class Meta:
+        ordering = ['segment_index']
+        unique_together = ['book', 'chunk_size', 'segment_index']
+    
+    def __str__(self):
+        return f"Segment {self.segment_index} of {self.book.title} (chunk size {self.chunk_size})"
+
+class UploadSession(models.Model):
+    """A resumable upload of a book file, received in byte ranges and finalized into a Book"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    title = models.CharField(max_length=255)
+    author = models.CharField(max_length=255, blank=True)
+    source_language = models.CharField(max_length=50, default='en')
+    target_language = models.CharField(max_length=50)
+    file_format = models.CharField(max_length=10)
+    total_size = models.BigIntegerField(help_text="Size of the whole file in bytes")
+    received_size = models.BigIntegerField(default=0, help_text="Bytes received from the start of the file")
+    book = models.ForeignKey(
+        Book,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='upload_sessions',
+        help_text="The book created when the upload was finalized"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+    
+    def __str__(self):
+        return f"Upload {self.id} of {self.title} ({self.received_size}/{self.total_size} bytes)"
+
+class IngestJob(models.Model):
+    """A bulk ingestion of books from a ZIP archive, a manifest or a directory, with a per-item report"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    error = models.TextField(blank=True, help_text="Why the pipeline stopped, when failed")
+    source = models.CharField(max_length=20, help_text="zip, manifest or directory")
+    extract = models.BooleanField(default=False, help_text="Extract and segment the books after storing them")
+    chunk_size = models.IntegerField(default=1)
+    total_items = models.IntegerField(default=0)
+    items = models.JSONField(default=list, help_text="Per-item report: name, title, book_id, status, error")
+    archive = models.CharField(max_length=255, blank=True, help_text="Uploaded ZIP archive whose files the pipeline stores")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"Ingest job {self.id} ({self.source}, {self.total_items} items, {self.status})"
@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field, HttpUrl
-from typing import Optional, List
+from typing import Any, Dict, Literal, Optional, List
+from uuid import UUID
 from datetime import datetime
 from enum import Enum
 
@@ -43,6 +44,79 @@ class BookOut(BookBase):
     url: Optional[HttpUrl] = None
     file: Optional[str] = None
     file_format: Optional[FileFormatEnum] = None
+    content_hash: Optional[str] = None  # SHA-256 of the file, shared by duplicate uploads
+
+class BoilerplateLineOut(BaseModel):
+    position: str  # "top" or "bottom" of the page
+    text: str      # An example of the removed line
+    pattern: str   # The line with digits normalized, as matched across pages
+    count: int     # Number of pages the line was removed from
+
+class BoilerplateReportOut(BaseModel):
+    pages: int
+    removed_lines: int
+    removed_chars: int
+    lines: List[BoilerplateLineOut]
+
+class BookEstimateOut(BaseModel):
+    book_id: int
+    source_language: str
+    target_language: str
+    chunk_size: int
+    segments: int                # Segments of the book
+    segments_to_translate: int   # Segments that need the model
+    source_tokens: int           # Input tokens, counted with the pair's tokenizer
+    expected_output_tokens: int
+    estimated_cpu_seconds: float # Worker time from the pair's measured throughput
+    queue_wait_seconds: float    # Wait behind the pending translation work
+    eta: datetime
+    calibration_samples: int     # Completed chunks the pair's calibration is based on
+
+class UploadSessionCreate(BookBase):
+    file_format: FileFormatEnum
+    total_size: int  # Size of the whole file in bytes
+
+class UploadSessionOut(BaseModel):
+    id: UUID
+    title: str
+    file_format: FileFormatEnum
+    total_size: int
+    received_size: int  # Bytes received so far; the next range starts here
+    expires_at: datetime
+    book_id: Optional[int] = None  # Set once the upload is finalized
+
+class UploadFinalize(BaseModel):
+    translate: bool = False  # Create translations of the new book
+    target_languages: List[str] = []  # Defaults to the book's target language
+    max_length: Optional[int] = 400
+    chunk_size: Optional[int] = 1
+    mode: Literal["eager", "lazy"] = "eager"  # Values of translations.schemas.TranslationMode (that module imports this one)
+
+class UploadFinalizeOut(BaseModel):
+    book: BookOut
+    translations: List[Dict[str, Any]] = []
+    translation_status: Optional[int] = None  # Status code of the translation request, when translate is set
+    translation_error: Optional[str] = None
+
+class IngestItemOut(BaseModel):
+    index: int
+    name: str                      # Archive member, manifest file or URL
+    title: Optional[str] = None
+    book_id: Optional[int] = None
+    status: str                    # pending, stored, queued, downloaded, segmented, failed or rejected
+    error: Optional[str] = None
+
+class IngestJobOut(BaseModel):
+    id: int
+    status: str
+    source: str
+    extract: bool
+    total_items: int
+    error: Optional[str] = None    # Why the pipeline stopped, when failed
+    counts: Dict[str, int]         # Items per status
+    items: List[IngestItemOut]
+    created_at: datetime
+    finished_at: Optional[datetime] = None
 
 class BookList(BaseModel):
     books: List[BookOut]
@@ -0,0 +1,74 @@
+import logging
+from typing import List, Tuple
+from django.db import transaction
+
+from .models import Book, SourceSegment
+from core.extractor import BookExtractor
+from core.metrics import BOOK_EXTRACTED_CHARS, BOOK_EXTRACTION_SECONDS, BOOK_SEGMENTATION_SECONDS, BOOK_SEGMENTS
+from core.text_splitter import split_text_into_chunks
+from core.tracing import trace_stage
+
+logger = logging.getLogger(__name__)
+
+
+def get_or_create_segments(book: Book, chunk_size: int) -> List[Tuple[int, int, str]]:
+    """
+    Return the (segment_id, segment_index, text) rows of a book for a chunk size,
+    extracting and splitting the book only the first time they are needed.
+
+    The book row is locked while segmenting, so translations of the same book
+    prepared concurrently (e.g. one per target language) wait for the first one
+    and then reuse its segments instead of extracting the file again. Segments
+    of another book with the same content hash are copied instead of extracting.
+    """
+    with transaction.atomic():
+        Book.objects.select_for_update().filter(id=book.id).first()
+
+        segments = list(SourceSegment.objects.filter(
+            book_id=book.id,
+            chunk_size=chunk_size
+        ).order_by('segment_index').values_list('id', 'segment_index', 'text'))
+        if segments:
+            logger.info(f"Reusing {len(segments)} segment(s) of book {book.id} (chunk size {chunk_size})")
+            return segments
+
+        if book.content_hash:
+            # A book with the same content may already have been segmented
+            twin_id = SourceSegment.objects.filter(
+                book__content_hash=book.content_hash,
+                chunk_size=chunk_size
+            ).exclude(book_id=book.id).values_list('book_id', flat=True).first()
+            if twin_id is not None:
+                twin_segments = SourceSegment.objects.filter(
+                    book_id=twin_id,
+                    chunk_size=chunk_size
+                ).order_by('segment_index').values_list('segment_index', 'text')
+                created = SourceSegment.objects.bulk_create([
+                    SourceSegment(book_id=book.id, chunk_size=chunk_size, segment_index=index, text=text)
+                    for index, text in twin_segments
+                ], batch_size=1000)
+                twin_report = Book.objects.values_list('boilerplate_report', flat=True).get(id=twin_id)
+                Book.objects.filter(id=book.id).update(boilerplate_report=twin_report)
+                logger.info(f"Copied {len(created)} segment(s) of book {twin_id} to duplicate book {book.id}")
+                return [(segment.id, segment.segment_index, segment.text) for segment in created]
+
+        logger.info(f"Extracting content from book {book.id}")
+        file_format = book.file_format or 'unknown'
+        with BOOK_EXTRACTION_SECONDS.labels(file_format).time(), trace_stage('prepare.extract'):
+            content, boilerplate_report = BookExtractor.extract_with_report(book)
+        BOOK_EXTRACTED_CHARS.labels(file_format).inc(len(content))
+        if boilerplate_report is not None:
+            Book.objects.filter(id=book.id).update(boilerplate_report=boilerplate_report)
+            logger.info(
+                f"Removed {boilerplate_report['removed_lines']} boilerplate line(s) from book {book.id}"
+            )
+        with BOOK_SEGMENTATION_SECONDS.time():
+            texts = split_text_into_chunks(content, chunk_size=chunk_size)
+        BOOK_SEGMENTS.inc(len(texts))
+
+        created = SourceSegment.objects.bulk_create([
+            SourceSegment(book_id=book.id, chunk_size=chunk_size, segment_index=i, text=text)
+            for i, text in enumerate(texts)
+        ], batch_size=1000)
+        logger.info(f"Created {len(created)} segment(s) for book {book.id} (chunk size {chunk_size})")
+        return [(segment.id, segment.segment_index, segment.text) for segment in created]
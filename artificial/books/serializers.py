@@ -0,0 +1,49 @@
+from django.core.files.storage import default_storage
+
+# Columns needed to render a book, for use with QuerySet.values()
+BOOK_VALUE_FIELDS = (
+    'id', 'title', 'author', 'source_language', 'target_language',
+    'created_at', 'url', 'file', 'file_format', 'content_hash'
+)
+
+
+def book_value_fields(prefix: str = '') -> list:
+    """Return the book columns for QuerySet.values(), optionally through a relation prefix"""
+    return [f"{prefix}{field}" for field in BOOK_VALUE_FIELDS]
+
+
+def book_file_url(file_name):
+    """Resolve the public URL of a stored book file name"""
+    return default_storage.url(file_name) if file_name else None
+
+
+def serialize_book_row(row: dict, prefix: str = '') -> dict:
+    """Serialize a QuerySet.values() row into the BookOut shape"""
+    return {
+        'id': row[f'{prefix}id'],
+        'title': row[f'{prefix}title'],
+        'author': row[f'{prefix}author'],
+        'source_language': row[f'{prefix}source_language'],
+        'target_language': row[f'{prefix}target_language'],
+        'created_at': row[f'{prefix}created_at'],
+        'url': row[f'{prefix}url'] or None,
+        'file': book_file_url(row[f'{prefix}file']),
+        'file_format': row[f'{prefix}file_format'] or None,
+        'content_hash': row[f'{prefix}content_hash'] or None,
+    }
+
+
+def serialize_book(book) -> dict:
+    """Serialize a Book instance into the BookOut shape"""
+    return {
+        'id': book.id,
+        'title': book.title,
+        'author': book.author,
+        'source_language': book.source_language,
+        'target_language': book.target_language,
+        'created_at': book.created_at,
+        'url': book.url or None,
+        'file': book_file_url(book.file.name),
+        'file_format': book.file_format or None,
+        'content_hash': book.content_hash or None,
+    }
@@ -0,0 +1,123 @@
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Iterable, Tuple
+from django.conf import settings
+
+from .models import Book, MAX_BOOK_FILE_SIZE
+from core.downloader import discard_partial, download, read_chunks
+
+logger = logging.getLogger(__name__)
+
+# Book files are stored once per content under their SHA-256
+BLOB_DIR = os.path.join('books', 'blobs')
+
+# Partial files of resumable uploads, on the same filesystem as the blobs so
+# finalizing an upload is a rename
+UPLOAD_DIR = os.path.join(BLOB_DIR, 'uploads')
+
+
+def blob_name(content_hash: str, extension: str) -> str:
+    """Return the storage name of the blob of a content hash"""
+    return os.path.join(BLOB_DIR, content_hash[:2], f"{content_hash}.{extension.lstrip('.')}")
+
+
+def store_blob(chunks: Iterable[bytes], extension: str) -> Tuple[str, str, int]:
+    """
+    Stream chunks to a temporary file while computing their SHA-256, then move
+    the file to its content-addressed name. If the same content is already
+    stored, the temporary file is dropped and the existing blob is shared.
+
+    Returns (storage name, content hash, size in bytes).
+    """
+    temp_dir = os.path.join(settings.MEDIA_ROOT, BLOB_DIR)
+    os.makedirs(temp_dir, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=temp_dir, suffix='.part')
+
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as dest:
+            for chunk in chunks:
+                digest.update(chunk)
+                dest.write(chunk)
+                size += len(chunk)
+
+        content_hash = digest.hexdigest()
+        name = move_to_blob(temp_path, content_hash, extension)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return name, content_hash, size
+
+
+def move_to_blob(path: str, content_hash: str, extension: str) -> str:
+    """
+    Rename a local file, already hashed, to its content-addressed name in the
+    same directory tree (no copy). If the content is already stored, the file
+    is dropped and the existing blob is shared. Returns the storage name.
+    """
+    name = blob_name(content_hash, extension)
+    blob_path = os.path.join(settings.MEDIA_ROOT, name)
+    if os.path.exists(blob_path):
+        os.remove(path)
+    else:
+        os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+        os.replace(path, blob_path)
+    return name
+
+
+def hash_file(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Return the SHA-256 of a local file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return digest.hexdigest()
+            digest.update(chunk)
+
+
+def download_path(book_id: int) -> str:
+    """Partial downloads live at a fixed path per book so a retry can resume them"""
+    return os.path.join(settings.MEDIA_ROOT, 'books', 'downloads', f"book_{book_id}.part")
+
+
+def download_backoff(retries: int) -> int:
+    """Seconds to wait before retrying a download that failed retries times"""
+    return 5 * 2 ** retries
+
+
+def store_download(book: Book) -> str:
+    """
+    Download the book's URL (resuming a previous partial download) into
+    content-addressed storage and attach the file to the book.
+
+    Raises core.downloader.DownloadError. Returns the storage name.
+    """
+    if not book.url:
+        raise ValueError("Book has no URL to download from")
+
+    part_path = download_path(book.id)
+    result = download(book.url, part_path, max_bytes=MAX_BOOK_FILE_SIZE)
+
+    # Keep a format chosen by the user, otherwise use the detected one
+    file_format = book.file_format or result['format'] or 'txt'
+
+    # Save to content-addressed storage, hashing on the way
+    file_path, content_hash, size = store_blob(read_chunks(part_path), file_format)
+    discard_partial(part_path)
+
+    book.file = file_path
+    book.content_hash = content_hash
+    book.file_format = file_format
+    book.save()
+
+    logger.info(
+        f"Downloaded book {book.id}: {size} bytes, {file_format}, "
+        f"resumed at byte {result['resumed_from']}"
+    )
+    return file_path
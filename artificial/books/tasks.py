@@ -3,10 +3,11 @@ import os
 import uuid
 import logging
 from django.conf import settings
-from django.core.files.storage import default_storage
-import requests
 
+from .ingest import run_ingest_job
 from .models import Book
+from .storage import download_backoff, download_path, store_download
+from core.downloader import DownloadError, discard_partial
 from core.extractor import BookExtractor
 
 logger = logging.getLogger(__name__)
@@ -18,7 +19,9 @@ def extract_book_content(book_id):
     """
     try:
         book = Book.objects.get(id=book_id)
-        content = BookExtractor.extract_from_book(book)
+        content, boilerplate_report = BookExtractor.extract_with_report(book)
+        if boilerplate_report is not None:
+            Book.objects.filter(id=book_id).update(boilerplate_report=boilerplate_report)
         
         # Store the extracted content in a temporary file
         temp_filename = f"book_content_{book_id}_{uuid.uuid4()}.txt"
@@ -46,66 +49,58 @@ def extract_book_content(book_id):
             "error": str(e)
         }
 
-@shared_task
-def download_book_from_url(book_id):
+@shared_task(bind=True, max_retries=settings.BOOK_DOWNLOAD_MAX_RETRIES)
+def download_book_from_url(self, book_id):
     """
     Download a book from URL and save it to storage
     """
     try:
         book = Book.objects.get(id=book_id)
-        if not book.url:
-            raise ValueError("Book has no URL to download from")
-        
-        # Get the file extension from URL (if any)
-        url_path = book.url.split('?')[0]  # Remove query parameters
-        extension = os.path.splitext(url_path)[1].lower()
-        
-        # Default to .txt if no extension found
-        if not extension:
-            extension = '.txt'
-            
-        # Create a unique filename
-        filename = f"{uuid.uuid4()}{extension}"
-        file_path = os.path.join('books', filename)
-        
-        # Download the file
-        response = requests.get(book.url, stream=True)
-        response.raise_for_status()
-        
-        # Save to storage
-        with default_storage.open(file_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        
-        # Update the book with the file path
-        book.file = file_path
-        
-        # Try to detect file format from extension
-        if extension.endswith('.pdf'):
-            book.file_format = 'pdf'
-        elif extension.endswith('.epub'):
-            book.file_format = 'epub'
-        elif extension.endswith('.txt'):
-            book.file_format = 'txt'
-        elif extension.endswith('.docx'):
-            book.file_format = 'docx'
-        elif extension.endswith('.html') or extension.endswith('.htm'):
-            book.file_format = 'html'
-        elif extension.endswith('.md'):
-            book.file_format = 'md'
-        
-        book.save()
-        
+        file_path = store_download(book)
         return {
             "success": True,
             "book_id": book_id,
             "file_path": file_path
         }
-        
+
+    except DownloadError as e:
+        if e.retryable and self.request.retries < self.max_retries:
+            countdown = download_backoff(self.request.retries)
+            logger.warning(f"Download of book {book_id} failed ({str(e)}), retrying in {countdown}s")
+            raise self.retry(exc=e, countdown=countdown)
+        logger.error(f"Error downloading book from URL for book {book_id}: {str(e)}")
+        discard_partial(download_path(book_id))
+        return {
+            "success": False,
+            "book_id": book_id,
+            "error": str(e)
+        }
+
     except Exception as e:
         logger.error(f"Error downloading book from URL for book {book_id}: {str(e)}")
+        discard_partial(download_path(book_id))
         return {
             "success": False,
             "book_id": book_id,
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+@shared_task(time_limit=settings.BULK_INGEST_TIME_LIMIT)
+def run_ingest_pipeline(job_id):
+    """
+    Download and extract the books of a bulk ingestion, a bounded number at a time
+    """
+    try:
+        job = run_ingest_job(job_id)
+        return {
+            "success": True,
+            "job_id": job_id,
+            "total_items": job.total_items
+        }
+    except Exception as e:
+        logger.error(f"Error running ingest job {job_id}: {str(e)}")
+        return {
+            "success": False,
+            "job_id": job_id,
+            "error": str(e)
+        }
@@ -0,0 +1,158 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Book, UploadSession
+from .storage import UPLOAD_DIR, hash_file, move_to_blob
+
+logger = logging.getLogger(__name__)
+
+# Size of the reads from the request body and of the file write buffer
+BUFFER_SIZE = 1024 * 1024
+
+# Running SHA-256 of uploads whose ranges arrived in order at this process, by
+# session id: (bytes hashed, hash). Bounded, since sessions may be abandoned;
+# a session whose hash is missing or out of step is hashed again on finalize.
+MAX_RUNNING_HASHES = 64
+_running_hashes = OrderedDict()
+_running_hashes_lock = threading.Lock()
+
+
+def part_path(session_id) -> str:
+    """Local path of the partial file of an upload session"""
+    return os.path.join(settings.MEDIA_ROOT, UPLOAD_DIR, f"{session_id}.part")
+
+
+def _take_running_hash(session_id):
+    with _running_hashes_lock:
+        return _running_hashes.pop(str(session_id), None)
+
+
+def _put_running_hash(session_id, hashed: int, digest):
+    with _running_hashes_lock:
+        _running_hashes[str(session_id)] = (hashed, digest)
+        while len(_running_hashes) > MAX_RUNNING_HASHES:
+            _running_hashes.popitem(last=False)
+
+
+def create_session(title: str, author: str, source_language: str, target_language: str,
+                   file_format: str, total_size: int) -> UploadSession:
+    """Open an upload session and create its empty partial file"""
+    session = UploadSession.objects.create(
+        title=title,
+        author=author or "",
+        source_language=source_language,
+        target_language=target_language,
+        file_format=file_format,
+        total_size=total_size,
+        expires_at=timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    )
+    path = part_path(session.id)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return session
+
+
+def write_range(session: UploadSession, start: int, stream, length: int) -> int:
+    """
+    Write up to length bytes read from stream at offset start of the session's
+    partial file, BUFFER_SIZE at a time, and return the new received size.
+
+    Bytes that arrived before the client went away are kept, so the client
+    resumes from the returned size rather than from the start of its range.
+    The running hash is advanced when the range continues where it stopped.
+    """
+    running = _take_running_hash(session.id)
+    if start == 0:
+        running = (0, hashlib.sha256())
+    elif running is not None and running[0] != start:
+        # Out of step (a retransmitted range, or earlier ranges went to another process)
+        running = None
+    digest = running[1] if running else None
+
+    written = 0
+    with open(part_path(session.id), 'r+b', buffering=BUFFER_SIZE) as f:
+        f.seek(start)
+        while written < length:
+            try:
+                chunk = stream.read(min(BUFFER_SIZE, length - written))
+            except OSError as e:
+                logger.warning(f"Upload {session.id} interrupted at byte {start + written}: {str(e)}")
+                break
+            if not chunk:
+                break
+            f.write(chunk)
+            if digest is not None:
+                digest.update(chunk)
+            written += len(chunk)
+
+    if digest is not None:
+        _put_running_hash(session.id, start + written, digest)
+
+    UploadSession.objects.filter(id=session.id).update(
+        received_size=Greatest(F('received_size'), start + written),
+        updated_at=timezone.now()
+    )
+    return UploadSession.objects.values_list('received_size', flat=True).get(id=session.id)
+
+
+def finalize_session(session_id) -> Book:
+    """
+    Turn a complete upload into a Book. The partial file is renamed to its
+    content-addressed blob, hashed incrementally while it was received or,
+    when this process did not see every range in order, read again.
+    Finalizing twice returns the same book.
+    """
+    with transaction.atomic():
+        session = UploadSession.objects.select_for_update().get(id=session_id)
+        if session.book_id:
+            return session.book
+        if session.received_size < session.total_size:
+            raise ValueError(f"Upload is incomplete: {session.received_size} of {session.total_size} bytes received")
+
+        path = part_path(session.id)
+        running = _take_running_hash(session.id)
+        if running is not None and running[0] == session.total_size:
+            content_hash = running[1].hexdigest()
+        else:
+            logger.info(f"Hashing upload {session.id} again: its ranges were not all received in order here")
+            content_hash = hash_file(path)
+
+        file_name = move_to_blob(path, content_hash, session.file_format)
+        book = Book.objects.create(
+            title=session.title,
+            author=session.author,
+            source_language=session.source_language,
+            target_language=session.target_language,
+            file=file_name,
+            file_format=session.file_format,
+            content_hash=content_hash
+        )
+        session.book = book
+        session.save(update_fields=['book', 'updated_at'])
+
+    logger.info(f"Finalized upload {session.id} into book {book.id} ({session.total_size} bytes)")
+    return book
+
+
+def cleanup_expired_sessions() -> int:
+    """Delete expired upload sessions and the partial files of unfinished ones"""
+    expired = UploadSession.objects.filter(expires_at__lt=timezone.now())
+    count = 0
+    for session_id, book_id in expired.values_list('id', 'book_id').iterator():
+        if book_id is None:
+            path = part_path(session_id)
+            if os.path.exists(path):
+                os.remove(path)
+        _take_running_hash(session_id)
+        count += 1
+    expired.delete()
+    return count
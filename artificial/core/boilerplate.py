@@ -0,0 +1,86 @@
+import math
+import re
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from core.segment_classifier import is_chapter_marker
+
+# Number of lines at the top and at the bottom of a page where running
+# headers, footers and page numbers are looked for
+EDGE_LINES = 3
+
+# Report at most this many distinct removed lines
+MAX_REPORTED_LINES = 50
+
+
+def _normalize(line: str) -> str:
+    """Normalize a line so that e.g. "Page 12" and "Page 13" compare equal"""
+    line = re.sub(r'\d+', '#', line.lower())
+    return re.sub(r'\s+', ' ', line).strip()
+
+
+def _edge_positions(lines: List[str]) -> List[Tuple[int, str]]:
+    """Return (line number, position) pairs of the lines at the edges of a page"""
+    positions = []
+    for i in range(min(EDGE_LINES, len(lines))):
+        positions.append((i, f"top:{i}"))
+    for i in range(max(EDGE_LINES, len(lines) - EDGE_LINES), len(lines)):
+        positions.append((i, f"bottom:{len(lines) - 1 - i}"))
+    return positions
+
+
+def remove_boilerplate(pages: List[str], min_pages: int = 3, min_ratio: float = 0.2) -> Tuple[List[str], Dict]:
+    """
+    Remove running headers, footers and page numbers from page-level text.
+
+    A line is boilerplate when, once digits are normalized, the same text
+    appears at the same edge position (e.g. first line, last line) on at least
+    min_pages pages and on at least min_ratio of all pages. Headers that
+    alternate between odd and even pages are two separate patterns, each on
+    about half of the pages. Chapter headings are always kept.
+
+    Returns the cleaned pages and a report of what was removed.
+    """
+    page_lines = [[line.strip() for line in (page or "").splitlines() if line.strip()] for page in pages]
+    report = {
+        'pages': len(pages),
+        'removed_lines': 0,
+        'removed_chars': 0,
+        'lines': [],
+    }
+    if len(pages) < min_pages + 1:
+        return ["\n".join(lines) for lines in page_lines], report
+
+    # Count on how many pages each normalized line shows up at each edge position
+    occurrences = defaultdict(set)
+    for page_number, lines in enumerate(page_lines):
+        for line_number, position in _edge_positions(lines):
+            occurrences[(position, _normalize(lines[line_number]))].add(page_number)
+
+    threshold = max(min_pages, math.ceil(min_ratio * len(pages)))
+    boilerplate = {
+        key for key, page_numbers in occurrences.items()
+        if len(page_numbers) >= threshold and key[1]
+    }
+
+    removed = defaultdict(lambda: {'count': 0, 'example': None})
+    cleaned_pages = []
+    for lines in page_lines:
+        drop = set()
+        for line_number, position in _edge_positions(lines):
+            line = lines[line_number]
+            normalized = _normalize(line)
+            if (position, normalized) in boilerplate and not is_chapter_marker(line):
+                drop.add(line_number)
+                entry = removed[(position.split(':')[0], normalized)]
+                entry['count'] += 1
+                entry['example'] = entry['example'] or line
+                report['removed_chars'] += len(line)
+        report['removed_lines'] += len(drop)
+        cleaned_pages.append("\n".join(line for i, line in enumerate(lines) if i not in drop))
+
+    report['lines'] = [
+        {'position': position, 'text': entry['example'], 'pattern': normalized, 'count': entry['count']}
+        for (position, normalized), entry in sorted(removed.items(), key=lambda item: -item[1]['count'])
+    ][:MAX_REPORTED_LINES]
+    return cleaned_pages, report
@@ -0,0 +1,15 @@
+from django.core.cache import caches
+
+
+def get_cache_redis(key: str = None):
+    """
+    Raw client of the Redis server behind the default cache, for updates of
+    several fields that must be atomic (Lua scripts, MULTI pipelines), or None
+    when the cache is not Redis (locmem in tests and benchmarks)
+    """
+    from django.core.cache.backends.redis import RedisCache
+
+    cache = caches['default']
+    if not isinstance(cache, RedisCache):
+        return None
+    return cache._cache.get_client(key, write=True)
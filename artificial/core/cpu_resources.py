@@ -0,0 +1,139 @@
+import logging
+import math
+import os
+import sys
+from typing import Dict, List, Optional
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# CPU allocation of the inference worker processes. PyTorch starts as many
+# intra-op threads as the host has cores in every process, whatever the
+# container's CPU limit, so N prefork children of a worker limited to C CPUs
+# run N x cores threads on C CPUs. At start each child instead takes its share
+# of the CPU budget (the cgroup quota, at most the CPUs the process may run
+# on) and optionally pins itself to as many cores, physical cores first.
+
+CGROUP_ROOT = '/sys/fs/cgroup'
+THREAD_ENV_VARS = ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS']
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota() -> Optional[float]:
+    """CPUs the cgroup may use (quota / period), None when unlimited or unknown"""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    cpu_max = _read(os.path.join(CGROUP_ROOT, 'cpu.max'))
+    if cpu_max:
+        quota, _, period = cpu_max.partition(' ')
+        if quota != 'max' and period:
+            return int(quota) / int(period)
+        return None
+    # cgroup v1: quota of -1 means unlimited
+    for directory in ('cpu', 'cpu,cpuacct', 'cpuacct,cpu'):
+        quota = _read(os.path.join(CGROUP_ROOT, directory, 'cpu.cfs_quota_us'))
+        period = _read(os.path.join(CGROUP_ROOT, directory, 'cpu.cfs_period_us'))
+        if quota and period:
+            return int(quota) / int(period) if int(quota) > 0 else None
+    return None
+
+
+def available_cpus() -> List[int]:
+    """CPUs this process may run on, one per physical core first, then their SMT siblings"""
+    try:
+        cpus = sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+    first_siblings, other_siblings = [], []
+    for cpu in cpus:
+        siblings = _read(f"/sys/devices/system/cpu/cpu{cpu}/topology/thread_siblings_list") or str(cpu)
+        first = int(siblings.replace('-', ',').split(',')[0])
+        (first_siblings if first == cpu or first not in cpus else other_siblings).append(cpu)
+    return first_siblings + other_siblings
+
+
+def cpu_budget() -> int:
+    """Whole CPUs the worker may keep busy: the cgroup quota rounded down, at most the available CPUs"""
+    cpus = len(available_cpus())
+    quota = cgroup_cpu_quota()
+    if quota is None:
+        return cpus
+    return max(1, min(cpus, math.floor(quota)))
+
+
+def allocate_threads(budget: int, processes: int) -> List[int]:
+    """Threads of each of `processes` children sharing `budget` CPUs, at least one each"""
+    base, remainder = divmod(budget, processes)
+    return [max(1, base + (1 if index < remainder else 0)) for index in range(processes)]
+
+
+def child_cpus(cpus: List[int], allocation: List[int], index: int) -> List[int]:
+    """Cores of child `index`: consecutive slices of cpus, wrapping around when children outnumber them"""
+    start = sum(allocation[:index])
+    return [cpus[(start + offset) % len(cpus)] for offset in range(min(allocation[index], len(cpus)))]
+
+
+def set_torch_threads(threads: int, interop_threads: int = 0):
+    """Limit this process's OpenMP/BLAS and torch thread pools (0 keeps torch's default)"""
+    if threads:
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = str(threads)
+    if settings.TRANSLATION_BACKEND == 'fake' and 'torch' not in sys.modules:
+        return
+    try:
+        import torch
+    except ImportError:
+        return
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # Only allowed once, before any inter-op parallel work of the process
+            pass
+
+
+def _process_index() -> int:
+    # Index of the prefork pool child (0 .. concurrency - 1), as used by Celery's %I
+    from billiard.process import current_process
+
+    index = getattr(current_process(), 'index', None)
+    return index if index is not None else os.getpid()
+
+
+def configure_worker_process(index: Optional[int] = None) -> Dict:
+    """
+    Set the thread pools (and the CPU affinity with WORKER_CPU_PINNING) of a
+    worker child for its share of the CPU budget, and return the allocation
+    """
+    processes = max(1, settings.WORKER_PROCESSES)
+    budget = cpu_budget()
+    index = (_process_index() if index is None else index) % processes
+    if settings.WORKER_TORCH_THREADS == 'auto':
+        allocation = allocate_threads(budget, processes)
+    else:
+        allocation = [int(settings.WORKER_TORCH_THREADS)] * processes
+    threads = allocation[index]
+    set_torch_threads(threads, settings.WORKER_TORCH_INTEROP_THREADS)
+
+    cpus = None
+    if settings.WORKER_CPU_PINNING and threads and hasattr(os, 'sched_setaffinity'):
+        cpus = child_cpus(available_cpus()[:budget], allocation, index)
+        os.sched_setaffinity(0, cpus)
+
+    if index == 0 and sum(allocation) > budget:
+        logger.warning(
+            f"{processes} worker processes share {budget} CPU(s): each runs {threads} thread(s), "
+            f"{sum(allocation)} in total; a concurrency of at most {budget} avoids oversubscription"
+        )
+    logger.info(f"Worker process {index}: {threads} torch thread(s) of a {budget} CPU budget"
+                + (f", pinned to CPUs {cpus}" if cpus else ''))
+    return {'index': index, 'processes': processes, 'budget': budget, 'threads': threads, 'cpus': cpus}
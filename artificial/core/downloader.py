@@ -0,0 +1,298 @@
+import json
+import logging
+import os
+import re
+import time
+import zipfile
+from typing import Dict, Iterator, Optional
+from urllib.parse import urlparse
+from django.conf import settings
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Size of the file write buffer
+BUFFER_SIZE = 1024 * 1024
+
+# Most bytes taken per network read. Reads return whatever has arrived, so a
+# server trickling a few bytes at a time cannot hold a read open for long and
+# the transfer deadline is checked between them.
+READ_SIZE = 64 * 1024
+
+# Bytes read from the start of a download to sniff its format
+SNIFF_SIZE = 4096
+
+CONTENT_TYPE_FORMATS = {
+    'application/pdf': 'pdf',
+    'application/epub+zip': 'epub',
+    'application/vnd.openxmlformats-officedocument.wordprocessingml.document': 'docx',
+    'text/html': 'html',
+    'application/xhtml+xml': 'html',
+    'text/markdown': 'md',
+    'text/x-markdown': 'md',
+    'text/plain': 'txt',
+}
+
+EXTENSION_FORMATS = {
+    '.pdf': 'pdf',
+    '.epub': 'epub',
+    '.docx': 'docx',
+    '.html': 'html',
+    '.htm': 'html',
+    '.md': 'md',
+    '.txt': 'txt',
+}
+
+# Statuses worth retrying later; other 4xx/5xx answers fail the download
+RETRYABLE_STATUSES = (408, 429, 500, 502, 503, 504)
+
+_CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+_session = None
+
+
+class DownloadError(Exception):
+    """A download failed; retryable errors keep the partial file so the retry can resume"""
+
+    def __init__(self, message: str, retryable: bool = False):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class DownloadTooLarge(DownloadError):
+    def __init__(self, size: int, max_bytes: int):
+        super().__init__(f"Remote file is larger than {max_bytes // (1024 * 1024)}MB ({size} bytes)")
+
+
+def get_session() -> requests.Session:
+    """
+    Return the process-wide session, so downloads reuse pooled connections.
+    Connection failures are retried by urllib3 before any byte is read.
+    """
+    global _session
+    if _session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=settings.BOOK_DOWNLOAD_POOL_SIZE,
+            pool_maxsize=settings.BOOK_DOWNLOAD_POOL_SIZE,
+            max_retries=Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.5),
+        )
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers['User-Agent'] = 'book-translator/1.0'
+        # Content-Length, Content-Range and the Range offset of a resume count
+        # bytes as sent; with a compressed body they would not match the
+        # decoded bytes written to the file
+        session.headers['Accept-Encoding'] = 'identity'
+        _session = session
+    return _session
+
+
+def sniff_format(head: bytes) -> Optional[str]:
+    """Detect the book format from the first bytes of the file"""
+    if head.startswith(b'%PDF-'):
+        return 'pdf'
+    if head.startswith(b'PK\x03\x04'):
+        # EPUB stores an uncompressed "mimetype" entry first
+        if b'mimetypeapplication/epub+zip' in head[:100]:
+            return 'epub'
+        if b'word/' in head or b'[Content_Types].xml' in head:
+            return 'docx'
+        return None
+    text = head.lstrip(b'\xef\xbb\xbf \t\r\n').lower()
+    if text.startswith((b'<!doctype html', b'<html')) or (text.startswith(b'<?xml') and b'<html' in text):
+        return 'html'
+    return None
+
+
+def _sniff_zip(path: str) -> Optional[str]:
+    """Look inside a zip whose first entry did not give the format away"""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = set(archive.namelist())
+    except zipfile.BadZipFile:
+        return None
+    if 'mimetype' in names or 'META-INF/container.xml' in names:
+        return 'epub'
+    if 'word/document.xml' in names:
+        return 'docx'
+    return None
+
+
+def detect_format(head: bytes, content_type: Optional[str], url: str, path: Optional[str] = None) -> Optional[str]:
+    """
+    Detect the format of a downloaded book: magic bytes first, then the
+    Content-Type header, then the extension of the URL path
+    """
+    file_format = sniff_format(head)
+    if file_format is None and head.startswith(b'PK\x03\x04') and path:
+        file_format = _sniff_zip(path)
+    if file_format:
+        return file_format
+
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    if media_type in CONTENT_TYPE_FORMATS:
+        return CONTENT_TYPE_FORMATS[media_type]
+
+    extension = os.path.splitext(urlparse(url).path)[1].lower()
+    return EXTENSION_FORMATS.get(extension)
+
+
+def _meta_path(path: str) -> str:
+    return f"{path}.meta"
+
+
+def _load_meta(path: str) -> Dict:
+    try:
+        with open(_meta_path(path)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_meta(path: str, meta: Dict):
+    with open(_meta_path(path), 'w') as f:
+        json.dump(meta, f)
+
+
+def discard_partial(path: str):
+    """Remove a partial download and its resume metadata"""
+    for name in (path, _meta_path(path)):
+        if os.path.exists(name):
+            os.remove(name)
+
+
+def _validator(response: requests.Response) -> Optional[str]:
+    """Return a strong validator for If-Range; weak ETags cannot be used to resume"""
+    etag = response.headers.get('ETag')
+    if etag and not etag.startswith('W/'):
+        return etag
+    return response.headers.get('Last-Modified')
+
+
+def read_chunks(path: str, chunk_size: int = BUFFER_SIZE) -> Iterator[bytes]:
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                return
+            yield chunk
+
+
+def download(url: str, path: str, max_bytes: int) -> Dict:
+    """
+    Download a URL to a local path, resuming a partial file left by a previous
+    attempt with an HTTP Range request when the server supports it.
+
+    Connect and read timeouts bound each network wait, BOOK_DOWNLOAD_MAX_SECONDS
+    bounds the whole transfer (checked on every read, so it is exceeded by at
+    most one read timeout), and the download is aborted as soon as it exceeds
+    max_bytes, whether announced by Content-Length or found while streaming.
+
+    Raises DownloadError; when retryable, the partial file is kept for the retry.
+    Returns a dict with path, size, content_type, format and resumed_from.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    offset = os.path.getsize(path) if os.path.exists(path) else 0
+    meta = _load_meta(path) if offset else {}
+    headers = {}
+    if offset and meta.get('validator'):
+        headers['Range'] = f"bytes={offset}-"
+        headers['If-Range'] = meta['validator']
+    elif offset:
+        # Without a validator the remote file may have changed; start over
+        discard_partial(path)
+        offset = 0
+
+    timeout = (settings.BOOK_DOWNLOAD_CONNECT_TIMEOUT, settings.BOOK_DOWNLOAD_READ_TIMEOUT)
+    try:
+        response = get_session().get(url, stream=True, timeout=timeout, headers=headers)
+    except (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema, requests.exceptions.InvalidSchema) as e:
+        raise DownloadError(f"Invalid URL: {e}")
+    except requests.exceptions.RequestException as e:
+        raise DownloadError(f"Could not connect: {e}", retryable=True)
+
+    with response:
+        if response.status_code == 416 and offset and meta.get('total') == offset:
+            # The previous attempt received everything but failed before finishing up
+            return _finish(url, path, offset, meta.get('content_type'), offset)
+        if response.status_code in RETRYABLE_STATUSES or response.status_code == 416:
+            if response.status_code == 416:
+                discard_partial(path)
+            raise DownloadError(f"Server answered {response.status_code}", retryable=True)
+        if response.status_code >= 400:
+            raise DownloadError(f"Server answered {response.status_code}")
+
+        if response.status_code == 206:
+            match = _CONTENT_RANGE_RE.match(response.headers.get('Content-Range', ''))
+            if not match or int(match.group(1)) != offset:
+                discard_partial(path)
+                raise DownloadError("Server resumed at the wrong offset", retryable=True)
+            total = int(match.group(3)) if match.group(3) != '*' else None
+            mode = 'ab'
+            logger.info(f"Resuming download of {url} at byte {offset}")
+        else:
+            # Full body: the server ignored the range or the file changed
+            content_length = response.headers.get('Content-Length')
+            total = int(content_length) if content_length and content_length.isdigit() else None
+            offset = 0
+            mode = 'wb'
+
+        if total is not None and total > max_bytes:
+            discard_partial(path)
+            raise DownloadTooLarge(total, max_bytes)
+
+        content_type = response.headers.get('Content-Type') or meta.get('content_type')
+        _save_meta(path, {
+            'validator': _validator(response) or meta.get('validator'),
+            'total': total,
+            'content_type': content_type,
+        })
+
+        resumed_from = offset
+        size = offset
+        deadline = time.monotonic() + settings.BOOK_DOWNLOAD_MAX_SECONDS
+        try:
+            with open(path, mode, buffering=BUFFER_SIZE) as f:
+                while True:
+                    if time.monotonic() > deadline:
+                        raise DownloadError(
+                            f"Download exceeded {settings.BOOK_DOWNLOAD_MAX_SECONDS}s at {size} bytes",
+                            retryable=True
+                        )
+                    # read1 returns as soon as some bytes arrived (empty at the end of the body)
+                    chunk = response.raw.read1(READ_SIZE, decode_content=True)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > max_bytes:
+                        raise DownloadTooLarge(size, max_bytes)
+                    f.write(chunk)
+        except DownloadTooLarge:
+            discard_partial(path)
+            raise
+        except (requests.exceptions.RequestException, Urllib3HTTPError) as e:
+            raise DownloadError(f"Connection lost at {size} bytes: {e}", retryable=True)
+
+    if total is not None and size < total:
+        raise DownloadError(f"Connection closed at {size} of {total} bytes", retryable=True)
+
+    return _finish(url, path, size, content_type, resumed_from)
+
+
+def _finish(url: str, path: str, size: int, content_type: Optional[str], resumed_from: int) -> Dict:
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_SIZE)
+    if os.path.exists(_meta_path(path)):
+        os.remove(_meta_path(path))
+    return {
+        'path': path,
+        'size': size,
+        'content_type': content_type,
+        'format': detect_format(head, content_type, url, path),
+        'resumed_from': resumed_from,
+    }
@@ -1,10 +1,13 @@
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 import PyPDF2
 import docx
 from ebooklib import epub
 import os
 import re
 from bs4 import BeautifulSoup
+from django.conf import settings
+
+from core.boilerplate import remove_boilerplate
 
 class BookExtractor:
     """Utility class for extracting text content from various file formats"""
@@ -15,13 +18,35 @@ class BookExtractor:
         if not book.file:
             raise ValueError("Book has no associated file")
             
-        file_path = book.file.path
-        file_format = book.file_format.lower() if book.file_format else None
+        return BookExtractor.extract_from_path(book.file.path, book.file_format)
+    
+    @staticmethod
+    def extract_with_report(book) -> Tuple[str, Optional[Dict]]:
+        """
+        Extract text content from a book file together with the boilerplate
+        report of paginated formats (None for formats without pages)
+        """
+        if not book.file:
+            raise ValueError("Book has no associated file")
         
-        # If no format specified, try to detect from extension
-        if not file_format:
-            _, ext = os.path.splitext(file_path)
-            file_format = ext.lstrip('.').lower()
+        file_path = book.file.path
+        file_format = BookExtractor._resolve_format(file_path, book.file_format)
+        if file_format == 'pdf':
+            return BookExtractor._extract_from_pdf_with_report(file_path)
+        return BookExtractor.extract_from_path(file_path, file_format), None
+    
+    @staticmethod
+    def _resolve_format(file_path: str, file_format: Optional[str]) -> str:
+        """Return the file format, detected from the extension if not given"""
+        if file_format:
+            return file_format.lower()
+        _, ext = os.path.splitext(file_path)
+        return ext.lstrip('.').lower()
+    
+    @staticmethod
+    def extract_from_path(file_path: str, file_format: Optional[str] = None) -> str:
+        """Extract text content from a file, detecting the format from its extension if not given"""
+        file_format = BookExtractor._resolve_format(file_path, file_format)
         
         # Extract based on format
         if file_format == 'pdf':
@@ -40,14 +65,29 @@ class BookExtractor:
             raise ValueError(f"Unsupported file format: {file_format}")
     
     @staticmethod
-    def _extract_from_pdf(file_path: str) -> str:
-        """Extract text from a PDF file"""
-        text = []
+    def _extract_pdf_pages(file_path: str) -> List[str]:
+        """Extract the text of each page of a PDF file"""
         with open(file_path, 'rb') as file:
             pdf = PyPDF2.PdfReader(file)
-            for page in pdf.pages:
-                text.append(page.extract_text())
-        return "\n\n".join(text)
+            return [page.extract_text() or "" for page in pdf.pages]
+    
+    @staticmethod
+    def _extract_from_pdf_with_report(file_path: str) -> Tuple[str, Optional[Dict]]:
+        """Extract text from a PDF file without running headers, footers and page numbers"""
+        pages = BookExtractor._extract_pdf_pages(file_path)
+        report = None
+        if settings.BOOK_BOILERPLATE_REMOVAL_ENABLED:
+            pages, report = remove_boilerplate(
+                pages,
+                min_pages=settings.BOOK_BOILERPLATE_MIN_PAGES,
+                min_ratio=settings.BOOK_BOILERPLATE_MIN_RATIO
+            )
+        return "\n\n".join(pages), report
+    
+    @staticmethod
+    def _extract_from_pdf(file_path: str) -> str:
+        """Extract text from a PDF file"""
+        return BookExtractor._extract_from_pdf_with_report(file_path)[0]
     
     @staticmethod
     def _extract_from_epub(file_path: str) -> str:
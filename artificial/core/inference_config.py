@@ -0,0 +1,55 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Dict
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Inference settings chosen per language pair by the sweep_inference command,
+# stored as JSON in INFERENCE_CONFIG_PATH:
+#   {"en-es": {"batch_size": 8, "num_beams": 2, "precision": "int8", "threads": 4,
+#              "max_length": 256, "measured": {...}, "swept_at": "..."}, ...}
+# num_beams and precision are the defaults core.ml_translator generates with;
+# the other values are the recommendation for sizing batches and workers.
+PRECISIONS = ['fp32', 'bf16', 'int8']
+
+_loaded = {'mtime': None, 'configs': {}}
+
+
+def load_inference_configs() -> Dict[str, Dict]:
+    """All saved configurations by "src-tgt" pair, re-read when the file changes"""
+    path = settings.INFERENCE_CONFIG_PATH
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        _loaded.update(mtime=None, configs={})
+        return {}
+    if mtime != _loaded['mtime']:
+        try:
+            with open(path) as f:
+                configs = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring the inference configuration {path}: {str(e)}")
+            configs = {}
+        _loaded.update(mtime=mtime, configs=configs)
+    return _loaded['configs']
+
+
+def get_inference_config(source_lang: str, target_lang: str) -> Dict:
+    """Saved configuration of a language pair, empty when it was never swept"""
+    return load_inference_configs().get(f"{source_lang}-{target_lang}", {})
+
+
+def save_inference_configs(configs: Dict[str, Dict]):
+    """Store configurations for these pairs, keeping the other pairs' ones"""
+    path = settings.INFERENCE_CONFIG_PATH
+    merged = dict(load_inference_configs())
+    merged.update(configs)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    # Written to a temporary file and renamed, so workers never read half a file
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(merged, f, indent=2, sort_keys=True)
+    os.replace(temporary, path)
@@ -0,0 +1,32 @@
+from typing import List
+from django.conf import settings
+
+from core.inference_config import get_inference_config
+
+# Languages that can be used as source or target of a translation; kept free of
+# ML imports so the web process can validate requests without loading torch
+SUPPORTED_LANGUAGES = [
+    "en", "es", "fr", "de", "ru", "zh", "ja", "ko", "ar", "bg"
+]
+
+def get_model_name(source_lang: str, target_lang: str) -> str:
+    """Get the Hugging Face model name for the language pair"""
+    return f"Helsinki-NLP/opus-mt-{source_lang}-{target_lang}"
+
+def get_model_version(source_lang: str, target_lang: str) -> str:
+    """
+    Identify the model (and revision) translations of a language pair are
+    produced with, and the decoding settings when a swept configuration changes them
+    """
+    version = f"{get_model_name(source_lang, target_lang)}@{settings.TRANSLATION_MODEL_REVISION}"
+    if settings.TRANSLATION_BACKEND != 'marian':
+        # Benchmark stand-ins must never be reused as the pair's real translations
+        version += f"+{settings.TRANSLATION_BACKEND}"
+    config = get_inference_config(source_lang, target_lang)
+    if config:
+        version += f"+beams{config['num_beams']}-{config['precision']}"
+    return version
+
+def get_supported_languages() -> List[str]:
+    """Get a list of supported language pairs"""
+    return list(SUPPORTED_LANGUAGES)
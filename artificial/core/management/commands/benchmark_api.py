@@ -0,0 +1,123 @@
+import os
+import time
+from typing import List
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from ninja import NinjaAPI, Router
+from ninja.testing import TestClient
+
+from books.models import Book
+from books.schemas import BookOut
+from translations.models import Translation
+from translations.schemas import TranslationOut, TranslationStatus
+
+
+def _legacy_book_out(book):
+    """Build a BookOut the way the endpoints did before the values() fast path"""
+    return BookOut(
+        id=book.id,
+        title=book.title,
+        author=book.author,
+        source_language=book.source_language,
+        target_language=book.target_language,
+        created_at=book.created_at,
+        url=book.url,
+        file=book.file.url if book.file else None,
+        file_format=book.file_format
+    )
+
+
+def _build_legacy_api():
+    """Mount the previous list endpoint implementations on a throwaway API with the default renderer"""
+    router = Router()
+
+    @router.get("/books", response=List[BookOut])
+    def legacy_list_books(request):
+        return [_legacy_book_out(book) for book in Book.objects.all()]
+
+    @router.get("/translations", response=List[TranslationOut])
+    def legacy_list_translations(request):
+        return [
+            TranslationOut(
+                id=translation.id,
+                book=_legacy_book_out(translation.book),
+                target_language=translation.target_language,
+                created_at=translation.created_at,
+                updated_at=translation.updated_at,
+                status=TranslationStatus(translation.status),
+                total_chunks=translation.total_chunks,
+                completed_chunks=translation.completed_chunks,
+                error_message=translation.error_message
+            )
+            for translation in Translation.objects.all().select_related('book')
+        ]
+
+    api = NinjaAPI(urls_namespace="benchmark_legacy")
+    api.add_router("", router)
+    return api
+
+
+class Command(BaseCommand):
+    """Django command to compare the legacy and optimized list endpoint response paths"""
+
+    help = 'Benchmark requests/sec of the list endpoints against the pre-orjson implementation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Number of books and translations to generate')
+        parser.add_argument('--requests', type=int, default=20, help='Number of requests per endpoint and variant')
+
+    def handle(self, *args, **options):
+        # The project API is already registered by the URL conf; allow the test client to mount it again
+        os.environ.setdefault('NINJA_SKIP_REGISTRY', 'yes')
+        from book_translator.urls import api
+
+        rows = options['rows']
+        requests = options['requests']
+
+        # Generate the fixture inside a transaction that is always rolled back
+        with transaction.atomic():
+            self.stdout.write(f'Creating {rows} books and translations...')
+            books = Book.objects.bulk_create(
+                Book(
+                    title=f"Benchmark book {i}",
+                    author="Benchmark",
+                    source_language="en",
+                    target_language="es",
+                    url=f"https://example.com/books/{i}.txt",
+                    file_format="txt"
+                )
+                for i in range(rows)
+            )
+            Translation.objects.bulk_create(
+                Translation(
+                    book=book,
+                    target_language=book.target_language,
+                    status=TranslationStatus.COMPLETED.value,
+                    total_chunks=100,
+                    completed_chunks=100
+                )
+                for book in books
+            )
+
+            clients = {
+                'legacy': TestClient(_build_legacy_api()),
+                'optimized': TestClient(api),
+            }
+
+            for path in ('/books', '/translations'):
+                results = {}
+                for variant, client in clients.items():
+                    # Warm up connection and caches before timing
+                    client.get(path)
+                    started = time.perf_counter()
+                    for _ in range(requests):
+                        response = client.get(path)
+                        assert response.status_code == 200, response.content
+                    elapsed = time.perf_counter() - started
+                    results[variant] = requests / elapsed
+                    self.stdout.write(f'{path} [{variant}]: {results[variant]:.2f} req/s')
+
+                speedup = results['optimized'] / results['legacy']
+                self.stdout.write(self.style.SUCCESS(f'{path}: {speedup:.2f}x speedup with {rows} rows'))
+
+            transaction.set_rollback(True)
@@ -0,0 +1,235 @@
+import json
+import os
+import resource
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.files import File
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import override_settings
+
+from book_translator.celery import app
+from books.models import Book
+from core.synthetic_books import FORMATS, write_book
+from core.tracing import collect_spans
+from translations.models import Translation
+from translations.schemas import TranslationMode, TranslationStatus
+from translations.tasks import prepare_translation
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class QueryCounter:
+    """Database execute wrapper counting statements by their first keyword"""
+
+    def __init__(self):
+        self.counts = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        self.counts[sql.lstrip().split(None, 1)[0].upper()] += 1
+        return execute(sql, params, many, context)
+
+
+def exclusive_times(spans):
+    """
+    Time of each stage without the stages nested in it, summed per stage.
+    With eager tasks everything runs in this thread, so the chunk tasks are
+    nested in the prepare.chunks stage that dispatches them.
+    """
+    spans = sorted(spans, key=lambda span: (span[1], -span[2]))
+    open_spans = []
+    entries = []
+    for stage, started_at, seconds in spans:
+        while open_spans and open_spans[-1]['end'] <= started_at:
+            open_spans.pop()
+        entry = {'stage': stage, 'end': started_at + seconds, 'seconds': seconds, 'nested': 0.0}
+        if open_spans:
+            open_spans[-1]['nested'] += seconds
+        open_spans.append(entry)
+        entries.append(entry)
+
+    times = {}
+    counts = Counter()
+    for entry in entries:
+        times[entry['stage']] = times.get(entry['stage'], 0.0) + max(0.0, entry['seconds'] - entry['nested'])
+        counts[entry['stage']] += 1
+    return times, counts
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    """Django command to benchmark the whole translation pipeline on synthetic books"""
+
+    help = ('Run extract -> segment -> chunk -> translate -> assemble on synthetic books of every format '
+            'with eager Celery tasks, and report time per stage, queries, peak RSS and segments/sec')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formats', default=','.join(FORMATS), help='Comma-separated formats to generate')
+        parser.add_argument('--words', type=int, default=5000, help='Approximate size of each book in words')
+        parser.add_argument('--seed', type=int, default=0, help='Seed of the synthetic text')
+        parser.add_argument('--chunk-size', type=int, default=1, help='Sentences per chunk')
+        parser.add_argument('--max-length', type=int, default=400, help='Maximum token length of a chunk translation')
+        parser.add_argument('--source', default='en')
+        parser.add_argument('--target', default='es')
+        parser.add_argument('--backend', choices=['fake', 'tiny', 'marian'], default='fake',
+                            help='fake: deterministic stand-in; tiny: random small Marian model; marian: the real models')
+        parser.add_argument('--latency-ms', type=float, default=None,
+                            help='Fake backend latency per chunk (default FAKE_TRANSLATOR_LATENCY_MS)')
+        parser.add_argument('--ms-per-token', type=float, default=None,
+                            help='Fake backend latency per word (default FAKE_TRANSLATOR_MS_PER_TOKEN)')
+        parser.add_argument('--json', dest='json_path', help='Write the results to this JSON file')
+        parser.add_argument('--compare', help='Results JSON of an earlier run to compare against')
+
+    def _run_book(self, path, file_format, options):
+        """Create the book and its translation, run the pipeline, and roll everything back"""
+        with transaction.atomic():
+            book = Book.objects.create(
+                title=os.path.basename(path),
+                source_language=options['source'],
+                target_language=options['target'],
+                file_format=file_format
+            )
+            with open(path, 'rb') as f:
+                book.file.save(os.path.basename(path), File(f), save=True)
+            translation = Translation.objects.create(
+                book=book,
+                target_language=options['target'],
+                mode=TranslationMode.EAGER.value,
+                max_length=options['max_length']
+            )
+
+            counter = QueryCounter()
+            rss_before = _peak_rss_mb()
+            with collect_spans() as spans, connection.execute_wrapper(counter):
+                started = time.perf_counter()
+                prepare_translation(translation.id, options['max_length'], options['chunk_size'], scheduling='unordered')
+                wall_seconds = time.perf_counter() - started
+
+            translation.refresh_from_db()
+            transaction.set_rollback(True)
+
+        if translation.status != TranslationStatus.COMPLETED.value:
+            raise CommandError(f"{file_format}: translation ended {translation.status}: {translation.error_message}")
+
+        stages, stage_counts = exclusive_times(spans)
+        segments = translation.total_chunks
+        queries = sum(counter.counts.values())
+        return {
+            'format': file_format,
+            'words': options['words'],
+            'file_bytes': os.path.getsize(path),
+            'segments': segments,
+            'skipped_segments': translation.skipped_chunks,
+            'wall_seconds': round(wall_seconds, 3),
+            'segments_per_second': round(segments / wall_seconds, 1) if wall_seconds else 0.0,
+            'stages': {stage: round(seconds, 4) for stage, seconds in stages.items()},
+            'stage_counts': dict(stage_counts),
+            'unattributed_seconds': round(max(0.0, wall_seconds - sum(stages.values())), 4),
+            'queries': queries,
+            'queries_per_1000_segments': round(queries * 1000 / segments, 1) if segments else 0.0,
+            'queries_by_type': dict(counter.counts),
+            'peak_rss_mb': round(_peak_rss_mb(), 1),
+            'peak_rss_growth_mb': round(_peak_rss_mb() - rss_before, 1),
+        }
+
+    def _print_result(self, result):
+        self.stdout.write(
+            f"{result['format']:5} {result['segments']:>8} {result['wall_seconds']:>9.2f} "
+            f"{result['segments_per_second']:>9} {result['queries_per_1000_segments']:>9} {result['peak_rss_mb']:>8}"
+        )
+        for stage, seconds in sorted(result['stages'].items(), key=lambda item: -item[1]):
+            self.stdout.write(f"        {stage:20} {seconds:>9.3f}s  x{result['stage_counts'][stage]}")
+
+    def _compare(self, results, baseline_path):
+        with open(baseline_path) as f:
+            baseline = {result['format']: result for result in json.load(f)['results']}
+        self.stdout.write(f"\nCompared with {baseline_path}:")
+        for result in results:
+            before = baseline.get(result['format'])
+            if not before:
+                continue
+            changes = []
+            for key in ('segments_per_second', 'queries_per_1000_segments', 'peak_rss_mb'):
+                if before[key]:
+                    changes.append(f"{key} {before[key]} -> {result[key]} ({(result[key] / before[key] - 1) * 100:+.1f}%)")
+            self.stdout.write(f"  {result['format']:5} " + ', '.join(changes))
+
+    def handle(self, *args, **options):
+        formats = [file_format.strip() for file_format in options['formats'].split(',') if file_format.strip()]
+        unknown = [file_format for file_format in formats if file_format not in FORMATS]
+        if unknown:
+            raise CommandError(f"Unknown format(s): {', '.join(unknown)}. Supported: {', '.join(FORMATS)}")
+
+        if connection.vendor == 'sqlite':
+            # A fresh local database (SQLITE_PATH) needs the schema first
+            call_command('migrate', verbosity=0, interactive=False)
+
+        overrides = {
+            'TRANSLATION_BACKEND': options['backend'],
+            # Spans are collected in memory here instead of being saved per translation
+            'TRACING_ENABLED': False,
+            # No Redis needed: response cache in process, no progress events
+            'CACHES': LOCMEM_CACHES,
+            'TRANSLATION_EVENTS_ENABLED': False,
+            'TASK_PROFILING_RATE': 0,
+        }
+        if options['latency_ms'] is not None:
+            overrides['FAKE_TRANSLATOR_LATENCY_MS'] = options['latency_ms']
+        if options['ms_per_token'] is not None:
+            overrides['FAKE_TRANSLATOR_MS_PER_TOKEN'] = options['ms_per_token']
+
+        results = []
+        eager = app.conf.task_always_eager
+        app.conf.task_always_eager = True
+        try:
+            with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root, **overrides):
+                books_dir = os.path.join(media_root, 'synthetic')
+                os.makedirs(books_dir)
+                self.stdout.write(
+                    f"Backend {options['backend']}, {options['words']} words per book, database {connection.vendor}; "
+                    'trace storage excluded (TRACING_ENABLED off), so queries are those of the pipeline alone'
+                )
+                self.stdout.write(f"{'fmt':5} {'segments':>8} {'wall s':>9} {'seg/s':>9} {'q/1k seg':>9} {'RSS MB':>8}")
+                for file_format in formats:
+                    path = write_book(books_dir, file_format, options['words'], seed=options['seed'])
+                    result = self._run_book(path, file_format, options)
+                    results.append(result)
+                    self._print_result(result)
+        finally:
+            app.conf.task_always_eager = eager
+
+        if options['json_path']:
+            report = {
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'commit': _commit(),
+                'database': connection.vendor,
+                'backend': options['backend'],
+                'tracing': False,
+                'options': {key: options[key] for key in ('words', 'seed', 'chunk_size', 'max_length', 'source', 'target')},
+                'results': results,
+            }
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['json_path']}")
+
+        if options['compare']:
+            self._compare(results, options['compare'])
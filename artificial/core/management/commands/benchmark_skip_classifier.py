@@ -0,0 +1,78 @@
+import os
+import time
+from collections import Counter, defaultdict
+from django.core.management.base import BaseCommand, CommandError
+
+from books.models import Book
+from core.extractor import BookExtractor
+from core.segment_classifier import SegmentKind, classify_and_passthrough
+from core.text_splitter import split_text_into_chunks
+
+
+class Command(BaseCommand):
+    """Django command to measure how many inference calls the segment classifier saves"""
+
+    help = 'Count the model.generate calls the pre-inference segment classifier saves on sample books'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--book', type=int, action='append', default=[], help='ID of a stored book (repeatable)')
+        parser.add_argument('--file', action='append', default=[], help='Path of a PDF/EPUB/TXT/DOCX/HTML/MD file (repeatable)')
+        parser.add_argument('--source', default='en', help='Source language for --file inputs')
+        parser.add_argument('--target', default='es', help='Target language')
+        parser.add_argument('--chunk-size', type=int, default=1, help='Chunk size passed to the splitter')
+        parser.add_argument('--seconds-per-call', type=float, default=0.0,
+                            help='Average inference time per chunk, to estimate the time saved')
+        parser.add_argument('--examples', type=int, default=0, help='Print this many skipped segments per kind')
+
+    def _inputs(self, options):
+        for book in Book.objects.filter(id__in=options['book']):
+            yield book.title, book.source_language, lambda book=book: BookExtractor.extract_from_book(book)
+        for path in options['file']:
+            if not os.path.exists(path):
+                raise CommandError(f"File not found: {path}")
+            yield os.path.basename(path), options['source'], lambda path=path: BookExtractor.extract_from_path(path)
+
+    def handle(self, *args, **options):
+        if not options['book'] and not options['file']:
+            raise CommandError("Pass at least one --book or --file")
+
+        target = options['target']
+        total_segments = 0
+        total_kinds = Counter()
+        total_seconds = 0.0
+
+        for name, source, extract in self._inputs(options):
+            segments = split_text_into_chunks(extract(), chunk_size=options['chunk_size'])
+
+            kinds = Counter()
+            examples = defaultdict(list)
+            started = time.perf_counter()
+            for text in segments:
+                kind, _ = classify_and_passthrough(text, source, target)
+                kinds[kind] += 1
+                if kind != SegmentKind.TEXT and len(examples[kind]) < options['examples']:
+                    examples[kind].append(text)
+            elapsed = time.perf_counter() - started
+
+            skipped = len(segments) - kinds[SegmentKind.TEXT]
+            self.stdout.write(
+                f"{name} ({source}->{target}): {len(segments)} segments, {skipped} skip inference "
+                f"({skipped / max(1, len(segments)):.1%}), classifier {elapsed / max(1, len(segments)) * 1e6:.1f} us/segment"
+            )
+            for kind, count in kinds.most_common():
+                if kind != SegmentKind.TEXT:
+                    self.stdout.write(f"  {kind.value:16} {count}")
+                    for text in examples[kind]:
+                        self.stdout.write(f"      {text[:80]!r}")
+
+            total_segments += len(segments)
+            total_kinds.update(kinds)
+            total_seconds += elapsed
+
+        saved = total_segments - total_kinds[SegmentKind.TEXT]
+        self.stdout.write(self.style.SUCCESS(
+            f"Total: {saved} of {total_segments} inference calls saved ({saved / max(1, total_segments):.1%}), "
+            f"classifier time {total_seconds:.2f}s"
+        ))
+        if options['seconds_per_call']:
+            self.stdout.write(f"Estimated inference time saved: {saved * options['seconds_per_call']:.0f}s")
@@ -0,0 +1,80 @@
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+import requests
+
+from core.ml_translator import load_model_and_tokenizer
+from core.snippets import translate_snippet
+
+DEFAULT_SENTENCE = "The old man looked out of the window and watched the rain fall on the quiet street."
+
+
+def _percentile(values, percentile):
+    ordered = sorted(values)
+    position = min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[position]
+
+
+class Command(BaseCommand):
+    """Django command to measure the latency of synchronous snippet translation"""
+
+    help = 'Benchmark snippet translation latency (in-process batcher or a running server)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default='en', help='Source language')
+        parser.add_argument('--target', default='es', help='Target language')
+        parser.add_argument('--text', default=DEFAULT_SENTENCE, help='Sentence to translate')
+        parser.add_argument('--requests', type=int, default=50, help='Number of requests')
+        parser.add_argument('--concurrency', type=int, default=1, help='Concurrent clients')
+        parser.add_argument('--max-length', type=int, default=128, help='Maximum generated tokens')
+        parser.add_argument('--url', help='Benchmark POST /api/translations/snippet on a running server instead')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        target = options['target']
+        text = options['text']
+        max_length = options['max_length']
+
+        if options['url']:
+            session = requests.Session()
+            endpoint = options['url'].rstrip('/') + '/api/translations/snippet'
+
+            def translate():
+                response = session.post(endpoint, json={
+                    'text': text,
+                    'source_language': source,
+                    'target_language': target,
+                    'max_length': max_length
+                }, timeout=60)
+                response.raise_for_status()
+        else:
+            self.stdout.write(f'Loading model {source}-{target}...')
+            load_model_and_tokenizer(source, target)
+
+            def translate():
+                translate_snippet(text, source, target, max_length)
+
+        # Warm-up request so the first measurement does not include lazy initialisation
+        translate()
+
+        def timed(_):
+            started = time.perf_counter()
+            translate()
+            return (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            latencies = list(executor.map(timed, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(
+            f"{len(latencies)} requests, concurrency {options['concurrency']}: "
+            f"{len(latencies) / elapsed:.2f} req/s"
+        )
+        self.stdout.write(
+            f"latency ms: p50={statistics.median(latencies):.1f} "
+            f"p90={_percentile(latencies, 90):.1f} "
+            f"p99={_percentile(latencies, 99):.1f} "
+            f"max={max(latencies):.1f}"
+        )
@@ -0,0 +1,214 @@
+import json
+import multiprocessing
+import os
+import queue
+import resource
+import threading
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.cpu_resources import (
+    allocate_threads, available_cpus, cgroup_cpu_quota, child_cpus, cpu_budget, set_torch_threads
+)
+from core.quality import CORPUS_DIR, read_corpus
+
+# Children load their model before this barrier and the clock starts when all are ready
+LOAD_TIMEOUT = 600
+
+
+def _percentile(values, percentile):
+    ordered = sorted(values)
+    position = min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[position]
+
+
+def _parse_splits(value):
+    """[(processes, threads)] of "PxT,..." where a thread count of 0 keeps torch's default"""
+    splits = []
+    for split in value.split(','):
+        processes, _, threads = split.strip().partition('x')
+        if not processes.isdigit() or not threads.isdigit() or int(processes) < 1:
+            raise CommandError(f"Invalid split {split!r}: expected <processes>x<threads>, e.g. 4x2")
+        splits.append((int(processes), int(threads)))
+    return splits
+
+
+def default_splits(budget, concurrency):
+    """Every power-of-two process count up to the budget sharing it, plus the worker's concurrency as configured before"""
+    splits = []
+    processes = 1
+    while processes < budget:
+        splits.append((processes, budget // processes))
+        processes *= 2
+    splits.append((budget, 1))
+    splits.append((concurrency, allocate_threads(budget, concurrency)[0]))
+    splits.append((concurrency, 0))
+    return list(dict.fromkeys(splits))
+
+
+def _child(index, threads, interop_threads, cpus, sentences, options, barrier, counter, results):
+    """One pool child: translate corpus sentences taken from the shared counter until the total is reached"""
+    from core.ml_translator import load_model_and_tokenizer, translate_text
+
+    set_torch_threads(threads, interop_threads)
+    if cpus:
+        os.sched_setaffinity(0, cpus)
+    load_model_and_tokenizer(options['source'], options['target'])
+    translate_text(sentences[0], options['source'], options['target'], max_length=options['max_length'])
+    barrier.wait(timeout=LOAD_TIMEOUT)
+
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    latencies = []
+    while True:
+        with counter.get_lock():
+            item = counter.value
+            counter.value += 1
+        if item >= options['sentences']:
+            break
+        started = time.perf_counter()
+        translate_text(sentences[item % len(sentences)], options['source'], options['target'],
+                       max_length=options['max_length'])
+        latencies.append(time.perf_counter() - started)
+    after = resource.getrusage(resource.RUSAGE_SELF)
+    results.put({
+        'index': index,
+        'latencies': latencies,
+        'cpu_seconds': (after.ru_utime + after.ru_stime) - (before.ru_utime + before.ru_stime),
+        'context_switches': (after.ru_nvcsw + after.ru_nivcsw) - (before.ru_nvcsw + before.ru_nivcsw),
+    })
+
+
+class Command(BaseCommand):
+    """Django command to compare worker process x torch thread splits of the CPU budget"""
+
+    help = ('Translate corpus sentences with P processes of T torch threads each, as Celery pool children would, '
+            'for several PxT splits, and report throughput, latency, CPU use and context switches of each')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--splits', help='Comma-separated <processes>x<threads> splits, 0 threads meaning '
+                                             "torch's default (default: derived from the CPU budget)")
+        parser.add_argument('--sentences', type=int, default=256, help='Sentences translated per split, over all processes')
+        parser.add_argument('--source', default='en')
+        parser.add_argument('--target', default='es')
+        parser.add_argument('--max-length', type=int, default=400)
+        parser.add_argument('--interop-threads', type=int, default=None,
+                            help='Inter-op threads per process (default WORKER_TORCH_INTEROP_THREADS)')
+        parser.add_argument('--pin', action='store_true', help='Pin each process to its own cores')
+        parser.add_argument('--backend', choices=['marian', 'tiny'], default='marian',
+                            help='marian: the cached model of the pair; tiny: a randomly initialised small Marian model')
+        parser.add_argument('--json', dest='json_path', help='Write the results to this JSON file')
+
+    def _run_split(self, processes, threads, sentences, options):
+        context = multiprocessing.get_context('fork')
+        barrier = context.Barrier(processes + 1)
+        counter = context.Value('i', 0)
+        results = context.Queue()
+
+        budget = cpu_budget()
+        allocation = [threads] * processes
+        cpus = available_cpus()[:budget]
+        interop_threads = (options['interop_threads'] if options['interop_threads'] is not None
+                           else settings.WORKER_TORCH_INTEROP_THREADS)
+        children = [
+            context.Process(target=_child, args=(
+                index, threads, interop_threads,
+                child_cpus(cpus, allocation, index) if options['pin'] and threads else None,
+                sentences, options, barrier, counter, results
+            ))
+            for index in range(processes)
+        ]
+        for child in children:
+            child.start()
+        try:
+            barrier.wait(timeout=LOAD_TIMEOUT)
+        except threading.BrokenBarrierError:
+            for child in children:
+                child.terminate()
+            raise CommandError(f"{processes}x{threads}: processes did not load the model in {LOAD_TIMEOUT}s")
+        started = time.perf_counter()
+        reports = []
+        while len(reports) < len(children):
+            try:
+                reports.append(results.get(timeout=5))
+            except queue.Empty:
+                failed = [child for child in children if child.exitcode not in (None, 0)]
+                if failed:
+                    for child in children:
+                        child.terminate()
+                    raise CommandError(f"{processes}x{threads}: a process exited with code {failed[0].exitcode}")
+        wall_seconds = time.perf_counter() - started
+        for child in children:
+            child.join()
+
+        latencies = [latency for report in reports for latency in report['latencies']]
+        cpu_seconds = sum(report['cpu_seconds'] for report in reports)
+        context_switches = sum(report['context_switches'] for report in reports)
+        return {
+            'split': f"{processes}x{threads}",
+            'processes': processes,
+            'threads': threads,
+            'pinned': bool(options['pin'] and threads),
+            'sentences_per_second': round(len(latencies) / wall_seconds, 2),
+            'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+            'p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+            'cpus_busy': round(cpu_seconds / wall_seconds, 2),
+            'context_switches_per_sentence': round(context_switches / len(latencies), 1),
+            'wall_seconds': round(wall_seconds, 2),
+        }
+
+    def handle(self, *args, **options):
+        if not hasattr(os, 'fork'):
+            raise CommandError('The benchmark forks its processes like the Celery prefork pool and needs a POSIX system')
+        corpus = os.path.join(CORPUS_DIR, f"{options['source']}-{options['target']}.tsv")
+        if not os.path.exists(corpus):
+            raise CommandError(f"No corpus for {options['source']}-{options['target']} in {CORPUS_DIR}")
+        sentences, _ = read_corpus(corpus)
+
+        budget = cpu_budget()
+        splits = (_parse_splits(options['splits']) if options['splits']
+                  else default_splits(budget, settings.CELERY_WORKER_CONCURRENCY))
+        quota = cgroup_cpu_quota()
+        self.stdout.write(
+            f"CPU budget {budget} (cgroup quota {quota if quota is not None else 'none'}, "
+            f"{len(available_cpus())} CPUs available), backend {options['backend']}, "
+            f"{options['sentences']} sentences per split"
+        )
+        self.stdout.write(f"{'split':>7} {'threads':>7} {'sent/s':>8} {'p50 ms':>8} {'p95 ms':>8} "
+                          f"{'CPUs busy':>9} {'ctx sw/sent':>11}")
+
+        results = []
+        # Forked children inherit the overridden settings
+        with override_settings(TRANSLATION_BACKEND=options['backend'], TRANSLATION_EVENTS_ENABLED=False,
+                               TRACING_ENABLED=False, TASK_PROFILING_RATE=0):
+            for processes, threads in splits:
+                result = self._run_split(processes, threads, sentences, options)
+                results.append(result)
+                total_threads = processes * threads if threads else f"{processes}xall"
+                self.stdout.write(
+                    f"{result['split']:>7} {total_threads:>7} {result['sentences_per_second']:>8} "
+                    f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result['cpus_busy']:>9} "
+                    f"{result['context_switches_per_sentence']:>11}"
+                )
+
+        best = max(results, key=lambda result: result['sentences_per_second'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Fastest: {best['processes']} process(es) x {best['threads'] or 'default'} thread(s), "
+            f"{best['sentences_per_second']} sentences/s (CELERY_WORKER_CONCURRENCY={best['processes']}"
+            + (f", WORKER_TORCH_THREADS={best['threads']})" if best['threads'] else ", WORKER_TORCH_THREADS=0)")
+        ))
+
+        if options['json_path']:
+            report = {
+                'created_at': datetime.now(timezone.utc).isoformat(),
+                'cpu_budget': budget,
+                'cgroup_quota': quota,
+                'cpus_available': len(available_cpus()),
+                'options': {key: options[key] for key in ('sentences', 'source', 'target', 'max_length', 'pin', 'backend')},
+                'results': results,
+            }
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['json_path']}")
@@ -0,0 +1,197 @@
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from core.downloader import DownloadError, DownloadTooLarge, download
+
+MAX_BYTES = 64 * 1024
+
+PDF_BODY = b'%PDF-1.4\n' + b'0' * (40 * 1024) + b'\n%%EOF\n'
+HTML_BODY = b'<!DOCTYPE html><html><body><p>Hello</p></body></html>'
+BIG_BODY = b'x' * (MAX_BYTES + 1)
+
+# Remote files served by the stand-in server, by path
+FILES = {
+    '/book.bin': {'body': PDF_BODY, 'content_type': 'application/octet-stream', 'etag': '"v1"'},
+    '/page': {'body': HTML_BODY, 'content_type': 'text/html; charset=utf-8'},
+    '/notes.md': {'body': b'# Notes\n', 'content_type': 'application/octet-stream'},
+    '/big.txt': {'body': BIG_BODY, 'content_type': 'text/plain'},
+    '/big-chunked.txt': {'body': BIG_BODY, 'content_type': 'text/plain', 'chunked': True},
+    '/flaky.pdf': {'body': PDF_BODY, 'content_type': 'application/pdf', 'etag': '"v1"', 'cut_after': 10000},
+    '/changed.pdf': {'body': PDF_BODY, 'content_type': 'application/pdf', 'etag': '"v1"', 'cut_after': 10000},
+    '/slow.txt': {'body': b'slow', 'content_type': 'text/plain', 'delay': 2},
+    '/trickle.txt': {'body': b't' * 40, 'content_type': 'text/plain', 'trickle': 0.3},
+    '/unavailable': {'status': 503},
+    '/missing': {'status': 404},
+}
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Serves FILES with ETag/If-Range/Range support, dropping the first response of 'cut_after' files"""
+
+    protocol_version = 'HTTP/1.1'
+    requests_seen = []
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        spec = FILES.get(self.path)
+        self.requests_seen.append((self.path, self.headers.get('Range')))
+        if spec is None or 'status' in spec:
+            self.send_response(spec['status'] if spec else 404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        if spec.get('delay'):
+            time.sleep(spec['delay'])
+
+        body = spec['body']
+        start = 0
+        range_header = self.headers.get('Range')
+        if_range = self.headers.get('If-Range')
+        if range_header and (if_range is None or if_range == spec.get('etag')):
+            start = int(range_header.split('=')[1].rstrip('-'))
+            if start >= len(body):
+                self.send_response(416)
+                self.send_header('Content-Range', f"bytes */{len(body)}")
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header('Content-Range', f"bytes {start}-{len(body) - 1}/{len(body)}")
+        else:
+            self.send_response(200)
+        self.send_header('Content-Type', spec['content_type'])
+        if spec.get('etag'):
+            self.send_header('ETag', spec['etag'])
+            self.send_header('Accept-Ranges', 'bytes')
+
+        payload = body[start:]
+        if spec.get('chunked'):
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for offset in range(0, len(payload), 8192):
+                piece = payload[offset:offset + 8192]
+                self.wfile.write(f"{len(piece):x}\r\n".encode() + piece + b"\r\n")
+            self.wfile.write(b"0\r\n\r\n")
+            return
+
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        if spec.get('trickle'):
+            # One byte at a time, each within the read timeout
+            try:
+                for offset in range(len(payload)):
+                    self.wfile.write(payload[offset:offset + 1])
+                    self.wfile.flush()
+                    time.sleep(spec['trickle'])
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            return
+        if spec.get('cut_after') and start == 0:
+            # Drop the connection mid-body, once
+            self.wfile.write(payload[:spec.pop('cut_after')])
+            self.close_connection = True
+            return
+        self.wfile.write(payload)
+
+
+class Command(BaseCommand):
+    """Django command to check the URL downloader against a local stand-in HTTP server"""
+
+    help = 'Exercise timeouts, size limits, Range resume and format detection of the book downloader'
+
+    def handle(self, *args, **options):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        failures = []
+
+        def check(name, condition, detail=''):
+            if condition:
+                self.stdout.write(f"  ok    {name}")
+            else:
+                self.stdout.write(self.style.ERROR(f"  FAIL  {name} {detail}"))
+                failures.append(name)
+
+        def expect_error(url, path, error_class=DownloadError):
+            try:
+                download(url, path, max_bytes=MAX_BYTES)
+            except error_class as e:
+                return e
+            return None
+
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir, override_settings(
+                BOOK_DOWNLOAD_CONNECT_TIMEOUT=1,
+                BOOK_DOWNLOAD_READ_TIMEOUT=0.5,
+                BOOK_DOWNLOAD_MAX_SECONDS=10,
+            ):
+                def path(name):
+                    return os.path.join(temp_dir, f"{name}.part")
+
+                result = download(f"{base_url}/book.bin", path('book'), max_bytes=MAX_BYTES)
+                check("PDF detected from magic bytes", result['format'] == 'pdf', result['format'])
+                check("full body written", result['size'] == len(PDF_BODY), result['size'])
+
+                result = download(f"{base_url}/page", path('page'), max_bytes=MAX_BYTES)
+                check("HTML detected without extension", result['format'] == 'html', result['format'])
+
+                result = download(f"{base_url}/notes.md", path('notes'), max_bytes=MAX_BYTES)
+                check("format falls back to the URL extension", result['format'] == 'md', result['format'])
+
+                error = expect_error(f"{base_url}/big.txt", path('big'), DownloadTooLarge)
+                check("Content-Length over the limit is refused", error is not None)
+                check("refused download leaves no partial file", not os.path.exists(path('big')))
+
+                error = expect_error(f"{base_url}/big-chunked.txt", path('chunked'), DownloadTooLarge)
+                check("streamed body over the limit is aborted", error is not None)
+
+                error = expect_error(f"{base_url}/flaky.pdf", path('flaky'))
+                check("dropped connection is retryable", error is not None and error.retryable, error)
+                check("partial file kept for the retry", os.path.exists(path('flaky')))
+                StandInHandler.requests_seen.clear()
+                result = download(f"{base_url}/flaky.pdf", path('flaky'), max_bytes=MAX_BYTES)
+                check("retry sends a Range request", StandInHandler.requests_seen == [('/flaky.pdf', 'bytes=10000-')],
+                      StandInHandler.requests_seen)
+                check("retry resumes at the received size", result['resumed_from'] == 10000, result['resumed_from'])
+                with open(path('flaky'), 'rb') as f:
+                    resumed_hash = hashlib.sha256(f.read()).hexdigest()
+                check("resumed file is identical", resumed_hash == hashlib.sha256(PDF_BODY).hexdigest())
+
+                expect_error(f"{base_url}/changed.pdf", path('changed'))
+                FILES['/changed.pdf']['etag'] = '"v2"'
+                result = download(f"{base_url}/changed.pdf", path('changed'), max_bytes=MAX_BYTES)
+                check("changed remote file is downloaded again", result['resumed_from'] == 0
+                      and result['size'] == len(PDF_BODY), result)
+
+                error = expect_error(f"{base_url}/slow.txt", path('slow'))
+                check("read timeout is retryable", error is not None and error.retryable, error)
+
+                with override_settings(BOOK_DOWNLOAD_MAX_SECONDS=1):
+                    started = time.monotonic()
+                    error = expect_error(f"{base_url}/trickle.txt", path('trickle'))
+                    seconds = time.monotonic() - started
+                check("trickling server is cut off at the transfer limit", error is not None and error.retryable
+                      and seconds < 3, f"{error} after {seconds:.1f}s")
+
+                error = expect_error(f"{base_url}/unavailable", path('unavailable'))
+                check("503 is retryable", error is not None and error.retryable, error)
+
+                error = expect_error(f"{base_url}/missing", path('missing'))
+                check("404 is not retryable", error is not None and not error.retryable, error)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        if failures:
+            raise CommandError(f"{len(failures)} downloader check(s) failed: {', '.join(failures)}")
+        self.stdout.write(self.style.SUCCESS("All downloader checks passed"))
@@ -0,0 +1,81 @@
+import os
+import re
+import subprocess
+import sys
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Packages the web process must not import at startup
+DEFAULT_FORBIDDEN = ('torch', 'transformers')
+
+# Mirrors what a web worker imports before serving its first request
+WEB_STARTUP_SCRIPT = """
+import django
+django.setup()
+import importlib
+importlib.import_module(django.conf.settings.ROOT_URLCONF)
+"""
+
+# "import time:      self [us] | cumulative | imported package"
+IMPORT_TIME_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+
+def parse_import_time(stderr: str):
+    """Return (module, self_us, cumulative_us, depth) rows from -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+class Command(BaseCommand):
+    """Django command to check that the web process starts without importing the ML stack"""
+
+    help = 'Import the URL conf with -X importtime in a subprocess and fail if torch or transformers get imported'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--forbid', action='append',
+            help=f"Top-level package that must not be imported (default: {', '.join(DEFAULT_FORBIDDEN)})"
+        )
+        parser.add_argument('--top', type=int, default=15, help='Number of slowest top-level imports to print')
+
+    def handle(self, *args, **options):
+        forbidden = tuple(options['forbid'] or DEFAULT_FORBIDDEN)
+
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'book_translator.settings'),
+            # Startup model warm-up is opt-in and imports the ML stack on purpose
+            'SNIPPET_WARM_PAIRS': '',
+        }
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', WEB_STARTUP_SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True
+        )
+        rows = parse_import_time(result.stderr)
+        if result.returncode != 0:
+            errors = "\n".join(line for line in result.stderr.splitlines() if not line.startswith('import time:'))
+            raise CommandError(f"Importing the URL conf failed:\n{errors}")
+
+        top_level = sorted((row for row in rows if row[3] == 0), key=lambda row: row[2], reverse=True)
+        total_us = sum(row[2] for row in top_level)
+        self.stdout.write(f"Web startup imports: {len(rows)} modules, {total_us / 1000:.1f} ms")
+        for module, _, cumulative_us, _ in top_level[:options['top']]:
+            self.stdout.write(f"  {cumulative_us / 1000:9.1f} ms  {module}")
+
+        offending = sorted({
+            module for module, _, _, _ in rows
+            if module.split('.')[0] in forbidden
+        })
+        if offending:
+            raise CommandError(
+                f"The web process imports {', '.join(forbidden)} at startup: {', '.join(offending[:10])}"
+            )
+        self.stdout.write(self.style.SUCCESS(f"No {', '.join(forbidden)} imports at web startup"))
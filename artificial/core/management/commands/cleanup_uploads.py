@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from books.uploads import cleanup_expired_sessions
+
+
+class Command(BaseCommand):
+    """Django command to delete expired resumable upload sessions"""
+
+    help = 'Delete expired upload sessions and the partial files of unfinished uploads'
+
+    def handle(self, *args, **options):
+        count = cleanup_expired_sessions()
+        self.stdout.write(self.style.SUCCESS(f'Deleted {count} expired upload session(s)'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from translations.compaction import compact_translation_chunks
+from translations.models import Translation
+from translations.schemas import TranslationStatus
+
+
+class Command(BaseCommand):
+    """Django command to compact completed translations that still use per-chunk rows"""
+
+    help = 'Pack the chunks of completed translations into compressed segment rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('translation_ids', nargs='*', type=int, help='Translations to compact (default: all completed)')
+
+    def handle(self, *args, **options):
+        translations = Translation.objects.filter(
+            status=TranslationStatus.COMPLETED.value,
+            is_compacted=False
+        )
+        if options['translation_ids']:
+            translations = translations.filter(id__in=options['translation_ids'])
+
+        for translation_id in translations.values_list('id', flat=True).iterator():
+            try:
+                result = compact_translation_chunks(translation_id)
+            except ValueError as e:
+                self.stdout.write(self.style.WARNING(f'Skipped translation {translation_id}: {e}'))
+                continue
+            if result['compacted']:
+                self.stdout.write(
+                    f"Compacted translation {translation_id}: {result['chunk_count']} chunks, "
+                    f"{result['original_size']} -> {result['compressed_size']} bytes"
+                )
+        self.stdout.write(self.style.SUCCESS('Compaction finished'))
@@ -0,0 +1,95 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from translations.models import Translation
+from translations.tracing import build_trace
+
+# Thread ids of the rows of each translation in the trace viewer; sampled spans
+# get one row per worker process after these
+STAGES_TID = 1
+CRITICAL_PATH_TID = 2
+
+
+def _microseconds(seconds):
+    return int(round(seconds * 1_000_000))
+
+
+def chrome_trace_events(trace, pid):
+    """Events of a translation trace in the Chrome trace event format (chrome://tracing, Perfetto)"""
+    events = [
+        {'ph': 'M', 'pid': pid, 'name': 'process_name', 'args': {'name': f"translation {trace['translation_id']}"}},
+        {'ph': 'M', 'pid': pid, 'tid': STAGES_TID, 'name': 'thread_name', 'args': {'name': 'stages (first to last span)'}},
+        {'ph': 'M', 'pid': pid, 'tid': CRITICAL_PATH_TID, 'name': 'thread_name', 'args': {'name': 'critical path'}},
+    ]
+    for stage in trace['stages']:
+        events.append({
+            'ph': 'X', 'pid': pid, 'tid': STAGES_TID, 'name': stage['stage'], 'cat': 'stage',
+            'ts': _microseconds(stage['start_offset']),
+            'dur': _microseconds(stage['end_offset'] - stage['start_offset']),
+            'args': {key: stage[key] for key in ('count', 'total_seconds', 'mean_seconds', 'max_seconds')},
+        })
+
+    offset = 0.0
+    for phase in trace['critical_path']:
+        events.append({
+            'ph': 'X', 'pid': pid, 'tid': CRITICAL_PATH_TID, 'name': phase['phase'], 'cat': 'critical_path',
+            'ts': _microseconds(offset), 'dur': _microseconds(phase['seconds']), 'args': phase['stages'],
+        })
+        offset += phase['seconds']
+
+    workers = {}
+    for span in trace.get('spans', []):
+        if span['worker'] not in workers:
+            workers[span['worker']] = CRITICAL_PATH_TID + 1 + len(workers)
+            events.append({'ph': 'M', 'pid': pid, 'tid': workers[span['worker']], 'name': 'thread_name',
+                           'args': {'name': span['worker']}})
+        events.append({
+            'ph': 'X', 'pid': pid, 'tid': workers[span['worker']], 'name': span['stage'], 'cat': 'span',
+            'ts': _microseconds(span['start_offset']), 'dur': _microseconds(span['seconds']),
+            'args': {'chunk_index': span['chunk_index']},
+        })
+    return events
+
+
+class Command(BaseCommand):
+    """Django command to export translation traces to a local file"""
+
+    help = 'Export the trace of translations as a Chrome trace event file (chrome://tracing, ui.perfetto.dev) or JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('translation_ids', nargs='+', type=int, help='IDs of the translations to export')
+        parser.add_argument('--output', help='Output file (default: trace_<first id>.json)')
+        parser.add_argument('--format', choices=['chrome', 'json'], default='chrome',
+                            help='chrome: trace event format; json: the /trace API payloads')
+        parser.add_argument('--no-spans', action='store_true', help='Leave out the sampled spans')
+
+    def handle(self, *args, **options):
+        translations = Translation.objects.in_bulk(options['translation_ids'])
+        missing = [str(translation_id) for translation_id in options['translation_ids'] if translation_id not in translations]
+        if missing:
+            raise CommandError(f"Translation(s) not found: {', '.join(missing)}")
+
+        traces = [
+            build_trace(translations[translation_id], include_spans=not options['no_spans'])
+            for translation_id in options['translation_ids']
+        ]
+        if options['format'] == 'chrome':
+            events = []
+            for pid, trace in enumerate(traces, start=1):
+                events.extend(chrome_trace_events(trace, pid))
+            payload = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        else:
+            payload = traces
+
+        output = options['output'] or f"trace_{options['translation_ids'][0]}.json"
+        with open(output, 'w') as f:
+            json.dump(payload, f, cls=DjangoJSONEncoder)
+
+        for trace in traces:
+            path = ', '.join(f"{phase['phase']} {phase['seconds']:.1f}s" for phase in trace['critical_path'])
+            self.stdout.write(
+                f"Translation {trace['translation_id']}: {trace['wall_seconds']:.1f}s wall, "
+                f"dominated by {trace['dominant_phase'] or 'nothing recorded'} ({path or 'no stages'})"
+            )
+        self.stdout.write(self.style.SUCCESS(f"Trace written to {output}"))
@@ -0,0 +1,83 @@
+import json
+import os
+import zipfile
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+
+from books.ingest import (
+    FAILED, REJECTED,
+    candidates_from_directory, candidates_from_manifest, candidates_from_zip,
+    create_ingest_job, read_manifest, run_ingest_job, serialize_ingest_job
+)
+from books.schemas import LanguageEnum
+from books.tasks import run_ingest_pipeline
+
+
+class Command(BaseCommand):
+    """Django command to ingest a catalog of books from a directory, a ZIP archive or a manifest"""
+
+    help = 'Create books in bulk from a local directory, a ZIP archive or a JSON manifest, with a per-item report'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Directory, .zip archive or .json manifest (files relative to it)')
+        parser.add_argument('--source', default='en', choices=[language.value for language in LanguageEnum],
+                            help='Source language of entries that do not set one')
+        parser.add_argument('--target', default='es', choices=[language.value for language in LanguageEnum],
+                            help='Target language of entries that do not set one')
+        parser.add_argument('--extract', action='store_true', help='Extract and segment every book after storing it')
+        parser.add_argument('--chunk-size', type=int, default=1, help='Chunk size of the segmentation')
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='Downloads/extractions in flight (default: BULK_INGEST_CONCURRENCY)')
+        parser.add_argument('--dispatch', action='store_true',
+                            help='Run downloads/extractions on the Celery workers instead of in this process')
+        parser.add_argument('--report', help='Write the per-item report to this JSON file')
+
+    def _candidates(self, path, defaults):
+        if os.path.isdir(path):
+            return 'directory', candidates_from_directory(path, defaults)
+        if zipfile.is_zipfile(path):
+            return 'zip', candidates_from_zip(zipfile.ZipFile(path), defaults)
+        if path.endswith('.json'):
+            base_dir = os.path.dirname(os.path.abspath(path))
+            with open(path, 'rb') as f:
+                entries = read_manifest(f.read())
+
+            def open_file(name):
+                file_path = os.path.join(base_dir, name)
+                if not os.path.isfile(file_path):
+                    return None
+                return (lambda: open(file_path, 'rb')), os.path.getsize(file_path)
+
+            return 'manifest', candidates_from_manifest(entries, defaults, open_file)
+        raise CommandError(f"Not a directory, ZIP archive or JSON manifest: {path}")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f"Path not found: {path}")
+
+        defaults = {'source_language': options['source'], 'target_language': options['target']}
+        source, candidates = self._candidates(path, defaults)
+        try:
+            job = create_ingest_job(candidates, source=source, extract=options['extract'], chunk_size=options['chunk_size'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(f"Ingest job {job.id}: {job.total_items} item(s) from {source} {path}")
+
+        if options['dispatch']:
+            run_ingest_pipeline.delay(job.id)
+            self.stdout.write(self.style.SUCCESS(f"Pipeline dispatched; follow it with GET /api/books/bulk/{job.id}"))
+            return
+
+        job = run_ingest_job(job.id, concurrency=options['concurrency'])
+        report = serialize_ingest_job(job)
+        for item in report['items']:
+            if item['status'] in (FAILED, REJECTED):
+                self.stdout.write(self.style.WARNING(f"  {item['status']:10} {item['name']}: {item['error']}"))
+        if options['report']:
+            with open(options['report'], 'w') as f:
+                json.dump(report, f, cls=DjangoJSONEncoder, indent=2)
+            self.stdout.write(f"Report written to {options['report']}")
+
+        counts = ', '.join(f"{count} {status}" for status, count in sorted(report['counts'].items()))
+        self.stdout.write(self.style.SUCCESS(f"Ingest job {job.id} completed: {counts}"))
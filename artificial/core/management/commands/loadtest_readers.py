@@ -0,0 +1,155 @@
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand, CommandError
+import requests
+
+# API prefixes of the sync endpoints and of their async variants
+VARIANTS = {
+    'sync': '/api',
+    'async': '/api/async',
+}
+
+
+def _percentile(values, percentile):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percentile / 100))]
+
+
+class Command(BaseCommand):
+    """Django command to compare concurrent-reader throughput of the sync and async read endpoints"""
+
+    help = 'Load test the translation read endpoints with concurrent readers against running servers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', default=[],
+            help='name=base URL of a running server (repeatable), e.g. wsgi=http://localhost:8000 asgi=http://localhost:8001'
+        )
+        parser.add_argument('--translation', type=int, required=True, help='ID of a translation to read')
+        parser.add_argument('--variant', action='append', choices=list(VARIANTS),
+                            help='Endpoint variants to test (default: sync and async)')
+        parser.add_argument('--concurrency', default='1,8,32,64', help='Comma-separated numbers of concurrent readers')
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per run')
+        parser.add_argument('--sse', type=int, default=0,
+                            help='Idle Server-Sent Event streams held open during each run')
+        parser.add_argument('--json', dest='json_path', help='Write the results to this JSON file')
+
+    def _paths(self, base_url, prefix, translation_id):
+        response = requests.get(f"{base_url}{prefix}/translations/{translation_id}", timeout=30)
+        if response.status_code != 200:
+            raise CommandError(f"{base_url}: translation {translation_id} answered {response.status_code}")
+        translation = response.json()
+        book_id = translation['book']['id']
+        language = translation['target_language']
+        return [
+            f"{prefix}/translations/{translation_id}",
+            f"{prefix}/translations/{translation_id}/chunks?limit=100&include_text=true",
+            f"{prefix}/translations/{translation_id}/paginated?page=1",
+            f"{prefix}/translations/{translation_id}/paginated?page=2",
+            f"{prefix}/translations/book/{book_id}/language/{language}",
+        ]
+
+    def _hold_event_streams(self, base_url, prefix, translation_id, count, stop):
+        """Open idle SSE connections, as browser tabs following a translation do"""
+        def hold():
+            try:
+                with requests.get(f"{base_url}{prefix}/translations/{translation_id}/events",
+                                  stream=True, timeout=(5, None)) as response:
+                    for _ in response.iter_lines():
+                        if stop.is_set():
+                            return
+            except requests.RequestException:
+                pass
+
+        threads = [threading.Thread(target=hold, daemon=True) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    def _run(self, base_url, paths, concurrency, duration):
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+        deadline = time.monotonic() + duration
+
+        def reader(offset):
+            session = requests.Session()
+            own_latencies = []
+            own_errors = 0
+            position = offset
+            while time.monotonic() < deadline:
+                path = paths[position % len(paths)]
+                position += 1
+                started = time.perf_counter()
+                try:
+                    response = session.get(f"{base_url}{path}", timeout=30)
+                    response.content
+                    if response.status_code != 200:
+                        own_errors += 1
+                        continue
+                except requests.RequestException:
+                    own_errors += 1
+                    continue
+                own_latencies.append(time.perf_counter() - started)
+            with lock:
+                latencies.extend(own_latencies)
+                errors[0] += own_errors
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for offset in range(concurrency):
+                executor.submit(reader, offset)
+        elapsed = time.monotonic() - started
+
+        return {
+            'requests': len(latencies),
+            'errors': errors[0],
+            'requests_per_second': round(len(latencies) / elapsed, 1),
+            'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+            'p99_ms': round(_percentile(latencies, 99) * 1000, 1),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 1) if latencies else 0.0,
+        }
+
+    def handle(self, *args, **options):
+        targets = {}
+        for target in options['target'] or ['local=http://localhost:8000']:
+            name, _, url = target.partition('=')
+            if not url:
+                raise CommandError(f"Targets are given as name=URL, got {target}")
+            targets[name] = url.rstrip('/')
+        variants = options['variant'] or list(VARIANTS)
+        levels = [int(level) for level in options['concurrency'].split(',')]
+
+        results = []
+        self.stdout.write(f"{'target':10} {'variant':8} {'readers':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        for name, base_url in targets.items():
+            for variant in variants:
+                prefix = VARIANTS[variant]
+                paths = self._paths(base_url, prefix, options['translation'])
+                for path in paths:
+                    # Warm up the response cache and the connection pools
+                    requests.get(f"{base_url}{path}", timeout=30)
+
+                for concurrency in levels:
+                    stop = threading.Event()
+                    streams = self._hold_event_streams(base_url, prefix, options['translation'], options['sse'], stop)
+                    try:
+                        result = self._run(base_url, paths, concurrency, options['duration'])
+                    finally:
+                        stop.set()
+                    result.update(target=name, variant=variant, readers=concurrency, sse=len(streams))
+                    results.append(result)
+                    self.stdout.write(
+                        f"{name:10} {variant:8} {concurrency:>7} {result['requests_per_second']:>9} "
+                        f"{result['p50_ms']:>8} {result['p99_ms']:>8} {result['errors']:>7}"
+                    )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(f"Results written to {options['json_path']}")
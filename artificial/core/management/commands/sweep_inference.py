@@ -0,0 +1,260 @@
+import copy
+import gc
+import itertools
+import json
+import os
+import resource
+import time
+from datetime import datetime, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.cpu_resources import cpu_budget
+from core.inference_config import PRECISIONS, save_inference_configs
+from core.languages import get_model_name
+from core.ml_translator import apply_precision
+from core.quality import CORPUS_DIR, corpus_bleu, corpus_chrf, read_corpus
+
+
+def _percentile(values, percentile):
+    ordered = sorted(values)
+    position = min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[position]
+
+
+def _rss_mb():
+    """Current resident memory of the process (peak RSS where /proc is not available)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _int_list(value):
+    return [int(item) for item in value.split(',') if item.strip()]
+
+
+def pareto_front(results):
+    """
+    Configurations no other one beats on throughput, p95 latency and chrF at
+    once (at least as good on all three and better on one)
+    """
+    def dominates(a, b):
+        at_least = (a['sentences_per_second'] >= b['sentences_per_second'] and a['p95_ms'] <= b['p95_ms']
+                    and a['chrf'] >= b['chrf'])
+        better = (a['sentences_per_second'] > b['sentences_per_second'] or a['p95_ms'] < b['p95_ms']
+                  or a['chrf'] > b['chrf'])
+        return at_least and better
+
+    return [result for result in results if not any(dominates(other, result) for other in results)]
+
+
+def recommend(results, quality_tolerance):
+    """The fastest Pareto-optimal configuration whose chrF is within quality_tolerance of the best one"""
+    front = pareto_front(results)
+    best_chrf = max(result['chrf'] for result in front)
+    candidates = [result for result in front if result['chrf'] >= best_chrf - quality_tolerance]
+    return max(candidates, key=lambda result: (result['sentences_per_second'], -result['p95_ms']))
+
+
+class Command(BaseCommand):
+    """Django command to sweep inference settings on a bundled parallel corpus and pick one per language pair"""
+
+    help = ('Translate a small parallel corpus with every combination of batch size, beams, precision, threads '
+            'and max length, report throughput, latency percentiles, RSS, BLEU and chrF, and recommend a '
+            'Pareto-optimal configuration per language pair (saved for core.ml_translator with --save)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pairs', help='Comma-separated src-tgt pairs (default: every pair with a corpus file)')
+        parser.add_argument('--corpus-dir', default=CORPUS_DIR, help='Directory of <src>-<tgt>.tsv corpus files')
+        parser.add_argument('--batch-sizes', default='1,8,16')
+        parser.add_argument('--beams', default='1,2,4')
+        parser.add_argument('--precisions', default='fp32,int8', help=f"Any of {', '.join(PRECISIONS)}")
+        parser.add_argument('--threads', help='Comma-separated torch thread counts (default: 1 and the CPU budget)')
+        parser.add_argument('--max-lengths', default='128,512')
+        parser.add_argument('--repeat', type=int, default=1, help='Passes over the corpus per configuration')
+        parser.add_argument('--quality-tolerance', type=float, default=0.5,
+                            help='chrF points the recommendation may lose against the best configuration for speed')
+        parser.add_argument('--allow-download', action='store_true',
+                            help='Download models that are not in the local cache instead of skipping their pair')
+        parser.add_argument('--save', action='store_true', help='Save the recommendations to INFERENCE_CONFIG_PATH')
+        parser.add_argument('--json', dest='json_path', help='Write every measurement to this JSON file')
+
+    def _pairs(self, options):
+        available = sorted(name[:-len('.tsv')] for name in os.listdir(options['corpus_dir']) if name.endswith('.tsv'))
+        if not options['pairs']:
+            return available
+        pairs = [pair.strip() for pair in options['pairs'].split(',') if pair.strip()]
+        missing = [pair for pair in pairs if pair not in available]
+        if missing:
+            raise CommandError(f"No corpus for {', '.join(missing)} in {options['corpus_dir']}")
+        return pairs
+
+    def _load(self, pair, options):
+        """Model and tokenizer of the pair from the local model cache, or None when not cached"""
+        from transformers import MarianMTModel, MarianTokenizer
+
+        source_lang, target_lang = pair.split('-')
+        model_name = get_model_name(source_lang, target_lang)
+        kwargs = {
+            'cache_dir': os.path.join(settings.BASE_DIR, 'ml_models'),
+            'revision': settings.TRANSLATION_MODEL_REVISION,
+            'local_files_only': not options['allow_download'],
+        }
+        try:
+            tokenizer = MarianTokenizer.from_pretrained(model_name, **kwargs)
+            model = MarianMTModel.from_pretrained(model_name, **kwargs).eval()
+        except OSError:
+            self.stderr.write(f"{pair}: {model_name} is not in the local model cache, skipped (see --allow-download)")
+            return None, None
+        return model, tokenizer
+
+    def _measure(self, model, tokenizer, sources, references, batch_size, num_beams, max_length, repeat):
+        import torch
+
+        batches = [sources[offset:offset + batch_size] for offset in range(0, len(sources), batch_size)]
+        encoded_batches = [
+            tokenizer(batch, return_tensors='pt', padding=True, max_length=max_length, truncation=True)
+            for batch in batches
+        ]
+        latencies = []
+        output_tokens = 0
+        with torch.no_grad():
+            # Warm-up, so one-off allocations are not charged to the first batch
+            model.generate(**encoded_batches[0], max_length=max_length, num_beams=num_beams)
+            started = time.perf_counter()
+            for _ in range(repeat):
+                hypotheses = []
+                for encoded in encoded_batches:
+                    batch_started = time.perf_counter()
+                    generated = model.generate(**encoded, max_length=max_length, num_beams=num_beams)
+                    latencies.append(time.perf_counter() - batch_started)
+                    output_tokens += int((generated != tokenizer.pad_token_id).sum())
+                    hypotheses.extend(tokenizer.batch_decode(generated, skip_special_tokens=True))
+            seconds = time.perf_counter() - started
+
+        return {
+            'sentences_per_second': round(len(sources) * repeat / seconds, 2),
+            'output_tokens_per_second': round(output_tokens / seconds, 1),
+            'p50_ms': round(_percentile(latencies, 50) * 1000, 1),
+            'p95_ms': round(_percentile(latencies, 95) * 1000, 1),
+            'rss_mb': round(_rss_mb(), 1),
+            'bleu': round(corpus_bleu(hypotheses, references), 2),
+            'chrf': round(corpus_chrf(hypotheses, references), 2),
+        }
+
+    def _sweep_pair(self, pair, grid, options):
+        import torch
+
+        base, tokenizer = self._load(pair, options)
+        if base is None:
+            return []
+        sources, references = read_corpus(os.path.join(options['corpus_dir'], f"{pair}.tsv"))
+        self.stdout.write(f"\n{pair}: {len(sources)} sentences")
+        self.stdout.write(
+            f"{'batch':>5} {'beams':>5} {'prec':>5} {'thr':>3} {'maxlen':>6} {'sent/s':>8} {'tok/s':>8} "
+            f"{'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} {'BLEU':>6} {'chrF':>6}"
+        )
+        results = []
+        default_threads = torch.get_num_threads()
+        try:
+            for precision in grid['precisions']:
+                try:
+                    model = apply_precision(copy.deepcopy(base), precision)
+                except RuntimeError as e:
+                    self.stderr.write(f"{pair}: {precision} is not supported here, skipped: {str(e)}")
+                    continue
+                for threads, batch_size, num_beams, max_length in itertools.product(
+                        grid['threads'], grid['batch_sizes'], grid['beams'], grid['max_lengths']):
+                    torch.set_num_threads(threads)
+                    config = {
+                        'batch_size': batch_size, 'num_beams': num_beams, 'precision': precision,
+                        'threads': threads, 'max_length': max_length,
+                    }
+                    try:
+                        measured = self._measure(model, tokenizer, sources, references, batch_size, num_beams,
+                                                 max_length, options['repeat'])
+                    except RuntimeError as e:
+                        self.stderr.write(f"{pair}: {config} failed: {str(e)}")
+                        continue
+                    result = {'pair': pair, **config, **measured}
+                    results.append(result)
+                    self.stdout.write(
+                        f"{batch_size:>5} {num_beams:>5} {precision:>5} {threads:>3} {max_length:>6} "
+                        f"{result['sentences_per_second']:>8} {result['output_tokens_per_second']:>8} "
+                        f"{result['p50_ms']:>8} {result['p95_ms']:>8} {result['rss_mb']:>8} "
+                        f"{result['bleu']:>6} {result['chrf']:>6}"
+                    )
+                del model
+                gc.collect()
+        finally:
+            torch.set_num_threads(default_threads)
+        return results
+
+    def handle(self, *args, **options):
+        try:
+            import torch
+        except ImportError:
+            raise CommandError('The sweep runs the models and needs torch and transformers installed')
+
+        grid = {
+            'batch_sizes': _int_list(options['batch_sizes']),
+            'beams': _int_list(options['beams']),
+            'precisions': [precision.strip() for precision in options['precisions'].split(',') if precision.strip()],
+            'threads': _int_list(options['threads']) if options['threads'] else sorted({1, cpu_budget()}),
+            'max_lengths': _int_list(options['max_lengths']),
+        }
+        unknown = [precision for precision in grid['precisions'] if precision not in PRECISIONS]
+        if unknown:
+            raise CommandError(f"Unknown precision(s): {', '.join(unknown)}. Supported: {', '.join(PRECISIONS)}")
+        if not all(grid.values()):
+            raise CommandError('Every swept parameter needs at least one value')
+
+        results = []
+        recommendations = {}
+        swept_at = datetime.now(timezone.utc).isoformat()
+        for pair in self._pairs(options):
+            pair_results = self._sweep_pair(pair, grid, options)
+            if not pair_results:
+                continue
+            results.extend(pair_results)
+            front = pareto_front(pair_results)
+            chosen = recommend(pair_results, options['quality_tolerance'])
+            self.stdout.write(f"{pair}: {len(front)} Pareto-optimal configuration(s) of {len(pair_results)}")
+            self.stdout.write(self.style.SUCCESS(
+                f"{pair}: recommended batch {chosen['batch_size']}, beams {chosen['num_beams']}, "
+                f"{chosen['precision']}, {chosen['threads']} thread(s), max length {chosen['max_length']} "
+                f"({chosen['sentences_per_second']} sent/s, p95 {chosen['p95_ms']} ms, chrF {chosen['chrf']})"
+            ))
+            recommendations[pair] = {
+                **{key: chosen[key] for key in ('batch_size', 'num_beams', 'precision', 'threads', 'max_length')},
+                'measured': {key: chosen[key] for key in (
+                    'sentences_per_second', 'output_tokens_per_second', 'p50_ms', 'p95_ms', 'rss_mb', 'bleu', 'chrf'
+                )},
+                'swept_at': swept_at,
+            }
+
+        if not results:
+            raise CommandError('Nothing was measured: no language pair had a cached model')
+
+        if options['json_path']:
+            report = {
+                'created_at': swept_at,
+                'torch': torch.__version__,
+                'cpu_count': os.cpu_count(),
+                'grid': grid,
+                'results': results,
+                'pareto_front': {pair: pareto_front([r for r in results if r['pair'] == pair]) for pair in recommendations},
+                'recommendations': recommendations,
+            }
+            with open(options['json_path'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Results written to {options['json_path']}")
+
+        if options['save']:
+            save_inference_configs(recommendations)
+            self.stdout.write(self.style.SUCCESS(
+                f"Saved {len(recommendations)} configuration(s) to {settings.INFERENCE_CONFIG_PATH}; "
+                'workers reload the models whose precision changed on their next translation'
+            ))
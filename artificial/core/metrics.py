@@ -0,0 +1,153 @@
+import glob
+import logging
+import os
+import time
+from django.http import HttpResponse
+from prometheus_client import (
+    CollectorRegistry, Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, REGISTRY,
+    generate_latest, multiprocess, start_http_server
+)
+
+logger = logging.getLogger(__name__)
+
+# Prometheus metrics of the translation pipeline, for capacity planning.
+#
+# A process serves its own metrics unless PROMETHEUS_MULTIPROC_DIR is set:
+# then every process (Celery prefork children, gunicorn workers) writes its
+# samples to files in that directory and the exporter aggregates them. The
+# variable must be set before prometheus_client is imported, i.e. in the
+# environment of the service, with one directory per service.
+MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if MULTIPROC_DIR:
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+
+SHORT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+LONG_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 900)
+
+# Extraction and segmentation
+BOOK_EXTRACTION_SECONDS = Histogram(
+    'book_extraction_seconds', 'Time to extract the text of a book file', ['format'],
+    buckets=LONG_BUCKETS
+)
+BOOK_EXTRACTED_CHARS = Counter(
+    'book_extracted_chars_total', 'Characters extracted from book files', ['format']
+)
+BOOK_SEGMENTATION_SECONDS = Histogram(
+    'book_segmentation_seconds', 'Time to split extracted text into source segments',
+    buckets=SHORT_BUCKETS
+)
+BOOK_SEGMENTS = Counter('book_segments_total', 'Source segments created by extraction')
+
+# Celery queues
+TASK_QUEUE_WAIT_SECONDS = Histogram(
+    'celery_task_queue_wait_seconds', 'Time between publishing a task and a worker starting it', ['task'],
+    buckets=(0.05, 0.1, 0.5, 1, 5, 15, 60, 300, 900, 1800, 3600, 4 * 3600)
+)
+
+# Model inference
+TRANSLATE_SECONDS = Histogram(
+    'translate_text_seconds', 'Generate time of a translate_text call', ['pair'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+)
+TRANSLATE_TOKENS = Counter(
+    'translation_tokens_total', 'Tokens encoded (in) and generated (out) by translate_text', ['pair', 'direction']
+)
+TRANSLATE_OUTPUT_TOKENS_PER_SECOND = Histogram(
+    'translate_text_output_tokens_per_second', 'Generated tokens per second of a translate_text call', ['pair'],
+    buckets=(1, 2.5, 5, 10, 20, 40, 80, 160, 320)
+)
+MODEL_LOAD_SECONDS = Histogram(
+    'translation_model_load_seconds', 'Time to load the model and tokenizer of a language pair', ['pair'],
+    buckets=(0.5, 1, 2.5, 5, 10, 30, 60, 120)
+)
+MODEL_LOADS = Counter('translation_model_loads_total', 'Models loaded into a process cache', ['pair'])
+MODEL_EVICTIONS = Counter('translation_model_evictions_total', 'Models evicted from a process cache', ['pair'])
+MODELS_LOADED = Gauge(
+    'translation_models_loaded', 'Models held in the caches of live processes', multiprocess_mode='livesum'
+)
+
+# Whole translations
+TRANSLATION_SECONDS = Histogram(
+    'translation_duration_seconds', 'Time from creating a translation to its completion', ['pair', 'mode'],
+    buckets=(10, 30, 60, 300, 900, 1800, 3600, 2 * 3600, 4 * 3600, 12 * 3600, 24 * 3600)
+)
+TRANSLATION_CHARS_PER_SECOND = Histogram(
+    'translation_throughput_chars_per_second', 'Source characters per second of completed translations', ['pair', 'mode'],
+    buckets=(5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+)
+
+
+def record_translate_call(pair: str, stats: dict):
+    """Record the latency and token counts of one translate_text call (stats as returned with the translation)"""
+    TRANSLATE_SECONDS.labels(pair).observe(stats['seconds'])
+    TRANSLATE_TOKENS.labels(pair, 'in').inc(stats['input_tokens'])
+    TRANSLATE_TOKENS.labels(pair, 'out').inc(stats['output_tokens'])
+    if stats['seconds'] > 0:
+        TRANSLATE_OUTPUT_TOKENS_PER_SECOND.labels(pair).observe(stats['output_tokens'] / stats['seconds'])
+
+
+def record_translation_completed(pair: str, mode: str, seconds: float, source_chars: int):
+    """Record the duration and throughput of a translation that just completed"""
+    TRANSLATION_SECONDS.labels(pair, mode).observe(seconds)
+    if seconds > 0:
+        TRANSLATION_CHARS_PER_SECOND.labels(pair, mode).observe(source_chars / seconds)
+
+
+def get_registry():
+    """Registry to expose: the samples of every process when running in multiprocess mode"""
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return registry
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint of the web process (GET /metrics)"""
+    return HttpResponse(generate_latest(get_registry()), content_type=CONTENT_TYPE_LATEST)
+
+
+def clear_multiproc_dir():
+    """
+    Remove the sample files left by earlier runs, keeping those of this
+    process. Counters would otherwise carry over from the previous start.
+    """
+    if not MULTIPROC_DIR:
+        return
+    own_suffix = f"_{os.getpid()}.db"
+    for path in glob.glob(os.path.join(MULTIPROC_DIR, '*.db')):
+        if not path.endswith(own_suffix):
+            os.remove(path)
+
+
+def mark_process_dead(pid: int):
+    """Drop the live gauges of an exited worker process"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+# Celery signal handlers, connected in book_translator/celery.py
+
+def stamp_published_at(headers=None, **kwargs):
+    """before_task_publish: record when the task was queued in its message headers"""
+    if headers is not None:
+        headers['published_at'] = time.time()
+
+
+def observe_queue_wait(task=None, **kwargs):
+    """task_prerun: observe how long the task waited in the queue"""
+    published_at = getattr(task.request, 'published_at', None)
+    # Tasks with a countdown/ETA wait on purpose
+    if published_at is None or task.request.eta:
+        return
+    TASK_QUEUE_WAIT_SECONDS.labels(task.name).observe(max(0.0, time.time() - published_at))
+
+
+def start_worker_exporter(port: int):
+    """Serve the metrics of the worker and of all its pool processes on port (0 disables)"""
+    if not port:
+        return
+    if not MULTIPROC_DIR:
+        logger.warning("PROMETHEUS_MULTIPROC_DIR is not set: the worker exporter only sees its own process")
+    start_http_server(port, registry=get_registry())
+    logger.info(f"Serving worker metrics on port {port}")
@@ -1,41 +1,204 @@
-from transformers import MarianMTModel, MarianTokenizer
-import torch
 import os
-import re
+import time
 import logging
-from typing import List
+from collections import OrderedDict
+from threading import Lock, Thread
+from typing import Dict, Iterator, List, Tuple
 from django.conf import settings
 
-# Cache for loaded models and tokenizers
-_model_cache = {}
+# Language metadata and text splitting do not need the ML stack; they are
+# re-exported here for existing callers. torch and transformers are imported
+# inside the functions that run a model, so importing this module stays cheap
+# for the web process and management commands.
+from core.languages import get_model_name, get_supported_languages  # noqa: F401
+from core.text_splitter import split_text_into_chunks  # noqa: F401
+from core.inference_config import get_inference_config
+from core.metrics import (
+    MODEL_EVICTIONS, MODEL_LOAD_SECONDS, MODEL_LOADS, MODELS_LOADED, record_translate_call
+)
+from core.tracing import trace_stage
+
+logger = logging.getLogger(__name__)
+
+# Cache for loaded models (least recently used first, at most
+# TRANSLATION_MODEL_CACHE_SIZE per process) and tokenizers
+_model_cache = OrderedDict()
 _tokenizer_cache = {}
+# Snippet batchers, the warm-up and the worker load models from several
+# threads: _cache_lock guards the caches, and one lock per model makes
+# concurrent callers wait for a single load
+_cache_lock = Lock()
+_load_locks = {}
+
+def _tiny_model(tokenizer):
+    """A small randomly initialised Marian model with the vocabulary of tokenizer (TRANSLATION_BACKEND=tiny)"""
+    import torch
+    from transformers import MarianConfig, MarianMTModel
+    
+    torch.manual_seed(0)
+    config = MarianConfig(
+        vocab_size=tokenizer.vocab_size,
+        decoder_vocab_size=tokenizer.vocab_size,
+        d_model=64,
+        encoder_layers=2,
+        decoder_layers=2,
+        encoder_attention_heads=4,
+        decoder_attention_heads=4,
+        encoder_ffn_dim=256,
+        decoder_ffn_dim=256,
+        max_position_embeddings=512,
+        pad_token_id=tokenizer.pad_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        decoder_start_token_id=tokenizer.pad_token_id,
+    )
+    return MarianMTModel(config).eval()
+
+def _fake_translation(text: str, target_lang: str) -> Tuple[str, Dict]:
+    """
+    Deterministic stand-in for the model (TRANSLATION_BACKEND=fake): tags the
+    text with the target language after sleeping FAKE_TRANSLATOR_LATENCY_MS
+    plus FAKE_TRANSLATOR_MS_PER_TOKEN per word
+    """
+    tokens = len(text.split()) + 1
+    seconds = (settings.FAKE_TRANSLATOR_LATENCY_MS + tokens * settings.FAKE_TRANSLATOR_MS_PER_TOKEN) / 1000
+    time.sleep(seconds)
+    stats = {
+        'input_chars': len(text),
+        'input_tokens': tokens,
+        'output_tokens': tokens + 1,
+        'seconds': seconds,
+    }
+    return f"[{target_lang}] {text}", stats
+
+def apply_precision(model, precision: str):
+    """
+    The model in the given precision: fp32 unchanged, bf16 weights, or int8
+    dynamically quantized linear layers (CPU only, so kept fp32 with a GPU)
+    """
+    import torch
+    
+    if precision == 'bf16':
+        return model.to(torch.bfloat16)
+    if precision == 'int8':
+        if torch.cuda.is_available():
+            logger.warning("int8 dynamic quantization runs on CPU only; keeping the model in fp32 on the GPU")
+            return model
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
 
-def get_model_name(source_lang: str, target_lang: str) -> str:
-    """Get the Hugging Face model name for the language pair"""
-    return f"Helsinki-NLP/opus-mt-{source_lang}-{target_lang}"
+def _generate_options(source_lang: str, target_lang: str) -> Dict:
+    """generate() arguments of the pair's swept configuration, if any (see core.inference_config)"""
+    config = get_inference_config(source_lang, target_lang)
+    return {'num_beams': config['num_beams']} if 'num_beams' in config else {}
+
+def _cached_model(cache_key: str, pair: str):
+    """(model, tokenizer) of the cache key marked as recently used, or None"""
+    with _cache_lock:
+        model = _model_cache.get(cache_key)
+        if model is None:
+            return None
+        _model_cache.move_to_end(cache_key)
+        return model, _tokenizer_cache[pair]
 
 def load_model_and_tokenizer(source_lang: str, target_lang: str):
     """Load or get from cache the model and tokenizer for a language pair"""
     model_name = get_model_name(source_lang, target_lang)
-    cache_key = f"{source_lang}-{target_lang}"
+    pair = f"{source_lang}-{target_lang}"
+    precision = get_inference_config(source_lang, target_lang).get('precision', 'fp32')
+    # A saved sweep can change the pair's precision while the worker runs
+    cache_key = f"{pair}:{precision}"
     
-    if cache_key not in _model_cache:
+    cached = _cached_model(cache_key, pair)
+    if cached is not None:
+        return cached
+    
+    with _cache_lock:
+        load_lock = _load_locks.setdefault(cache_key, Lock())
+    with load_lock:
+        # Loaded by another thread while this one waited
+        cached = _cached_model(cache_key, pair)
+        if cached is not None:
+            return cached
+        
+        from transformers import MarianMTModel, MarianTokenizer
+        
         # Set cache directory for models
         cache_dir = os.path.join(settings.BASE_DIR, 'ml_models')
         os.makedirs(cache_dir, exist_ok=True)
         
         # Load model and tokenizer
-        tokenizer = MarianTokenizer.from_pretrained(model_name, cache_dir=cache_dir)
-        model = MarianMTModel.from_pretrained(model_name, cache_dir=cache_dir)
+        started = time.perf_counter()
+        with trace_stage('chunk.model_load'):
+            tokenizer = _tokenizer_cache.get(pair) or MarianTokenizer.from_pretrained(
+                model_name, cache_dir=cache_dir, revision=settings.TRANSLATION_MODEL_REVISION
+            )
+            if settings.TRANSLATION_BACKEND == 'tiny':
+                model = _tiny_model(tokenizer)
+            else:
+                model = MarianMTModel.from_pretrained(model_name, cache_dir=cache_dir, revision=settings.TRANSLATION_MODEL_REVISION)
+            model = apply_precision(model, precision)
+        MODEL_LOAD_SECONDS.labels(pair).observe(time.perf_counter() - started)
+        MODEL_LOADS.labels(pair).inc()
         
-        # Cache them
-        _model_cache[cache_key] = model
-        _tokenizer_cache[cache_key] = tokenizer
+        with _cache_lock:
+            # Drop the pair's model in a precision no longer configured
+            for stale_key in [key for key in _model_cache if key.startswith(f"{pair}:")]:
+                del _model_cache[stale_key]
+                MODEL_EVICTIONS.labels(pair).inc()
+                MODELS_LOADED.dec()
+            
+            # Cache them, evicting the least recently used models beyond the limit
+            _model_cache[cache_key] = model
+            _tokenizer_cache[pair] = tokenizer
+            MODELS_LOADED.inc()
+            while len(_model_cache) > max(1, settings.TRANSLATION_MODEL_CACHE_SIZE):
+                evicted_key, _ = _model_cache.popitem(last=False)
+                MODEL_EVICTIONS.labels(evicted_key.split(':')[0]).inc()
+                MODELS_LOADED.dec()
     
-    return _model_cache[cache_key], _tokenizer_cache[cache_key]
+    return model, tokenizer
+
+def load_tokenizer(source_lang: str, target_lang: str):
+    """Load or get from cache only the tokenizer of a language pair (no model weights)"""
+    cache_key = f"{source_lang}-{target_lang}"
+    
+    if cache_key not in _tokenizer_cache:
+        from transformers import MarianTokenizer
+        
+        cache_dir = os.path.join(settings.BASE_DIR, 'ml_models')
+        os.makedirs(cache_dir, exist_ok=True)
+        _tokenizer_cache[cache_key] = MarianTokenizer.from_pretrained(
+            get_model_name(source_lang, target_lang), cache_dir=cache_dir, revision=settings.TRANSLATION_MODEL_REVISION
+        )
+    
+    return _tokenizer_cache[cache_key]
+
+def count_tokens(texts: List[str], source_lang: str, target_lang: str, max_length: int = 400,
+                 batch_size: int = 256) -> List[int]:
+    """Count the input tokens of each text as translate_text would encode it (truncated to max_length)"""
+    tokenizer = load_tokenizer(source_lang, target_lang)
+    counts = []
+    for offset in range(0, len(texts), batch_size):
+        encoded = tokenizer(texts[offset:offset + batch_size], max_length=max_length, truncation=True)
+        counts.extend(len(ids) for ids in encoded['input_ids'])
+    return counts
 
 def translate_text(text: str, source_lang: str, target_lang: str, max_length: int = 400) -> str:
     """Translate text using the ML model"""
+    return translate_text_with_stats(text, source_lang, target_lang, max_length=max_length)[0]
+
+def translate_text_with_stats(text: str, source_lang: str, target_lang: str, max_length: int = 400) -> Tuple[str, Dict]:
+    """
+    Translate text using the ML model and return (translation, stats), where
+    stats holds the input/output token counts and the generate time in seconds
+    """
+    if settings.TRANSLATION_BACKEND == 'fake':
+        translated_text, stats = _fake_translation(text, target_lang)
+        record_translate_call(f"{source_lang}-{target_lang}", stats)
+        return translated_text, stats
+    
+    import torch
+    
     # Load model and tokenizer
     model, tokenizer = load_model_and_tokenizer(source_lang, target_lang)
     
@@ -48,113 +211,76 @@ def translate_text(text: str, source_lang: str, target_lang: str, max_length: in
     encoded = encoded.to(device)
     
     # Generate translation
-    translated = model.generate(encoded, max_length=max_length)
+    started = time.perf_counter()
+    translated = model.generate(encoded, max_length=max_length, **_generate_options(source_lang, target_lang))
+    seconds = time.perf_counter() - started
     
     # Decode and return
-    return tokenizer.decode(translated[0], skip_special_tokens=True)
+    stats = {
+        'input_chars': len(text),
+        'input_tokens': int(encoded.shape[-1]),
+        'output_tokens': int(translated.shape[-1]),
+        'seconds': seconds,
+    }
+    record_translate_call(f"{source_lang}-{target_lang}", stats)
+    return tokenizer.decode(translated[0], skip_special_tokens=True), stats
 
-# Get a logger for this module
-ml_logger = logging.getLogger(__name__)
+def translate_batch(texts: List[str], source_lang: str, target_lang: str, max_length: int = 400) -> List[str]:
+    """Translate several texts of the same language pair in a single generate call"""
+    if settings.TRANSLATION_BACKEND == 'fake':
+        return [_fake_translation(text, target_lang)[0] for text in texts]
+    
+    import torch
+    
+    model, tokenizer = load_model_and_tokenizer(source_lang, target_lang)
+    
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model = model.to(device)
+    
+    # Pad to the longest text of the batch
+    encoded = tokenizer(texts, return_tensors="pt", padding=True, max_length=max_length, truncation=True)
+    encoded = encoded.to(device)
+    
+    with torch.no_grad():
+        translated = model.generate(**encoded, max_length=max_length, **_generate_options(source_lang, target_lang))
+    
+    return tokenizer.batch_decode(translated, skip_special_tokens=True)
 
-def split_text_into_chunks(text: str, chunk_size: int = 1) -> List[str]:
-    """Split text into chunks of approximately equal size while preserving sentence integrity"""
-    # Preprocess and normalize text
-    # Replace multiple whitespaces with a single space
-    text = re.sub(r'\s+', ' ', text)
-    
-    # Normalize newlines for paragraph detection
-    text = re.sub(r'\n+', '\n', text)
-    
-    # Split text into paragraphs
-    paragraphs = text.split('\n')
-    paragraphs = [p.strip() for p in paragraphs if p.strip()]
-    
-    try:
-        # Try to use NLTK's sentence tokenizer
-        import nltk
+def stream_translation(text: str, source_lang: str, target_lang: str, max_length: int = 400) -> Iterator[str]:
+    """Translate text and yield the decoded output incrementally as tokens are generated"""
+    if settings.TRANSLATION_BACKEND == 'fake':
+        yield _fake_translation(text, target_lang)[0]
+        return
+    
+    import torch
+    from transformers import TextIteratorStreamer
+    
+    model, tokenizer = load_model_and_tokenizer(source_lang, target_lang)
+    
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    model = model.to(device)
+    
+    encoded = tokenizer(text, return_tensors="pt", max_length=max_length, truncation=True)
+    encoded = encoded.to(device)
+    
+    # Streaming requires greedy decoding; generation runs in a thread feeding the streamer
+    streamer = TextIteratorStreamer(tokenizer, skip_special_tokens=True, timeout=settings.SNIPPET_TIMEOUT_SECONDS)
+    errors = []
+    
+    def generate():
         try:
-            # Specifically download the punkt tokenizer
-            nltk.download('punkt', quiet=True)
-            from nltk.tokenize import sent_tokenize
-            
-            # Split paragraphs into sentences using NLTK
-            all_sentences = []
-            for paragraph in paragraphs:
-                sentences = sent_tokenize(paragraph)
-                if sentences:
-                    all_sentences.extend(sentences)
-                    # Add an empty string as paragraph separator
-                    all_sentences.append('')
-            
-            # Remove the last empty separator if it exists
-            if all_sentences and not all_sentences[-1]:
-                all_sentences.pop()
-                
+            model.generate(**encoded, max_length=max_length, num_beams=1, streamer=streamer)
         except Exception as e:
-            ml_logger.warning(f"NLTK sentence tokenization failed: {str(e)}. Using fallback method.")
-            # Fallback to simple sentence splitting
-            all_sentences = []
-            for paragraph in paragraphs:
-                # Simple regex-based sentence splitting (periods followed by space or end)
-                simple_sentences = re.split(r'(?<=[.!?])\s+', paragraph)
-                all_sentences.extend([s.strip() + ' ' for s in simple_sentences if s.strip()])
-                all_sentences.append('')  # Paragraph separator
-            
-            if all_sentences and not all_sentences[-1]:
-                all_sentences.pop()
-    
-    except ImportError:
-        ml_logger.warning("NLTK not available. Using fallback sentence splitting method.")
-        # Fallback if NLTK is not available at all
-        all_sentences = []
-        for paragraph in paragraphs:
-            # Simple regex-based sentence splitting
-            simple_sentences = re.split(r'(?<=[.!?])\s+', paragraph)
-            all_sentences.extend([s.strip() + ' ' for s in simple_sentences if s.strip()])
-            all_sentences.append('')  # Paragraph separator
-        
-        if all_sentences and not all_sentences[-1]:
-            all_sentences.pop()
-    
-    # Now create chunks respecting sentence boundaries
-    chunks = []
-    current_chunk = []
-    current_size = 0
+            errors.append(e)
+        finally:
+            # Unblocks the reader when generate failed before ending the stream
+            streamer.end()
     
-    for sentence in all_sentences:
-        sentence_size = len(sentence)
-        
-        # Check if it's a paragraph separator (empty string)
-        if not sentence:
-            if current_chunk:
-                current_chunk.append('')  # Add paragraph break
-                current_size += 1
-            continue
-        
-        # If adding this sentence would exceed chunk size and we already have content
-        if current_size + sentence_size > chunk_size and current_chunk:
-            # Join current chunk, respecting paragraph structure
-            chunk_text = ' '.join(filter(None, current_chunk))
-            chunks.append(chunk_text)
-            
-            # Start a new chunk with current sentence
-            current_chunk = [sentence]
-            current_size = sentence_size
-        else:
-            # Add sentence to current chunk
-            current_chunk.append(sentence)
-            current_size += sentence_size
-    
-    # Add the last chunk if it exists
-    if current_chunk:
-        chunk_text = ' '.join(filter(None, current_chunk))
-        chunks.append(chunk_text)
-    
-    return chunks
-
-def get_supported_languages() -> List[str]:
-    """Get a list of supported language pairs"""
-    # Currently supported languages (can be expanded)
-    return [
-        "en", "es", "fr", "de", "ru", "zh", "ja", "ko", "ar", "bg"
-    ]
\ No newline at end of file
+    generation = Thread(target=generate, daemon=True)
+    generation.start()
+    for piece in streamer:
+        if piece:
+            yield piece
+    generation.join()
+    if errors:
+        raise errors[0]
@@ -0,0 +1,138 @@
+import cProfile
+import io
+import logging
+import os
+import pstats
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Opt-in profiling of Celery tasks. A task listed in TASK_PROFILING_TASKS runs
+# under a profiler when it is forced (a translation created with profile=true)
+# or, otherwise, with probability TASK_PROFILING_RATE, so a low rate can stay
+# on in production. Reports are written to MEDIA_ROOT/profiles:
+#   <name>.prof / .txt        cProfile stats (snakeviz, pstats) and top functions
+#   <name>.collapsed          sampled stacks in collapsed format (flamegraph.pl, speedscope)
+#   <name>.alloc.txt          tracemalloc: top allocations made by the task and its peak
+PROFILES_DIR = 'profiles'
+
+
+def should_profile(task_name: str, force: bool = False) -> bool:
+    """Whether this run of the task is profiled"""
+    if task_name not in settings.TASK_PROFILING_TASKS:
+        return False
+    return force or random.random() < settings.TASK_PROFILING_RATE
+
+
+class StackSampler:
+    """
+    Sampling profiler of one thread: a background thread records the thread's
+    Python stack every interval seconds. Unlike cProfile it adds no cost per
+    call, and native code that releases the GIL (model.generate) is still
+    attributed to the Python frame that called it.
+    """
+
+    def __init__(self, interval: float, thread_id: int = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_globals.get('__name__', frame.f_code.co_filename)}:{frame.f_code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: str):
+        """One "frame;frame;... count" line per distinct stack, root first"""
+        with open(path, 'w') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+def _write_allocations(path: str, before, after, peak: int):
+    top = after.compare_to(before, 'lineno')[:settings.TASK_PROFILING_TOP_ALLOCATIONS]
+    with open(path, 'w') as f:
+        f.write(f"Peak traced memory: {peak / (1024 * 1024):.1f} MiB\n")
+        f.write(f"Top {len(top)} allocation sites by size growth during the task:\n")
+        for stat in top:
+            f.write(f"{stat}\n")
+
+
+@contextmanager
+def profile_task(task_name: str, label: str, force: bool = False):
+    """
+    Profile the block when should_profile(task_name, force) says so, writing
+    the reports named <task_name>_<label>_<time>_<pid> to MEDIA_ROOT/profiles.
+    Profiling errors are logged and never fail the task.
+    """
+    if not should_profile(task_name, force):
+        yield
+        return
+
+    profiler = sampler = None
+    if settings.TASK_PROFILER == 'sampling':
+        sampler = StackSampler(settings.TASK_PROFILING_SAMPLE_INTERVAL)
+        sampler.start()
+    else:
+        profiler = cProfile.Profile()
+
+    traced = settings.TASK_PROFILING_TRACEMALLOC and not tracemalloc.is_tracing()
+    if traced:
+        tracemalloc.start(settings.TASK_PROFILING_TRACEMALLOC_FRAMES)
+        before = tracemalloc.take_snapshot()
+
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        if sampler:
+            sampler.stop()
+        seconds = time.perf_counter() - started
+        try:
+            directory = os.path.join(settings.MEDIA_ROOT, PROFILES_DIR)
+            os.makedirs(directory, exist_ok=True)
+            base = os.path.join(directory, f"{task_name}_{label}_{time.strftime('%Y%m%d-%H%M%S')}_{os.getpid()}")
+
+            if traced:
+                after = tracemalloc.take_snapshot()
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                _write_allocations(f"{base}.alloc.txt", before, after, peak)
+            if profiler:
+                profiler.dump_stats(f"{base}.prof")
+                report = io.StringIO()
+                pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(40)
+                with open(f"{base}.txt", 'w') as f:
+                    f.write(report.getvalue())
+            if sampler:
+                sampler.write_collapsed(f"{base}.collapsed")
+            logger.info(f"Profiled {task_name} {label} ({seconds:.2f}s) into {base}.*")
+        except Exception as e:
+            if traced and tracemalloc.is_tracing():
+                tracemalloc.stop()
+            logger.warning(f"Could not write the profile of {task_name} {label}: {str(e)}")
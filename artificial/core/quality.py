@@ -0,0 +1,92 @@
+import math
+import os
+import re
+from collections import Counter
+from typing import List, Tuple
+
+# Corpus-level BLEU and chrF of translations against one reference each,
+# following sacrebleu's defaults (BLEU: 4-grams, exponential smoothing;
+# chrF: character 6-grams without whitespace, beta 2) so the scores are
+# comparable with published ones without adding sacrebleu as a dependency.
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+# Bundled parallel corpus: one <src>-<tgt>.tsv file per language pair
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+
+def read_corpus(path: str) -> Tuple[List[str], List[str]]:
+    """(sources, references) of a "source<TAB>reference" file; lines starting with # are comments"""
+    sources, references = [], []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip() or line.startswith('#'):
+                continue
+            source, reference = line.split('\t', 1)
+            sources.append(source)
+            references.append(reference)
+    return sources, references
+
+
+def _ngrams(items, n: int) -> Counter:
+    return Counter(tuple(items[i:i + n]) for i in range(len(items) - n + 1))
+
+
+def corpus_bleu(hypotheses: List[str], references: List[str], max_order: int = 4) -> float:
+    """BLEU (0-100) of the hypotheses against their references"""
+    matches = [0] * max_order
+    totals = [0] * max_order
+    hypothesis_length = reference_length = 0
+    for hypothesis, reference in zip(hypotheses, references):
+        hypothesis_tokens = _TOKEN_RE.findall(hypothesis)
+        reference_tokens = _TOKEN_RE.findall(reference)
+        hypothesis_length += len(hypothesis_tokens)
+        reference_length += len(reference_tokens)
+        for n in range(1, max_order + 1):
+            hypothesis_ngrams = _ngrams(hypothesis_tokens, n)
+            matches[n - 1] += sum((hypothesis_ngrams & _ngrams(reference_tokens, n)).values())
+            totals[n - 1] += max(0, len(hypothesis_tokens) - n + 1)
+
+    if not hypothesis_length or not totals[0]:
+        return 0.0
+    log_precision = 0.0
+    smoothing = 1.0
+    for n in range(max_order):
+        if not totals[n]:
+            return 0.0
+        if matches[n]:
+            precision = matches[n] / totals[n]
+        else:
+            smoothing *= 2
+            precision = 1 / (smoothing * totals[n])
+        log_precision += math.log(precision) / max_order
+
+    brevity_penalty = 1.0 if hypothesis_length >= reference_length else math.exp(1 - reference_length / hypothesis_length)
+    return 100 * brevity_penalty * math.exp(log_precision)
+
+
+def corpus_chrf(hypotheses: List[str], references: List[str], char_order: int = 6, beta: float = 2.0) -> float:
+    """chrF (0-100) of the hypotheses against their references"""
+    matches = [0] * char_order
+    hypothesis_totals = [0] * char_order
+    reference_totals = [0] * char_order
+    for hypothesis, reference in zip(hypotheses, references):
+        hypothesis_chars = ''.join(hypothesis.split())
+        reference_chars = ''.join(reference.split())
+        for n in range(1, char_order + 1):
+            hypothesis_ngrams = _ngrams(hypothesis_chars, n)
+            reference_ngrams = _ngrams(reference_chars, n)
+            matches[n - 1] += sum((hypothesis_ngrams & reference_ngrams).values())
+            hypothesis_totals[n - 1] += sum(hypothesis_ngrams.values())
+            reference_totals[n - 1] += sum(reference_ngrams.values())
+
+    precisions = [matches[n] / hypothesis_totals[n] for n in range(char_order) if hypothesis_totals[n]]
+    recalls = [matches[n] / reference_totals[n] for n in range(char_order) if reference_totals[n]]
+    if not precisions or not recalls:
+        return 0.0
+    precision = sum(precisions) / len(precisions)
+    recall = sum(recalls) / len(recalls)
+    if not precision and not recall:
+        return 0.0
+    return 100 * (1 + beta ** 2) * precision * recall / (beta ** 2 * precision + recall)
@@ -0,0 +1,40 @@
+from decimal import Decimal
+import orjson
+from django.http import HttpResponse
+from ninja.renderers import BaseRenderer
+from pydantic import AnyUrl, BaseModel
+
+
+def _orjson_default(obj):
+    """Serialize the types orjson does not handle natively"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (Decimal, AnyUrl)):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dump_json(data) -> bytes:
+    """Encode data to JSON bytes using orjson"""
+    return orjson.dumps(data, default=_orjson_default)
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Django Ninja renderer that encodes responses with orjson"""
+    media_type = "application/json"
+
+    def render(self, request, data, *, response_status):
+        return dump_json(data)
+
+
+def json_bytes_response(body: bytes, status: int = 200) -> HttpResponse:
+    """Wrap already encoded JSON bytes in a response"""
+    return HttpResponse(body, status=status, content_type="application/json")
+
+
+def orjson_response(data, status: int = 200) -> HttpResponse:
+    """
+    Build a JSON response directly, skipping Ninja's response schema validation.
+    Use only for hot endpoints whose payload is already shaped like the declared schema.
+    """
+    return json_bytes_response(dump_json(data), status=status)
@@ -0,0 +1,213 @@
+import re
+import unicodedata
+from enum import Enum
+from typing import Optional, Tuple
+
+
+class SegmentKind(str, Enum):
+    TEXT = "text"                      # Needs the model
+    EMPTY = "empty"                    # Whitespace or punctuation only
+    PAGE_NUMBER = "page_number"        # "12", "- 12 -", "Page 12 of 300"
+    ROMAN_NUMERAL = "roman_numeral"    # Front matter page numbers and section numbers
+    URL = "url"                        # URLs and e-mail addresses
+    CODE = "code"                      # Source code fragments
+    NUMERIC = "numeric"                # Tables of numbers, dates, amounts
+    CHAPTER_MARKER = "chapter_marker"  # "Chapter 12", "CHAPTER XII"
+    TARGET_LANGUAGE = "target_language"  # Already written in the target language
+
+
+# Kinds that never need a model.generate call
+PASSTHROUGH_KINDS = tuple(kind for kind in SegmentKind if kind != SegmentKind.TEXT)
+
+# Non-empty roman numeral (the lookahead rules out matching the empty string)
+_ROMAN_NUMERAL = r'(?=[MDCLXVImdclxvi])M{0,3}(?:CM|CD|D?C{0,3})(?:XC|XL|L?X{0,3})(?:IX|IV|V?I{0,3})'
+
+_PAGE_NUMBER_RE = re.compile(
+    r'^[\s\-–—\[\(]*(?:page|p\.|pg\.?)?\s*\d{1,4}(?:\s*(?:/|of)\s*\d{1,4})?[\s\-–—\]\)\.]*$',
+    re.IGNORECASE
+)
+_ROMAN_RE = re.compile(rf'^[\s\-–—\[\(]*({_ROMAN_NUMERAL})[\s\-–—\]\)\.]*$', re.IGNORECASE)
+_URL_RE = re.compile(
+    r'^\s*(?:(?:https?://|ftp://|www\.)\S+|[\w.+-]+@[\w-]+\.[\w.-]+)(?:\s+(?:(?:https?://|ftp://|www\.)\S+|[\w.+-]+@[\w-]+\.[\w.-]+))*\s*$',
+    re.IGNORECASE
+)
+_CHAPTER_RE = re.compile(
+    rf'^\s*(chapter|chap\.|part|book|section)\s+(\d{{1,4}}|{_ROMAN_NUMERAL})\s*[.:]?\s*$',
+    re.IGNORECASE
+)
+_CODE_TOKENS_RE = re.compile(
+    r'(?:\b(?:def|class|return|import|function|var|let|const|public|private|static|void|int|elif|lambda|#include)\b'
+    r'|[{};]|==|!=|=>|->|\+\+|&&|\|\||::|</?\w+>)'
+)
+_WORD_RE = re.compile(r'[^\W\d_]+', re.UNICODE)
+
+# Localized chapter/part words for rule-based chapter markers. CJK languages use
+# a counter pattern instead of a word followed by the number.
+_CHAPTER_WORDS = {
+    'chapter': {
+        'en': 'Chapter', 'es': 'Capítulo', 'fr': 'Chapitre', 'de': 'Kapitel', 'ru': 'Глава',
+        'bg': 'Глава', 'ar': 'الفصل', 'zh': '第{n}章', 'ja': '第{n}章', 'ko': '제{n}장',
+    },
+    'part': {
+        'en': 'Part', 'es': 'Parte', 'fr': 'Partie', 'de': 'Teil', 'ru': 'Часть',
+        'bg': 'Част', 'ar': 'الجزء', 'zh': '第{n}部分', 'ja': '第{n}部', 'ko': '제{n}부',
+    },
+}
+
+# Unicode script of each non-Latin language, from the first word of the character name
+_LANGUAGE_SCRIPTS = {
+    'ru': ('CYRILLIC',),
+    'bg': ('CYRILLIC',),
+    'ar': ('ARABIC',),
+    'zh': ('CJK',),
+    'ja': ('CJK', 'HIRAGANA', 'KATAKANA'),
+    'ko': ('HANGUL',),
+}
+
+# Frequent function words of the Latin-script languages, used to tell them apart
+_STOPWORDS = {
+    'en': {'the', 'and', 'of', 'to', 'is', 'in', 'that', 'it', 'was', 'with', 'he', 'she', 'for', 'his', 'her', 'you', 'not', 'this', 'but', 'they'},
+    'es': {'el', 'la', 'los', 'las', 'de', 'que', 'y', 'en', 'un', 'una', 'es', 'por', 'con', 'no', 'se', 'su', 'para', 'del', 'al', 'como'},
+    'fr': {'le', 'la', 'les', 'de', 'des', 'et', 'un', 'une', 'est', 'que', 'qui', 'dans', 'pour', 'pas', 'il', 'elle', 'sur', 'au', 'avec', 'ne'},
+    'de': {'der', 'die', 'das', 'und', 'ist', 'nicht', 'ein', 'eine', 'zu', 'den', 'mit', 'sich', 'des', 'auf', 'für', 'dem', 'er', 'sie', 'es', 'war'},
+}
+
+# Latin-script segments need at least this many words before they are attributed to a language
+_MIN_WORDS_FOR_LANGUAGE = 4
+
+
+def _roman_to_int(numeral: str) -> int:
+    values = {'I': 1, 'V': 5, 'X': 10, 'L': 50, 'C': 100, 'D': 500, 'M': 1000}
+    total = 0
+    previous = 0
+    for char in reversed(numeral.upper()):
+        value = values[char]
+        total = total - value if value < previous else total + value
+        previous = max(previous, value)
+    return total
+
+
+def _script(char: str) -> Optional[str]:
+    try:
+        return unicodedata.name(char).split(' ')[0]
+    except ValueError:
+        return None
+
+
+def _is_roman_numeral(text: str) -> bool:
+    match = _ROMAN_RE.match(text)
+    if not match:
+        return False
+    numeral = match.group(1)
+    if numeral.upper() == 'I':
+        # Most likely the English pronoun
+        return False
+    # Lowercase numerals are only used for front matter pages (i, ii, xiv...);
+    # anything else is more likely a word ("mix", "di")
+    return numeral.isupper() or set(numeral) <= set('ivx')
+
+
+def _script_share(text: str, scripts: Tuple[str, ...]) -> float:
+    letters = [char for char in text if char.isalpha()]
+    if len(letters) < 2:
+        return 0.0
+    return sum(1 for char in letters if _script(char) in scripts) / len(letters)
+
+
+def _is_in_language(text: str, language: str, source_lang: str) -> bool:
+    """Cheap check whether a segment is already written in a language"""
+    target_scripts = _LANGUAGE_SCRIPTS.get(language, ('LATIN',))
+    source_scripts = _LANGUAGE_SCRIPTS.get(source_lang, ('LATIN',))
+
+    if not set(target_scripts) & set(source_scripts):
+        # Different alphabets: the share of letters in the target script decides,
+        # plus function words for Latin targets so names and terms are not skipped
+        if _script_share(text, target_scripts) < 0.9:
+            return False
+        if language in _STOPWORDS:
+            words = [word.lower() for word in _WORD_RE.findall(text)]
+            return len(words) >= _MIN_WORDS_FOR_LANGUAGE and sum(
+                1 for word in words if word in _STOPWORDS[language]
+            ) >= 2
+        return True
+
+    if language in _STOPWORDS and source_lang in _STOPWORDS:
+        words = [word.lower() for word in _WORD_RE.findall(text)]
+        if len(words) < _MIN_WORDS_FOR_LANGUAGE:
+            return False
+        target_hits = sum(1 for word in words if word in _STOPWORDS[language] and word not in _STOPWORDS[source_lang])
+        source_hits = sum(1 for word in words if word in _STOPWORDS[source_lang] and word not in _STOPWORDS[language])
+        return target_hits >= 2 and source_hits == 0
+
+    return False
+
+
+def _is_code(text: str) -> bool:
+    tokens = len(_CODE_TOKENS_RE.findall(text))
+    words = max(1, len(text.split()))
+    symbols = sum(1 for char in text if char in '{}()[];=<>_#$\\|')
+    return tokens >= 3 and tokens / words >= 0.25 and symbols / max(1, len(text)) >= 0.05
+
+
+def _is_numeric(text: str) -> bool:
+    compact = re.sub(r'\s+', '', text)
+    if not compact:
+        return False
+    letters = sum(1 for char in compact if char.isalpha())
+    digits = sum(1 for char in compact if char.isdigit())
+    return digits > 0 and letters / len(compact) < 0.1 and digits / len(compact) >= 0.4
+
+
+def is_chapter_marker(text: str) -> bool:
+    """Whether a line is a chapter or part heading, such as "Chapter 12" or "PART II"."""
+    return bool(_CHAPTER_RE.match(text.strip()))
+
+
+def classify_segment(text: str, source_lang: str, target_lang: str) -> SegmentKind:
+    """Return the kind of a segment; anything but TEXT can skip inference"""
+    stripped = text.strip()
+    if not stripped or not any(char.isalnum() for char in stripped):
+        return SegmentKind.EMPTY
+    if _PAGE_NUMBER_RE.match(stripped):
+        return SegmentKind.PAGE_NUMBER
+    if _is_roman_numeral(stripped):
+        return SegmentKind.ROMAN_NUMERAL
+    if _URL_RE.match(stripped):
+        return SegmentKind.URL
+    if _CHAPTER_RE.match(stripped):
+        return SegmentKind.CHAPTER_MARKER
+    if _is_numeric(stripped):
+        return SegmentKind.NUMERIC
+    if _is_code(stripped):
+        return SegmentKind.CODE
+    if _is_in_language(stripped, target_lang, source_lang):
+        return SegmentKind.TARGET_LANGUAGE
+    return SegmentKind.TEXT
+
+
+def _translate_chapter_marker(text: str, target_lang: str) -> str:
+    match = _CHAPTER_RE.match(text.strip())
+    word, number = match.group(1).lower().rstrip('.'), match.group(2)
+    words = _CHAPTER_WORDS['part' if word == 'part' else 'chapter']
+    if word not in ('chapter', 'chap', 'part') or target_lang not in words:
+        return text
+    template = words[target_lang]
+    if '{n}' in template:
+        # Counter patterns read naturally with Arabic numerals
+        return template.format(n=number if number.isdigit() else _roman_to_int(number))
+    return f"{template} {number}"
+
+
+def passthrough_text(text: str, kind: SegmentKind, target_lang: str) -> str:
+    """Return the output of a segment that skips inference"""
+    if kind == SegmentKind.CHAPTER_MARKER:
+        return _translate_chapter_marker(text, target_lang)
+    return text
+
+
+def classify_and_passthrough(text: str, source_lang: str, target_lang: str) -> Tuple[SegmentKind, Optional[str]]:
+    """Classify a segment and return (kind, output), output being None when the model is needed"""
+    kind = classify_segment(text, source_lang, target_lang)
+    if kind == SegmentKind.TEXT:
+        return kind, None
+    return kind, passthrough_text(text, kind, target_lang)
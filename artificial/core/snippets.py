@@ -0,0 +1,129 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Tuple
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class SnippetBatcher:
+    """
+    Micro-batches synchronous snippet translations.
+
+    Requests for the same language pair that arrive within
+    SNIPPET_BATCH_WINDOW_MS of each other are translated in a single generate
+    call (with the largest max_length of the batch) by a per-pair worker
+    thread, which also keeps that pair's model warm.
+    """
+
+    def __init__(self, window_ms: int, max_batch_size: int):
+        self.window = window_ms / 1000
+        self.max_batch_size = max_batch_size
+        self._queues: Dict[Tuple[str, str], queue.Queue] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, text: str, source_lang: str, target_lang: str, max_length: int) -> Future:
+        """Queue a snippet and return a future resolving to its translation"""
+        future = Future()
+        self._queue_for((source_lang, target_lang)).put((text, max_length, future))
+        return future
+
+    def _queue_for(self, key: Tuple[str, str]) -> queue.Queue:
+        with self._lock:
+            if key not in self._queues:
+                self._queues[key] = queue.Queue()
+                worker = threading.Thread(
+                    target=self._run,
+                    args=(key, self._queues[key]),
+                    name=f"snippet-batcher-{key[0]}-{key[1]}",
+                    daemon=True
+                )
+                worker.start()
+            return self._queues[key]
+
+    def _collect(self, pending: queue.Queue) -> List[Tuple[str, int, Future]]:
+        """Block for the first request, then gather more until the window closes or the batch is full"""
+        batch = [pending.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, key: Tuple[str, str], pending: queue.Queue):
+        from core.ml_translator import translate_batch
+
+        source_lang, target_lang = key
+        while True:
+            batch = self._collect(pending)
+            texts = [text for text, _, _ in batch]
+            max_length = max(length for _, length, _ in batch)
+            try:
+                translations = translate_batch(texts, source_lang, target_lang, max_length=max_length)
+            except Exception as e:
+                logger.error(f"Snippet batch translation failed for {source_lang}-{target_lang}: {str(e)}")
+                for _, _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, _, future), translated in zip(batch, translations):
+                future.set_result(translated)
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_snippet_batcher() -> SnippetBatcher:
+    """Return the process-wide snippet batcher"""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            _batcher = SnippetBatcher(
+                window_ms=settings.SNIPPET_BATCH_WINDOW_MS,
+                max_batch_size=settings.SNIPPET_BATCH_MAX_SIZE
+            )
+        return _batcher
+
+
+def translate_snippet(text: str, source_lang: str, target_lang: str, max_length: int) -> str:
+    """Translate a short text synchronously through the batcher"""
+    future = get_snippet_batcher().submit(text, source_lang, target_lang, max_length)
+    return future.result(timeout=settings.SNIPPET_TIMEOUT_SECONDS)
+
+
+def warm_up_snippet_models():
+    """
+    Load the models of SNIPPET_WARM_PAIRS in a background thread so the first
+    snippet request does not pay the model load. Called from the web entry points only.
+    """
+    pairs = []
+    for pair in settings.SNIPPET_WARM_PAIRS:
+        if not pair:
+            continue
+        languages = pair.split('-')
+        if len(languages) != 2 or not all(languages):
+            logger.error(f"Ignoring SNIPPET_WARM_PAIRS entry {pair!r}: expected <source>-<target>")
+            continue
+        pairs.append(languages)
+    if not pairs:
+        return
+
+    def warm_up():
+        from core.ml_translator import load_model_and_tokenizer
+
+        for source_lang, target_lang in pairs:
+            try:
+                load_model_and_tokenizer(source_lang, target_lang)
+                logger.info(f"Warmed up snippet model {source_lang}-{target_lang}")
+            except Exception as e:
+                logger.error(f"Could not warm up snippet model {source_lang}-{target_lang}: {str(e)}")
+
+    threading.Thread(target=warm_up, name="snippet-warm-up", daemon=True).start()
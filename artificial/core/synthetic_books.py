@@ -0,0 +1,180 @@
+import os
+import random
+from typing import List
+
+# Deterministic synthetic books in every supported format, for benchmarks.
+# The text is made of plain English-looking sentences, so the segmenter and the
+# skip classifier see prose; PDF pages carry a page number footer like real books.
+
+FORMATS = ['pdf', 'epub', 'docx', 'html', 'txt', 'md']
+
+WORDS = (
+    "the a of and to in was he she it that his her with as for had you on at by not be "
+    "river house morning letter garden window evening road friend mother father city "
+    "voice door light winter summer child hand face night water story ship field king "
+    "walked said looked turned waited thought smiled opened carried remembered answered "
+    "quietly slowly suddenly never always again almost together already perhaps "
+    "old young long small dark bright cold warm quiet distant strange heavy open"
+).split()
+
+PDF_LINES_PER_PAGE = 48
+PDF_CHARS_PER_LINE = 90
+
+
+def _sentence(rng: random.Random) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(6, 18))]
+    return ' '.join(words).capitalize() + rng.choice(['.', '.', '.', '?', '!'])
+
+
+def generate_chapters(words: int, seed: int = 0, chapter_words: int = 2000) -> List[tuple]:
+    """(title, paragraphs) chapters totalling about `words` words, the same for a given seed"""
+    rng = random.Random(seed)
+    chapters = []
+    written = 0
+    while written < words:
+        paragraphs = []
+        in_chapter = 0
+        while in_chapter < min(chapter_words, words - written):
+            paragraph = ' '.join(_sentence(rng) for _ in range(rng.randint(3, 7)))
+            paragraphs.append(paragraph)
+            in_chapter += len(paragraph.split())
+        chapters.append((f"Chapter {len(chapters) + 1}", paragraphs))
+        written += in_chapter
+    return chapters
+
+
+def _write_txt(path, title, chapters):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"{title}\n\n")
+        for heading, paragraphs in chapters:
+            f.write(f"{heading}\n\n" + '\n\n'.join(paragraphs) + '\n\n')
+
+
+def _write_md(path, title, chapters):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"# {title}\n\n")
+        for heading, paragraphs in chapters:
+            f.write(f"## {heading}\n\n" + '\n\n'.join(paragraphs) + '\n\n')
+
+
+def _chapter_html(heading, paragraphs):
+    return f"<h1>{heading}</h1>\n" + '\n'.join(f"<p>{paragraph}</p>" for paragraph in paragraphs)
+
+
+def _write_html(path, title, chapters):
+    body = '\n'.join(_chapter_html(heading, paragraphs) for heading, paragraphs in chapters)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{title}</title></head>\n"
+                f"<body>\n{body}\n</body></html>\n")
+
+
+def _write_docx(path, title, chapters):
+    import docx
+
+    document = docx.Document()
+    document.add_heading(title, level=0)
+    for heading, paragraphs in chapters:
+        document.add_heading(heading, level=1)
+        for paragraph in paragraphs:
+            document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def _write_epub(path, title, chapters):
+    from ebooklib import epub
+
+    book = epub.EpubBook()
+    book.set_identifier(f"synthetic-{title}")
+    book.set_title(title)
+    book.set_language('en')
+    items = []
+    for number, (heading, paragraphs) in enumerate(chapters, start=1):
+        item = epub.EpubHtml(title=heading, file_name=f"chapter_{number}.xhtml", lang='en')
+        item.content = _chapter_html(heading, paragraphs)
+        book.add_item(item)
+        items.append(item)
+    book.toc = items
+    book.add_item(epub.EpubNcx())
+    book.add_item(epub.EpubNav())
+    book.spine = ['nav'] + items
+    epub.write_epub(path, book)
+
+
+def _pdf_lines(title, chapters):
+    lines = [title, '']
+    for heading, paragraphs in chapters:
+        lines.extend([heading, ''])
+        for paragraph in paragraphs:
+            line = ''
+            for word in paragraph.split():
+                if line and len(line) + 1 + len(word) > PDF_CHARS_PER_LINE:
+                    lines.append(line)
+                    line = word
+                else:
+                    line = f"{line} {word}" if line else word
+            lines.extend([line, ''])
+    return lines
+
+
+def _pdf_string(text):
+    return '(' + text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)') + ')'
+
+
+def _write_pdf(path, title, chapters):
+    """
+    A minimal PDF written by hand (no PDF library is a dependency): one
+    Helvetica text stream per page with a page number footer, and the xref
+    table of byte offsets that readers use to locate the objects
+    """
+    lines = _pdf_lines(title, chapters)
+    pages = [lines[offset:offset + PDF_LINES_PER_PAGE] for offset in range(0, len(lines), PDF_LINES_PER_PAGE)]
+
+    # 1: catalog, 2: page tree, 3: font, then a page and its content stream per page
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + b' '.join(f"{4 + 2 * i} 0 R".encode() for i in range(len(pages)))
+        + f"] /Count {len(pages)} >>".encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for number, page_lines in enumerate(pages, start=1):
+        text = ' Tj T* '.join(_pdf_string(line) for line in page_lines)
+        stream = (
+            f"BT /F1 10 Tf 14 TL 50 800 Td {text} Tj ET\n"
+            f"BT /F1 9 Tf 290 30 Td {_pdf_string(str(number))} Tj ET"
+        ).encode('latin-1')
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {5 + 2 * (number - 1)} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(output)
+    output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        output += f"{offset:010d} 00000 n \n".encode()
+    output += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    with open(path, 'wb') as f:
+        f.write(output)
+
+
+WRITERS = {
+    'pdf': _write_pdf,
+    'epub': _write_epub,
+    'docx': _write_docx,
+    'html': _write_html,
+    'txt': _write_txt,
+    'md': _write_md,
+}
+
+
+def write_book(directory: str, file_format: str, words: int, seed: int = 0) -> str:
+    """Write a synthetic book of about `words` words in file_format and return its path"""
+    title = f"Synthetic {file_format.upper()} {words} words"
+    path = os.path.join(directory, f"synthetic_{words}.{file_format}")
+    WRITERS[file_format](path, title, generate_chapters(words, seed=seed))
+    return path
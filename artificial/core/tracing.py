@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+
+# Spans of the trace being collected in this context, as (stage, started_at
+# epoch seconds, seconds) tuples, or None when nothing is traced. Code anywhere
+# in the pipeline (extraction, model loading...) marks its stages with
+# trace_stage; they are only recorded inside collect_spans, which the owner of
+# the trace (translations.tracing) opens and persists.
+_spans: ContextVar[Optional[List[Tuple[str, float, float]]]] = ContextVar('trace_spans', default=None)
+
+
+@contextmanager
+def collect_spans():
+    """Collect the spans recorded by trace_stage/record_span in this context into the yielded list"""
+    spans = []
+    token = _spans.set(spans)
+    try:
+        yield spans
+    finally:
+        _spans.reset(token)
+
+
+@contextmanager
+def trace_stage(stage: str):
+    """Record the time spent in the block as a span of stage, when a trace is being collected"""
+    spans = _spans.get()
+    started_at = time.time()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if spans is not None:
+            spans.append((stage, started_at, time.perf_counter() - started))
+
+
+def record_span(stage: str, started_at: float, seconds: float):
+    """Record a span measured elsewhere (e.g. a queue wait), when a trace is being collected"""
+    spans = _spans.get()
+    if spans is not None:
+        spans.append((stage, started_at, max(0.0, seconds)))
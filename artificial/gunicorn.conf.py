@@ -0,0 +1,47 @@
+"""
+Production profile of the web service: gunicorn managing uvicorn workers that
+serve the ASGI application (book_translator.asgi:application).
+
+    gunicorn -c gunicorn.conf.py book_translator.asgi:application
+
+Each worker runs one event loop, so the async read endpoints (/api/async/...)
+and the Server-Sent Event streams (/api/translations/{id}/events and
+/api/async/translations/{id}/events) wait on I/O without holding a thread, and
+snippet token streams send each token as it is generated from a thread. The
+other sync endpoints still run in the worker's thread pool. Settings come from the
+environment so the same file serves docker-compose and bare-metal deployments.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+worker_class = 'uvicorn_worker.UvicornWorker'
+
+# Web workers only serve requests; translation runs on the Celery workers
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 9)))
+
+# Event streams stay open for up to TRANSLATION_EVENTS_MAX_STREAM_SECONDS and
+# send a heartbeat every 15 seconds, well within this timeout
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 10000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 1000))
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+# Prometheus multiprocess mode (PROMETHEUS_MULTIPROC_DIR): start from an empty
+# sample directory and drop the live gauges of workers that exit
+def on_starting(server):
+    from core.metrics import clear_multiproc_dir
+    clear_multiproc_dir()
+
+
+def child_exit(server, worker):
+    from core.metrics import mark_process_dead
+    mark_process_dead(worker.pid)
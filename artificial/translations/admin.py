@@ -1,13 +1,26 @@
 from django.contrib import admin
-from .models import Translation, TranslationChunk
+from .models import Translation, TranslationChunk, TraceStage
+
+class TraceStageInline(admin.TabularInline):
+    """Read-only trace of the translation's pipeline stages (timeline: GET /api/translations/{id}/trace)"""
+    model = TraceStage
+    fields = ('stage', 'count', 'total_seconds', 'max_seconds', 'first_started_at', 'last_ended_at')
+    readonly_fields = fields
+    ordering = ('first_started_at',)
+    extra = 0
+    can_delete = False
+    
+    def has_add_permission(self, request, obj=None):
+        return False
 
 @admin.register(Translation)
 class TranslationAdmin(admin.ModelAdmin):
-    list_display = ('id', 'book', 'status', 'created_at', 'updated_at')
-    list_filter = ('status', 'created_at', 'updated_at')
+    list_display = ('id', 'book', 'target_language', 'status', 'is_compacted', 'created_at', 'updated_at')
+    list_filter = ('target_language', 'status', 'is_compacted', 'created_at', 'updated_at')
     search_fields = ('book__title', 'book__author')
     readonly_fields = ('created_at', 'updated_at')
     raw_id_fields = ('book',)
+    inlines = [TraceStageInline]
 
 @admin.register(TranslationChunk)
 class TranslationChunkAdmin(admin.ModelAdmin):
@@ -15,4 +28,4 @@ class TranslationChunkAdmin(admin.ModelAdmin):
     list_filter = ('status', 'created_at', 'updated_at')
     search_fields = ('translation__book__title', 'original_text', 'translated_text')
     readonly_fields = ('created_at', 'updated_at')
-    raw_id_fields = ('translation',)
\ No newline at end of file
+    raw_id_fields = ('translation', 'source_segment')
\ No newline at end of file
@@ -0,0 +1,265 @@
+import logging
+import math
+import os
+from datetime import timedelta
+from typing import Dict
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.db.models.functions import Coalesce, Length
+from django.utils import timezone
+
+from books.models import Book, SourceSegment
+from core.cache_redis import get_cache_redis
+from .models import Translation, TranslationChunk
+from .schemas import TranslationMode, TranslationStatus
+
+logger = logging.getLogger(__name__)
+
+ACCEPTED = "accepted"
+QUEUED = "queued"
+REJECTED = "rejected"
+
+# Statuses of translations whose chunks still occupy the workers
+ACTIVE_STATUSES = (TranslationStatus.PENDING.value, TranslationStatus.PROCESSING.value)
+
+# Rough share of a file's size that ends up as extracted text, per format
+FORMAT_TEXT_RATIO = {
+    'txt': 1.0,
+    'md': 1.0,
+    'html': 0.5,
+    'epub': 1.5,  # Zip compressed
+    'docx': 1.5,  # Zip compressed
+    'pdf': 0.25,
+}
+
+PENDING_TOKENS_KEY = "admission:pending_tokens"
+
+# Throughput and calibration measured from translated chunks, in one Redis
+# hash updated by a single script per chunk so concurrent workers never lose
+# an update. Fields: tokens_per_second, chars_per_token, and per language pair
+# "<src>-<tgt>:output_ratio", ":seconds_per_token" and ":samples".
+STATS_KEY = "admission:stats"
+THROUGHPUT = "tokens_per_second"
+CHARS_PER_TOKEN = "chars_per_token"
+
+# KEYS[1]: stats hash; ARGV: alpha, samples field, then field/value pairs
+# folded into their exponentially weighted moving averages
+_RECORD_SCRIPT = """
+local alpha = tonumber(ARGV[1])
+for i = 3, #ARGV, 2 do
+    local previous = redis.call('HGET', KEYS[1], ARGV[i])
+    local value = tonumber(ARGV[i + 1])
+    if previous then
+        value = alpha * value + (1 - alpha) * tonumber(previous)
+    end
+    redis.call('HSET', KEYS[1], ARGV[i], tostring(value))
+end
+redis.call('HINCRBY', KEYS[1], ARGV[2], 1)
+"""
+
+
+def _pair_field(source_lang: str, target_lang: str, name: str) -> str:
+    return f"{source_lang}-{target_lang}:{name}"
+
+
+def _read_stats(fields) -> Dict[str, float]:
+    """The stats fields that have been measured"""
+    client = get_cache_redis(STATS_KEY)
+    if client is None:
+        # Without Redis (locmem) the fields are plain cache entries
+        values = cache.get_many([f"{STATS_KEY}:{field}" for field in fields])
+        return {field: values[f"{STATS_KEY}:{field}"] for field in fields if f"{STATS_KEY}:{field}" in values}
+    values = client.hmget(STATS_KEY, list(fields))
+    return {field: float(value) for field, value in zip(fields, values) if value is not None}
+
+
+def record_chunk_stats(stats: Dict, source_lang: str, target_lang: str):
+    """
+    Update the measured per-worker throughput, and the language pair's
+    calibration (output/input token ratio, seconds per input token), from
+    the stats of a translated chunk
+    """
+    if stats['seconds'] <= 0 or stats['input_tokens'] <= 0:
+        return
+    measurements = {
+        THROUGHPUT: stats['input_tokens'] / stats['seconds'],
+        CHARS_PER_TOKEN: stats['input_chars'] / stats['input_tokens'],
+        _pair_field(source_lang, target_lang, 'output_ratio'): stats['output_tokens'] / stats['input_tokens'],
+        _pair_field(source_lang, target_lang, 'seconds_per_token'): stats['seconds'] / stats['input_tokens'],
+    }
+    samples = _pair_field(source_lang, target_lang, 'samples')
+    alpha = settings.ADMISSION_EWMA_ALPHA
+
+    client = get_cache_redis(STATS_KEY)
+    if client is None:
+        for field, value in measurements.items():
+            previous = cache.get(f"{STATS_KEY}:{field}")
+            updated = value if previous is None else alpha * value + (1 - alpha) * previous
+            cache.set(f"{STATS_KEY}:{field}", updated, timeout=None)
+        if not cache.add(f"{STATS_KEY}:{samples}", 1, timeout=None):
+            cache.incr(f"{STATS_KEY}:{samples}")
+        return
+
+    args = [alpha, samples]
+    for field, value in measurements.items():
+        args += [field, repr(value)]
+    client.register_script(_RECORD_SCRIPT)(keys=[STATS_KEY], args=args)
+
+
+def pair_calibration(source_lang: str, target_lang: str) -> Dict:
+    """
+    Return the calibration of a language pair measured from completed chunks,
+    falling back to the cluster-wide throughput and default ratios
+    """
+    fields = {name: _pair_field(source_lang, target_lang, name)
+              for name in ('output_ratio', 'seconds_per_token', 'samples')}
+    values = _read_stats([*fields.values(), THROUGHPUT])
+    seconds_per_token = values.get(fields['seconds_per_token'])
+    if seconds_per_token is None:
+        seconds_per_token = 1 / (values.get(THROUGHPUT) or settings.ADMISSION_DEFAULT_TOKENS_PER_SECOND)
+    return {
+        'output_ratio': values.get(fields['output_ratio'], settings.ESTIMATE_DEFAULT_OUTPUT_RATIO),
+        'seconds_per_token': seconds_per_token,
+        'samples': int(values.get(fields['samples'], 0)),
+    }
+
+
+def chars_per_token() -> float:
+    return _read_stats([CHARS_PER_TOKEN]).get(CHARS_PER_TOKEN) or settings.ADMISSION_DEFAULT_CHARS_PER_TOKEN
+
+
+def cluster_tokens_per_second() -> float:
+    """Measured tokens/second of one worker slot times the number of slots"""
+    per_slot = _read_stats([THROUGHPUT]).get(THROUGHPUT) or settings.ADMISSION_DEFAULT_TOKENS_PER_SECOND
+    return per_slot * settings.ADMISSION_WORKER_SLOTS
+
+
+def segmented_book_chars(book_ids) -> Dict[int, int]:
+    """Extracted text length of the books that have been segmented, in one grouped query"""
+    rows = SourceSegment.objects.filter(book_id__in=book_ids).values('book_id', 'chunk_size').annotate(
+        chars=Sum(Length('text'))
+    ).order_by('book_id', 'chunk_size')
+    chars = {}
+    for row in rows:
+        # Every segmentation covers the same text; take the smallest chunk size's
+        chars.setdefault(row['book_id'], row['chars'] or 0)
+    return chars
+
+
+def _unsegmented_book_chars(book: Book) -> int:
+    """Estimate of the extracted text length from the file size, before segmentation"""
+    if book.file:
+        try:
+            size = os.path.getsize(book.file.path)
+        except OSError:
+            size = None
+        if size is not None:
+            return int(size * FORMAT_TEXT_RATIO.get(book.file_format or '', 1.0))
+
+    # Not downloaded yet
+    return settings.ADMISSION_DEFAULT_BOOK_CHARS
+
+
+def estimate_book_chars(book: Book) -> int:
+    """Estimate the extracted text length of a book, exact once it has been segmented"""
+    segmented = segmented_book_chars([book.id])
+    if book.id in segmented:
+        return segmented[book.id]
+    return _unsegmented_book_chars(book)
+
+
+def estimate_book_tokens(book: Book) -> int:
+    return math.ceil(estimate_book_chars(book) / chars_per_token())
+
+
+def pending_tokens() -> int:
+    """
+    Estimate the tokens of eager work that is queued or running. Lazy
+    translations are left out: their chunks are only queued when read.
+    Cached for a few seconds so bursts of requests share one query.
+    """
+    cached = cache.get(PENDING_TOKENS_KEY)
+    if cached is not None:
+        return cached
+
+    active = Translation.objects.filter(
+        status__in=ACTIVE_STATUSES
+    ).exclude(mode=TranslationMode.LAZY.value)
+
+    # Chunks not yet translated
+    chars = TranslationChunk.objects.filter(
+        translation__in=active,
+        status__in=ACTIVE_STATUSES
+    ).aggregate(
+        chars=Sum(Coalesce(Length('source_segment__text'), Length('original_text')))
+    )['chars'] or 0
+
+    # Translations still being prepared have no chunks yet
+    preparing = list(active.filter(total_chunks=0).select_related('book'))
+    segmented = segmented_book_chars({translation.book_id for translation in preparing})
+    for translation in preparing:
+        if translation.book_id in segmented:
+            chars += segmented[translation.book_id]
+        else:
+            chars += _unsegmented_book_chars(translation.book)
+
+    tokens = math.ceil(chars / chars_per_token())
+    cache.set(PENDING_TOKENS_KEY, tokens, timeout=settings.ADMISSION_PENDING_CACHE_SECONDS)
+    return tokens
+
+
+def admit(book: Book, languages: int = 1, mode: str = TranslationMode.EAGER.value) -> Dict:
+    """
+    Decide whether a new translation job is accepted, queued with an ETA or rejected.
+
+    The job's token cost (times the number of target languages) is compared
+    with the eager work already pending and the measured cluster throughput.
+    Jobs beyond ADMISSION_MAX_PENDING_TOKENS or ADMISSION_MAX_WAIT_SECONDS of
+    backlog are rejected with a Retry-After; jobs that would wait longer than
+    ADMISSION_QUEUE_WAIT_SECONDS are accepted as queued with an ETA.
+    """
+    estimated_tokens = estimate_book_tokens(book) * languages
+    pending = pending_tokens()
+    throughput = cluster_tokens_per_second()
+
+    wait_seconds = pending / throughput
+    duration_seconds = estimated_tokens / throughput
+    decision = {
+        'decision': ACCEPTED,
+        'estimated_tokens': estimated_tokens,
+        'pending_tokens': pending,
+        'tokens_per_second': round(throughput, 2),
+        'wait_seconds': round(wait_seconds, 1),
+        'eta': timezone.now() + timedelta(seconds=wait_seconds + duration_seconds),
+        'retry_after': None,
+    }
+
+    if not settings.ADMISSION_CONTROL_ENABLED or mode == TranslationMode.LAZY.value:
+        # Lazy jobs only queue work as it is read
+        return decision
+
+    over_tokens = pending + estimated_tokens - settings.ADMISSION_MAX_PENDING_TOKENS
+    over_seconds = wait_seconds - settings.ADMISSION_MAX_WAIT_SECONDS
+    # A job larger than the whole budget is still admitted once nothing else is pending
+    if pending > 0 and (over_tokens > 0 or over_seconds > 0):
+        retry_after = max(over_tokens / throughput, over_seconds, 1)
+        decision['decision'] = REJECTED
+        decision['retry_after'] = min(math.ceil(retry_after), settings.ADMISSION_MAX_RETRY_AFTER)
+        logger.warning(
+            f"Rejected translation of book {book.id}: {estimated_tokens} tokens with {pending} pending "
+            f"at {throughput:.0f} tokens/s, retry after {decision['retry_after']}s"
+        )
+    elif wait_seconds > settings.ADMISSION_QUEUE_WAIT_SECONDS:
+        decision['decision'] = QUEUED
+
+    return decision
+
+
+def reserve_pending_tokens(tokens: int):
+    """Add an accepted job to the cached pending work so a burst of requests sees it"""
+    try:
+        cache.incr(PENDING_TOKENS_KEY, tokens)
+    except ValueError:
+        # Not cached; the next admission recomputes it from the database
+        pass
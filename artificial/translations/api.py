@@ -1,21 +1,42 @@
 from ninja import Router
-from typing import List, Dict, Any
-from django.http import HttpRequest
+from typing import AsyncIterator, List, Dict, Any, Iterator, Optional
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.conf import settings
+from django.db import transaction
 from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
+import json
 import logging
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 
 from books.models import Book
 from books.schemas import BookOut
 from .models import Translation, TranslationChunk
 from .schemas import (
-    TranslationCreate, TranslationOut,
-    TranslationDetailOut, TranslationChunkOut,
-    TranslationPaginatedOut, ErrorResponse, TranslationStatus
+    TranslationCreate, MultiTranslationCreate, TranslationOut, TranslationQueuedOut,
+    TranslationChunkListOut, TranslationChunkOut,
+    TranslationPaginatedOut, TranslationTraceOut, ErrorResponse, TranslationStatus, TranslationMode,
+    SnippetTranslationIn, SnippetTranslationOut
 )
-from .tasks import prepare_translation, translate_chunk
-from core.ml_translator import get_supported_languages
+from .serializers import (
+    TRANSLATION_VALUE_FIELDS, CHUNK_VALUE_FIELDS,
+    serialize_translation, serialize_translation_row, serialize_chunk_row
+)
+from .admission import QUEUED, REJECTED, admit, reserve_pending_tokens
+from .cache import cached_response, get_cache_stats
+from .compaction import CompactedChunkStore
+from .dedup import clone_translation, find_reusable_translation
+from .events import astream_events, stream_events
+from .lazy import ensure_chunk, lazy_page
+from .tasks import prepare_translation, prepare_multi_translation, translate_chunk
+from .tracing import API_CREATE, build_trace, trace_translation
+from core.languages import get_model_version, get_supported_languages
+from core.snippets import translate_snippet
+from core.renderers import orjson_response, json_bytes_response
+from core.tracing import record_span
 
 # Create the API router for the translations app
 translations_api = Router(tags=["Translations"])
@@ -23,9 +44,50 @@ translations_api = Router(tags=["Translations"])
 # Create a logger for this module
 api_logger = logging.getLogger(__name__)
 
-@translations_api.post("", response={201: TranslationOut, 400: ErrorResponse, 404: ErrorResponse})
-def create_translation(request: HttpRequest, data: TranslationCreate):
-    """Create a new translation for a book"""
+# Upper bound for a single page of the chunk listing endpoint
+MAX_CHUNK_PAGE_SIZE = 1000
+
+def _active_translation(book: Book, target_language: str) -> Optional[Translation]:
+    """Return the translation of a book into a language that has not failed, if any"""
+    return Translation.objects.filter(
+        book=book,
+        target_language=target_language
+    ).exclude(
+        status=TranslationStatus.FAILED.value
+    ).first()
+
+def _reject(response: HttpResponse, admission: Dict) -> ErrorResponse:
+    """Build the 429 answer of a rejected job"""
+    response['Retry-After'] = str(admission['retry_after'])
+    return ErrorResponse(
+        detail=f"Translation capacity exceeded: {admission['pending_tokens']} tokens pending at "
+               f"{admission['tokens_per_second']} tokens/s. Retry after {admission['retry_after']} seconds"
+    )
+
+def _admitted(payload, admission: Dict):
+    """
+    Return the status and body of admitted translations: 201, or 202 with the
+    admission details (ETA) added to each translation when the job has to wait
+    """
+    reserve_pending_tokens(admission['estimated_tokens'])
+    if admission['decision'] != QUEUED:
+        return 201, payload
+    details = {key: value for key, value in admission.items() if key != 'retry_after'}
+    if isinstance(payload, list):
+        return 202, [{**item, 'admission': details} for item in payload]
+    return 202, {**payload, 'admission': details}
+
+@translations_api.post("", response={
+    201: TranslationOut, 202: TranslationQueuedOut, 400: ErrorResponse, 404: ErrorResponse, 429: ErrorResponse
+})
+def create_translation(request: HttpRequest, response: HttpResponse, data: TranslationCreate):
+    """
+    Create a new translation for a book
+    
+    Admission control answers 202 with an ETA when the job has to wait behind
+    pending work, and 429 with Retry-After when the backlog is over its limits.
+    """
+    started_at = time.time()
     try:
         # Get the book
         try:
@@ -33,186 +95,406 @@ def create_translation(request: HttpRequest, data: TranslationCreate):
         except Book.DoesNotExist:
             return 404, ErrorResponse(detail=f"Book with ID {data.book_id} not found")
         
+        target_language = data.target_language or book.target_language
+        if target_language not in get_supported_languages():
+            return 400, ErrorResponse(detail=f"Unsupported language: {target_language}")
+        if target_language == book.source_language:
+            return 400, ErrorResponse(detail=f"Target language {target_language} is the book's source language")
+        
         # Check if a translation for this book in the same target language already exists
-        existing_translation = Translation.objects.filter(
-            book=book,
-            book__target_language=book.target_language
-        ).exclude(
-            status=TranslationStatus.FAILED.value
-        ).first()
+        existing_translation = _active_translation(book, target_language)
         
         if existing_translation:
             status_message = TranslationStatus(existing_translation.status).name.lower()
             return 400, ErrorResponse(
-                detail=f"A translation for this book to {book.target_language} already exists (status: {status_message})"
+                detail=f"A translation for this book to {target_language} already exists (status: {status_message})"
             )
         
+        # Get translation parameters
+        max_length = data.max_length or 400
+        chunk_size = data.chunk_size or 1
+        scheduling = data.scheduling.value if data.scheduling else None
+        model_version = get_model_version(book.source_language, target_language)
+        
+        # The same file may already have been translated for another book
+        if data.reuse_existing:
+            reusable = find_reusable_translation(book, target_language, model_version, max_length)
+            if reusable:
+                return 201, serialize_translation(clone_translation(reusable, book))
+        
+        admission = admit(book, mode=data.mode.value)
+        if admission['decision'] == REJECTED:
+            return 429, _reject(response, admission)
+        
         # Create a new translation with pending status
         translation = Translation.objects.create(
             book=book,
+            target_language=target_language,
             status=TranslationStatus.PENDING.value,
+            mode=data.mode.value,
+            max_length=max_length,
+            model_version=model_version,
+            profile=data.profile,
             total_chunks=0,
             completed_chunks=0
         )
         
-        # Get translation parameters
-        max_length = data.max_length if hasattr(data, 'max_length') else 400
-        chunk_size = data.chunk_size if hasattr(data, 'chunk_size') else 2000
-        
         # Queue the task to prepare translation with explicit logging
         task = prepare_translation.apply_async(
             args=[translation.id, max_length, chunk_size],
+            kwargs={
+                'scheduling': scheduling,
+                'mode': data.mode.value,
+                'background_fill': data.background_fill
+            },
             countdown=1  # Adding a small delay to ensure task is properly queued
         )
+        with trace_translation(translation.id):
+            record_span(API_CREATE, started_at, time.time() - started_at)
         
         # Return the translation details
-        return 201, TranslationOut(
-            id=translation.id,
-            book=BookOut(
-                id=book.id,
-                title=book.title,
-                author=book.author,
-                source_language=book.source_language,
-                target_language=book.target_language,
-                created_at=book.created_at,
-                url=book.url,
-                file=book.file.url if book.file else None,
-                file_format=book.file_format
-            ),
-            created_at=translation.created_at,
-            updated_at=translation.updated_at,
-            status=TranslationStatus(translation.status),
-            total_chunks=translation.total_chunks,
-            completed_chunks=translation.completed_chunks,
-            error_message=translation.error_message
-        )
+        return _admitted(serialize_translation(translation), admission)
     except Exception as e:
         api_logger.exception("Error creating translation", exc_info=e)
         return 400, ErrorResponse(detail=str(e))
 
+@translations_api.post("/multi", response={
+    201: List[TranslationOut], 202: List[TranslationQueuedOut],
+    400: ErrorResponse, 404: ErrorResponse, 429: ErrorResponse
+})
+def create_multi_translation(request: HttpRequest, response: HttpResponse, data: MultiTranslationCreate):
+    """
+    Create translations of a book into several target languages
+    
+    The book is extracted and segmented once; every language's chunks reference
+    the same source segments and are queued for workers warm for that pair.
+    Admission control applies to all languages together. Languages already
+    translated for a book with the same file content are cloned instead.
+    """
+    started_at = time.time()
+    try:
+        try:
+            book = Book.objects.get(id=data.book_id)
+        except Book.DoesNotExist:
+            return 404, ErrorResponse(detail=f"Book with ID {data.book_id} not found")
+        
+        # Keep the requested order, ignoring duplicates
+        target_languages = list(dict.fromkeys(data.target_languages))
+        if not target_languages:
+            return 400, ErrorResponse(detail="At least one target language is required")
+        
+        supported_languages = get_supported_languages()
+        for language in target_languages:
+            if language not in supported_languages:
+                return 400, ErrorResponse(detail=f"Unsupported language: {language}")
+            if language == book.source_language:
+                return 400, ErrorResponse(detail=f"Target language {language} is the book's source language")
+        
+        existing_languages = list(Translation.objects.filter(
+            book=book,
+            target_language__in=target_languages
+        ).exclude(
+            status=TranslationStatus.FAILED.value
+        ).values_list('target_language', flat=True))
+        if existing_languages:
+            return 400, ErrorResponse(
+                detail=f"Translations for this book already exist for: {', '.join(sorted(set(existing_languages)))}"
+            )
+        
+        max_length = data.max_length or 400
+        chunk_size = data.chunk_size or 1
+        scheduling = data.scheduling.value if data.scheduling else None
+        model_versions = {
+            language: get_model_version(book.source_language, language) for language in target_languages
+        }
+        
+        reusable = {}
+        if data.reuse_existing:
+            for language in target_languages:
+                translation = find_reusable_translation(book, language, model_versions[language], max_length)
+                if translation:
+                    reusable[language] = translation
+        new_languages = [language for language in target_languages if language not in reusable]
+        
+        admission = None
+        if new_languages:
+            admission = admit(book, languages=len(new_languages), mode=data.mode.value)
+            if admission['decision'] == REJECTED:
+                return 429, _reject(response, admission)
+        
+        cloned = [clone_translation(reusable[language], book) for language in target_languages if language in reusable]
+        if not new_languages:
+            return 201, [serialize_translation(translation) for translation in cloned]
+        
+        with transaction.atomic():
+            translations = [
+                Translation.objects.create(
+                    book=book,
+                    target_language=language,
+                    status=TranslationStatus.PENDING.value,
+                    mode=data.mode.value,
+                    max_length=max_length,
+                    model_version=model_versions[language],
+                    profile=data.profile,
+                    total_chunks=0,
+                    completed_chunks=0
+                )
+                for language in new_languages
+            ]
+        
+        # A single task segments the book and fans the chunks out per language
+        prepare_multi_translation.apply_async(
+            args=[book.id, [translation.id for translation in translations], max_length, chunk_size],
+            kwargs={
+                'scheduling': scheduling,
+                'mode': data.mode.value,
+                'background_fill': data.background_fill
+            },
+            countdown=1
+        )
+        with trace_translation([translation.id for translation in translations]):
+            record_span(API_CREATE, started_at, time.time() - started_at)
+        
+        return _admitted([serialize_translation(translation) for translation in cloned + translations], admission)
+    except Exception as e:
+        api_logger.exception("Error creating translations", exc_info=e)
+        return 400, ErrorResponse(detail=str(e))
+
+async def _aiterate(iterator: Iterator[str]) -> AsyncIterator[str]:
+    """Drain a blocking iterator from a thread one item at a time, so an ASGI server sends each item as it comes"""
+    done = object()
+    while True:
+        item = await sync_to_async(next, thread_sensitive=False)(iterator, done)
+        if item is done:
+            return
+        yield item
+
+def _event_stream(request: HttpRequest, events, aevents=None) -> StreamingHttpResponse:
+    """
+    Server-Sent Events response of a sync iterator under WSGI, and of an async
+    one under ASGI (Django buffers a sync iterator there until it is exhausted)
+    """
+    if isinstance(request, ASGIRequest):
+        events = aevents if aevents is not None else _aiterate(events)
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Disable proxy buffering so events are delivered immediately
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@translations_api.post("/snippet", response={200: SnippetTranslationOut, 400: ErrorResponse, 413: ErrorResponse, 504: ErrorResponse})
+async def translate_snippet_text(request: HttpRequest, data: SnippetTranslationIn):
+    """
+    Translate a short text synchronously, without creating a book or a Celery job
+    
+    Texts longer than SNIPPET_MAX_CHARS are rejected. With stream=true the
+    translation is returned as Server-Sent Events (token events, then done, or
+    error when generation fails).
+    """
+    if len(data.text) > settings.SNIPPET_MAX_CHARS:
+        return 413, ErrorResponse(detail=f"Snippet exceeds the maximum of {settings.SNIPPET_MAX_CHARS} characters")
+    
+    supported_languages = get_supported_languages()
+    for language in (data.source_language, data.target_language):
+        if language not in supported_languages:
+            return 400, ErrorResponse(detail=f"Unsupported language: {language}")
+    
+    max_length = max(1, min(data.max_length, settings.SNIPPET_MAX_LENGTH))
+    
+    if data.stream:
+        from core.ml_translator import stream_translation
+        
+        def events():
+            try:
+                for piece in stream_translation(data.text, data.source_language, data.target_language, max_length):
+                    yield f"event: token\ndata: {json.dumps({'token': piece})}\n\n"
+            except Exception as e:
+                # The 200 status is already sent; report the failure in the stream
+                api_logger.exception("Error streaming snippet translation", exc_info=e)
+                yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+                return
+            yield "event: done\ndata: {}\n\n"
+        
+        return _event_stream(request, events())
+    
+    started = time.perf_counter()
+    try:
+        # Waits on the micro-batcher in a thread, outside the event loop
+        translated_text = await sync_to_async(translate_snippet, thread_sensitive=False)(
+            data.text, data.source_language, data.target_language, max_length
+        )
+    except FutureTimeoutError:
+        return 504, ErrorResponse(detail="Snippet translation timed out")
+    except Exception as e:
+        api_logger.exception("Error translating snippet", exc_info=e)
+        return 400, ErrorResponse(detail=str(e))
+    
+    return 200, SnippetTranslationOut(
+        translated_text=translated_text,
+        source_language=data.source_language,
+        target_language=data.target_language,
+        elapsed_ms=(time.perf_counter() - started) * 1000
+    )
+
 @translations_api.get("", response=List[TranslationOut])
 def list_translations(request: HttpRequest):
     """List all translations"""
-    translations = Translation.objects.all().select_related('book')
-    return [
-        TranslationOut(
-            id=translation.id,
-            book=BookOut(
-                id=translation.book.id,
-                title=translation.book.title,
-                author=translation.book.author,
-                source_language=translation.book.source_language,
-                target_language=translation.book.target_language,
-                created_at=translation.book.created_at,
-                url=translation.book.url,
-                file=translation.book.file.url if translation.book.file else None,
-                file_format=translation.book.file_format
-            ),
-            created_at=translation.created_at,
-            updated_at=translation.updated_at,
-            status=TranslationStatus(translation.status),
-            total_chunks=getattr(translation, 'total_chunks', 0),
-            completed_chunks=getattr(translation, 'completed_chunks', 0),
-            error_message=translation.error_message
-        )
-        for translation in translations
-    ]
+    rows = Translation.objects.values(*TRANSLATION_VALUE_FIELDS)
+    return orjson_response([serialize_translation_row(row) for row in rows])
 
-@translations_api.get("/by-book/{book_id}", response=List[TranslationOut])
+@translations_api.get("/by-book/{book_id}", response={200: List[TranslationOut], 404: ErrorResponse})
 def list_translations_by_book(request: HttpRequest, book_id: int):
     """List all translations for a specific book"""
-    try:
-        book = get_object_or_404(Book, id=book_id)
-        translations = Translation.objects.filter(book=book).select_related('book')
-        
-        return [
-            TranslationOut(
-                id=translation.id,
-                book=BookOut(
-                    id=translation.book.id,
-                    title=translation.book.title,
-                    author=translation.book.author,
-                    source_language=translation.book.source_language,
-                    target_language=translation.book.target_language,
-                    created_at=translation.book.created_at,
-                    url=translation.book.url,
-                    file=translation.book.file.url if translation.book.file else None,
-                    file_format=translation.book.file_format
-                ),
-                created_at=translation.created_at,
-                updated_at=translation.updated_at,
-                status=TranslationStatus(translation.status),
-                total_chunks=getattr(translation, 'total_chunks', 0),
-                completed_chunks=getattr(translation, 'completed_chunks', 0),
-                error_message=translation.error_message
-            )
-            for translation in translations
-        ]
-    except Book.DoesNotExist:
+    if not Book.objects.filter(id=book_id).exists():
         api_logger.error(f"Book with ID {book_id} not found")
-        return []
+        return 404, ErrorResponse(detail=f"Book with ID {book_id} not found")
+    
+    rows = Translation.objects.filter(book_id=book_id).values(*TRANSLATION_VALUE_FIELDS)
+    return orjson_response([serialize_translation_row(row) for row in rows])
 
-@translations_api.get("/{translation_id}", response={200: TranslationDetailOut, 404: ErrorResponse})
+@translations_api.get("/{translation_id}", response={200: TranslationOut, 404: ErrorResponse})
 def get_translation(request: HttpRequest, translation_id: int):
-    """Get details of a specific translation including its chunks"""
-    try:
-        # Use select_related to fetch book in the same query
-        translation = get_object_or_404(
-            Translation.objects.select_related('book'),
-            id=translation_id
-        )
-        
-        # Optimize chunk query with annotated status counts
-        chunks = (TranslationChunk.objects
-                 .filter(translation=translation)
-                 .order_by('chunk_index')
-                 .defer('original_text')  # Don't load original_text as it's not needed
-                 .only(
-                     'id', 'chunk_index', 'status', 'translated_text',
-                     'created_at', 'updated_at', 'error_message'
-                 ))
+    """Get summary details of a specific translation (use /chunks for the chunk contents)"""
+    def build():
+        # completed_chunks is maintained by the chunk tasks, so no COUNT over the chunk table is needed
+        row = Translation.objects.filter(id=translation_id).values(*TRANSLATION_VALUE_FIELDS).first()
+        if row is None:
+            api_logger.error(f"Translation with ID {translation_id} not found")
+            return 404, {'detail': f"Translation with ID {translation_id} not found"}, False
+        return 200, serialize_translation_row(row), row['status'] == TranslationStatus.COMPLETED.value
+    
+    status, body = cached_response('translation', translation_id, 'translation', {}, build)
+    return json_bytes_response(body, status=status)
+
+@translations_api.get("/{translation_id}/trace", response={200: TranslationTraceOut, 404: ErrorResponse})
+def get_translation_trace(request: HttpRequest, translation_id: int, include_spans: bool = True):
+    """
+    Timeline of where a translation's time went: per-stage aggregates from the
+    API request to the assembled file, sampled spans, and the critical path
+    """
+    translation = Translation.objects.filter(id=translation_id).first()
+    if translation is None:
+        return 404, ErrorResponse(detail=f"Translation with ID {translation_id} not found")
+    return orjson_response(build_trace(translation, include_spans=include_spans))
+
+@translations_api.get("/cache/stats", response=Dict[str, Dict[str, float]])
+def get_translation_cache_stats(request: HttpRequest):
+    """Get hit/miss metrics of the completed translation response cache"""
+    return get_cache_stats()
+
+@translations_api.get("/{translation_id}/chunks", response={200: TranslationChunkListOut, 404: ErrorResponse})
+def list_translation_chunks(
+    request: HttpRequest,
+    translation_id: int,
+    since_chunk_index: Optional[int] = None,
+    status: Optional[TranslationStatus] = None,
+    include_text: bool = False,
+    limit: int = 100
+):
+    """
+    List the chunks of a translation using cursor pagination
+    
+    Parameters:
+    - since_chunk_index: Only return chunks with a greater chunk_index (pass next_since_chunk_index to continue)
+    - status: Only return chunks with this status
+    - include_text: Include translated_text in the response (omitted by default)
+    - limit: Maximum number of chunks to return (capped at 1000)
+    """
+    translation = Translation.objects.filter(id=translation_id).values('is_compacted').first()
+    if translation is None:
+        api_logger.error(f"Translation with ID {translation_id} not found")
+        return 404, ErrorResponse(detail=f"Translation with ID {translation_id} not found")
+    
+    limit = max(1, min(limit, MAX_CHUNK_PAGE_SIZE))
+    
+    if translation['is_compacted']:
+        # Every chunk of a compacted translation is completed
+        store = CompactedChunkStore.for_translation(translation_id)
+        rows = []
+        if status in (None, TranslationStatus.COMPLETED):
+            rows = store.chunk_rows(since_chunk_index, limit + 1, include_text=include_text)
+    else:
+        # Keyset pagination over the (translation, chunk_index) unique index
+        chunks = TranslationChunk.objects.filter(translation_id=translation_id)
+        if since_chunk_index is not None:
+            chunks = chunks.filter(chunk_index__gt=since_chunk_index)
+        if status is not None:
+            chunks = chunks.filter(status=status.value)
         
-        # Get completed chunks count efficiently using count() with filter
-        completed_chunks = TranslationChunk.objects.filter(
-            translation=translation,
-            status=TranslationStatus.COMPLETED.value
-        ).count()
+        fields = list(CHUNK_VALUE_FIELDS)
+        if include_text:
+            fields.append('translated_text')
         
-        return 200, TranslationDetailOut(
-            id=translation.id,
-            book=BookOut(
-                id=translation.book.id,
-                title=translation.book.title,
-                author=translation.book.author,
-                source_language=translation.book.source_language,
-                target_language=translation.book.target_language,
-                created_at=translation.book.created_at,
-                url=translation.book.url,
-                file=translation.book.file.url if translation.book.file else None,
-                file_format=translation.book.file_format
-            ),
-            created_at=translation.created_at,
-            updated_at=translation.updated_at,
-            status=TranslationStatus(translation.status),
-            total_chunks=translation.total_chunks,
-            completed_chunks=completed_chunks,
-            error_message=translation.error_message,
-            chunks=[
-                TranslationChunkOut(
-                    id=chunk.id,
-                    chunk_index=chunk.chunk_index,
-                    status=TranslationStatus(chunk.status),
-                    translated_text=chunk.translated_text,
-                    created_at=chunk.created_at,
-                    updated_at=chunk.updated_at,
-                    error_message=chunk.error_message
-                )
-                for chunk in chunks
-            ]
-        )
-    except Translation.DoesNotExist:
+        # Fetch one extra row to know whether another page exists
+        rows = list(chunks.order_by('chunk_index').values(*fields)[:limit + 1])
+    
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return orjson_response({
+        'translation_id': translation_id,
+        'chunks': [serialize_chunk_row(row) for row in rows],
+        'next_since_chunk_index': rows[-1]['chunk_index'] if has_more else None,
+        'has_more': has_more,
+    })
+
+@translations_api.get("/{translation_id}/events", response={404: ErrorResponse})
+async def stream_translation_events(request: HttpRequest, translation_id: int, last_event_id: Optional[int] = None):
+    """
+    Stream translation progress as Server-Sent Events
+    
+    Events:
+    - snapshot: current status and counters (sent on connect)
+    - progress: a chunk completed (chunk_index, completed_chunks, total_chunks)
+    - status: the translation status changed (the stream ends on completed/failed)
+    
+    Reconnecting clients resume through the Last-Event-ID header (or the last_event_id parameter).
+    """
+    if not await Translation.objects.filter(id=translation_id).aexists():
         api_logger.error(f"Translation with ID {translation_id} not found")
         return 404, ErrorResponse(detail=f"Translation with ID {translation_id} not found")
+    
+    header_event_id = request.headers.get('Last-Event-ID')
+    if header_event_id and header_event_id.isdigit():
+        last_event_id = int(header_event_id)
+    
+    return _event_stream(
+        request,
+        stream_events(translation_id, last_event_id),
+        astream_events(translation_id, last_event_id)
+    )
+
+def paginate_translation_text(translation: Dict, texts: List[str], page: int, page_size: int):
+    """Return (status, payload) of a page of the joined chunk texts of a translation"""
+    # Check if translation has chunks
+    if not texts:
+        return 404, {'detail': "No translated chunks found for this translation"}
+        
+    # Combine all chunk texts
+    full_text = "\n\n".join(text for text in texts if text)
+    
+    # Calculate pagination
+    total_chars = len(full_text)
+    total_pages = max(1, (total_chars + page_size - 1) // page_size)
+    
+    # Ensure page is within bounds
+    current_page = max(1, min(page, total_pages))
+    
+    # Extract the requested page of content
+    start_idx = (current_page - 1) * page_size
+    end_idx = min(start_idx + page_size, total_chars)
+    page_content = full_text[start_idx:end_idx] if start_idx < total_chars else ""
+    
+    return 200, {
+        'id': translation['id'],
+        'book_id': translation['book_id'],
+        'page_content': page_content,
+        'readable_until': translation['readable_until'],
+        'total_pages': total_pages,
+        'current_page': current_page,
+        'has_next': current_page < total_pages,
+        'has_previous': current_page > 1,
+    }
 
 @translations_api.get("/{translation_id}/paginated", response={200: TranslationPaginatedOut, 404: ErrorResponse})
 def get_paginated_translation(
@@ -222,44 +504,38 @@ def get_paginated_translation(
     page_size: int = 2000
 ):
     """Get a paginated view of a translation's content"""
-    try:
-        translation = get_object_or_404(Translation, id=translation_id)
-        chunks = list(TranslationChunk.objects.filter(
-            translation=translation,
-            status='completed'
-        ).order_by('chunk_index'))
-        
-        # Check if translation has chunks
-        if not chunks:
-            return 404, ErrorResponse(detail="No translated chunks found for this translation")
-            
-        # Combine all chunk texts
-        full_text = "\n\n".join(chunk.translated_text for chunk in chunks if chunk.translated_text)
-        
-        # Calculate pagination
-        total_chars = len(full_text)
-        total_pages = max(1, (total_chars + page_size - 1) // page_size)
+    page_size = max(1, page_size)
+    
+    def build():
+        translation = Translation.objects.filter(id=translation_id).values(
+            'id', 'book_id', 'status', 'mode', 'is_compacted', 'readable_until'
+        ).first()
+        if translation is None:
+            api_logger.error(f"Translation with ID {translation_id} not found")
+            return 404, {'detail': f"Translation with ID {translation_id} not found"}, False
         
-        # Ensure page is within bounds
-        page = max(1, min(page, total_pages))
+        if (translation['mode'] == TranslationMode.LAZY.value
+                and translation['status'] != TranslationStatus.COMPLETED.value):
+            # Translate the requested page on demand instead of serving the readable prefix
+            status, payload = lazy_page(translation, page, page_size)
+            return status, payload, False
         
-        # Extract the requested page of content
-        start_idx = (page - 1) * page_size
-        end_idx = min(start_idx + page_size, total_chars)
-        page_content = full_text[start_idx:end_idx] if start_idx < total_chars else ""
+        if translation['is_compacted']:
+            texts = list(CompactedChunkStore.for_translation(translation_id).iter_texts())
+        else:
+            # Serve only the contiguous translated prefix so pages never have holes
+            texts = list(TranslationChunk.objects.filter(
+                translation_id=translation_id,
+                chunk_index__lt=translation['readable_until']
+            ).order_by('chunk_index').values_list('translated_text', flat=True))
         
-        return 200, TranslationPaginatedOut(
-            id=translation.id,
-            book_id=translation.book.id,
-            page_content=page_content,
-            total_pages=total_pages,
-            current_page=page,
-            has_next=page < total_pages,
-            has_previous=page > 1
-        )
-    except Translation.DoesNotExist:
-        api_logger.error(f"Translation with ID {translation_id} not found")
-        return 404, ErrorResponse(detail=f"Translation with ID {translation_id} not found")
+        status, payload = paginate_translation_text(translation, texts, page, page_size)
+        return status, payload, status == 200 and translation['status'] == TranslationStatus.COMPLETED.value
+    
+    status, body = cached_response(
+        'translation', translation_id, 'paginated', {'page': page, 'page_size': page_size}, build
+    )
+    return json_bytes_response(body, status=status)
 
 @translations_api.get("/{translation_id}/chunk/{chunk_index}", response={200: TranslationChunkOut, 404: ErrorResponse})
 def get_translation_chunk(
@@ -268,83 +544,133 @@ def get_translation_chunk(
     chunk_index: int
 ):
     """Get a specific chunk from a translation"""
-    try:
-        translation = get_object_or_404(Translation, id=translation_id)
-        chunk = get_object_or_404(TranslationChunk, translation=translation, chunk_index=chunk_index)
-        
-        return 200, TranslationChunkOut(
-            id=chunk.id,
-            chunk_index=chunk.chunk_index,
-            status=TranslationStatus(chunk.status),
-            translated_text=chunk.translated_text,
-            created_at=chunk.created_at,
-            updated_at=chunk.updated_at,
-            error_message=chunk.error_message
-        )
-    except (Translation.DoesNotExist, TranslationChunk.DoesNotExist):
-        api_logger.error(f"Translation chunk not found for translation {translation_id} and index {chunk_index}")
-        return 404, ErrorResponse(detail=f"Translation chunk not found")
+    def build():
+        translation = Translation.objects.filter(id=translation_id).values('status', 'mode', 'is_compacted').first()
+        chunk = None
+        if (translation is not None and translation['mode'] == TranslationMode.LAZY.value
+                and translation['status'] != TranslationStatus.COMPLETED.value):
+            ensure_chunk(translation_id, chunk_index)
+        if translation is not None and translation['is_compacted']:
+            chunk = CompactedChunkStore.for_translation(translation_id).get_chunk(chunk_index)
+        elif translation is not None:
+            chunk = TranslationChunk.objects.filter(
+                translation_id=translation_id,
+                chunk_index=chunk_index
+            ).values(*CHUNK_VALUE_FIELDS, 'translated_text').first()
+        if chunk is None:
+            api_logger.error(f"Translation chunk not found for translation {translation_id} and index {chunk_index}")
+            return 404, {'detail': "Translation chunk not found"}, False
+        return 200, serialize_chunk_row(chunk), translation['status'] == TranslationStatus.COMPLETED.value
+    
+    status, body = cached_response('translation', translation_id, 'chunk', {'chunk_index': chunk_index}, build)
+    return json_bytes_response(body, status=status)
 
-@translations_api.get("/book/{book_id}/language/{language_code}", response={200: Dict[str, Any], 404: ErrorResponse})
-def get_full_translation(request: HttpRequest, book_id: int, language_code: str):
+def _merge_with_compacted_chunks(translation_ids: List[int], compacted_ids: List[int], search_query: Optional[str]) -> str:
     """
-    Retrieve the full translation text for a book by language
+    Merge the chunks of translations when some of them are compacted.
     
-    Parameters:
-    - book_id: ID of the book
-    - language_code: ISO language code for the translation (e.g., 'es', 'fr')
-    
-    Optional query parameters:
-    - search: Text to search within the translation
+    Compacted texts are not indexed by PostgreSQL, so search falls back to
+    matching every query term case-insensitively, ranked by term frequency.
     """
-    try:
-        book = get_object_or_404(Book, id=book_id)
-    except Book.DoesNotExist:
-        api_logger.error(f"Book with ID {book_id} not found")
-        return 404, ErrorResponse(detail=f"Book with ID {book_id} not found")
+    indexed_texts = list(TranslationChunk.objects.filter(
+        translation_id__in=translation_ids,
+        status=TranslationStatus.COMPLETED.value
+    ).exclude(translation_id__in=compacted_ids).values_list('chunk_index', 'translated_text'))
+    for compacted_id in compacted_ids:
+        indexed_texts.extend(CompactedChunkStore.for_translation(compacted_id).iter_indexed_texts())
+    indexed_texts.sort(key=lambda item: item[0])
+    texts = [text for _, text in indexed_texts if text]
     
-    # Check if the book matches the requested language
-    if book.target_language != language_code:
-        api_logger.error(f"Book {book_id} is not available in language {language_code} (it's in {book.target_language})")
-        return 404, ErrorResponse(detail=f"Book {book_id} is not available in language {language_code} (it's in {book.target_language})")
+    if search_query:
+        terms = search_query.lower().split()
+        ranked = []
+        for text in texts:
+            lowered = text.lower()
+            if all(term in lowered for term in terms):
+                ranked.append((sum(lowered.count(term) for term in terms), text))
+        ranked.sort(key=lambda item: item[0], reverse=True)
+        texts = [text for _, text in ranked]
     
-    # Get translations for this book
-    translations = Translation.objects.filter(book=book)
+    return "\n\n".join(texts)
+
+def build_full_translation(book_id: int, language_code: str, search_query: Optional[str]):
+    """Return (status, payload, cacheable) of the full translation text of a book in a language"""
+    book = Book.objects.filter(id=book_id).values(
+        'id', 'title', 'author', 'source_language'
+    ).first()
+    if book is None:
+        api_logger.error(f"Book with ID {book_id} not found")
+        return 404, {'detail': f"Book with ID {book_id} not found"}, False
     
-    if not translations.exists():
-        api_logger.error(f"No translations found for book {book_id}")
-        return 404, ErrorResponse(detail=f"No translations found for book {book_id}")
+    # Get the translations of this book into the requested language
+    translations = list(Translation.objects.filter(
+        book_id=book_id,
+        target_language=language_code
+    ).values('id', 'status', 'is_compacted'))
     
-    # Handle search if provided - using request.GET instead of request.query_params
-    search_query = request.GET.get('search')
-    chunks = TranslationChunk.objects.filter(
-        translation__in=translations,
-        status='completed'
-    ).order_by('chunk_index')
+    if not translations:
+        message = f"Book {book_id} is not available in language {language_code}"
+        api_logger.error(message)
+        return 404, {'detail': message}, False
     
-    if search_query:
-        # Use PostgreSQL full-text search
-        vector = SearchVector('translated_text', weight='A')
-        query = SearchQuery(search_query)
+    translation_ids = [t['id'] for t in translations]
+    compacted_ids = [t['id'] for t in translations if t['is_compacted']]
+    if compacted_ids:
+        merged_content = _merge_with_compacted_chunks(translation_ids, compacted_ids, search_query)
+    else:
+        chunks = TranslationChunk.objects.filter(
+            translation_id__in=translation_ids,
+            status=TranslationStatus.COMPLETED.value
+        ).order_by('chunk_index')
         
-        chunks = chunks.annotate(
-            search=vector,
-            rank=SearchRank(vector, query)
-        ).filter(search=query).order_by('-rank')
-    
-    # Merge all chunks into a single text
-    merged_content = "\n\n".join(chunk.translated_text for chunk in chunks if chunk.translated_text)
+        if search_query:
+            # Use PostgreSQL full-text search
+            vector = SearchVector('translated_text', weight='A')
+            query = SearchQuery(search_query)
+            
+            chunks = chunks.annotate(
+                search=vector,
+                rank=SearchRank(vector, query)
+            ).filter(search=query).order_by('-rank')
+        
+        # Merge all chunks into a single text
+        texts = chunks.values_list('translated_text', flat=True)
+        merged_content = "\n\n".join(text for text in texts if text)
     
     # Organize the response with merged content
     result = {
         'book': {
-            'id': book.id,
-            'title': book.title,
-            'author': book.author,
-            'source_language': book.source_language
+            'id': book['id'],
+            'title': book['title'],
+            'author': book['author'],
+            'source_language': book['source_language']
         },
         'target_language': language_code,
         'content': merged_content
     }
     
-    return 200, result
\ No newline at end of file
+    # Only cache once every translation into this language is final
+    return 200, result, all(t['status'] == TranslationStatus.COMPLETED.value for t in translations)
+
+@translations_api.get("/book/{book_id}/language/{language_code}", response={200: Dict[str, Any], 404: ErrorResponse})
+def get_full_translation(request: HttpRequest, book_id: int, language_code: str):
+    """
+    Retrieve the full translation text for a book by language
+    
+    Parameters:
+    - book_id: ID of the book
+    - language_code: ISO language code for the translation (e.g., 'es', 'fr')
+    
+    Optional query parameters:
+    - search: Text to search within the translation
+    """
+    # Handle search if provided - using request.GET instead of request.query_params
+    search_query = request.GET.get('search')
+    
+    def build():
+        return build_full_translation(book_id, language_code, search_query)
+    
+    status, body = cached_response(
+        'book', book_id, 'full', {'language': language_code, 'search': search_query or ''}, build
+    )
+    return json_bytes_response(body, status=status)
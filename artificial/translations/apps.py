@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class TranslationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'translations'
\ No newline at end of file
+    name = 'translations'
+
+    def ready(self) -> None:
+        import translations.signals
@@ -0,0 +1,257 @@
+from ninja import Router
+from typing import List, Dict, Any, Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest, StreamingHttpResponse
+import logging
+
+from books.models import Book
+from .api import MAX_CHUNK_PAGE_SIZE, build_full_translation, paginate_translation_text
+from .cache import acached_response, aget_cached_response
+from .compaction import CompactedChunkStore
+from .events import astream_events
+from .lazy import ensure_chunk, lazy_page
+from .models import Translation, TranslationChunk
+from .schemas import (
+    TranslationOut, TranslationChunkListOut, TranslationChunkOut, TranslationPaginatedOut,
+    ErrorResponse, TranslationStatus, TranslationMode
+)
+from .serializers import (
+    TRANSLATION_VALUE_FIELDS, CHUNK_VALUE_FIELDS,
+    serialize_translation_row, serialize_chunk_row
+)
+from core.renderers import dump_json, orjson_response, json_bytes_response
+
+# Async variants of the read endpoints of the translations router, mounted
+# under /api/async/translations. They use the async ORM and async streaming
+# responses, so under an ASGI server slow reads and long streams wait on the
+# event loop instead of holding a worker thread. Paths the ORM cannot express
+# asynchronously (compacted blocks, lazy translation) run in a thread.
+translations_async_api = Router(tags=["Translations (async)"])
+
+api_logger = logging.getLogger(__name__)
+
+@translations_async_api.get("", response=List[TranslationOut])
+async def list_translations(request: HttpRequest):
+    """List all translations"""
+    rows = Translation.objects.values(*TRANSLATION_VALUE_FIELDS)
+    return orjson_response([serialize_translation_row(row) async for row in rows])
+
+@translations_async_api.get("/by-book/{book_id}", response={200: List[TranslationOut], 404: ErrorResponse})
+async def list_translations_by_book(request: HttpRequest, book_id: int):
+    """List all translations for a specific book"""
+    if not await Book.objects.filter(id=book_id).aexists():
+        return 404, ErrorResponse(detail=f"Book with ID {book_id} not found")
+
+    rows = Translation.objects.filter(book_id=book_id).values(*TRANSLATION_VALUE_FIELDS)
+    return orjson_response([serialize_translation_row(row) async for row in rows])
+
+@translations_async_api.get("/{translation_id}", response={200: TranslationOut, 404: ErrorResponse})
+async def get_translation(request: HttpRequest, translation_id: int):
+    """Get summary details of a specific translation"""
+    async def build():
+        row = await Translation.objects.filter(id=translation_id).values(*TRANSLATION_VALUE_FIELDS).afirst()
+        if row is None:
+            return 404, {'detail': f"Translation with ID {translation_id} not found"}, False
+        return 200, serialize_translation_row(row), row['status'] == TranslationStatus.COMPLETED.value
+
+    status, body = await acached_response('translation', translation_id, 'translation', {}, build)
+    return json_bytes_response(body, status=status)
+
+@translations_async_api.get("/{translation_id}/chunks", response={200: TranslationChunkListOut, 404: ErrorResponse})
+async def list_translation_chunks(
+    request: HttpRequest,
+    translation_id: int,
+    since_chunk_index: Optional[int] = None,
+    status: Optional[TranslationStatus] = None,
+    include_text: bool = False,
+    limit: int = 100
+):
+    """List the chunks of a translation using cursor pagination"""
+    translation = await Translation.objects.filter(id=translation_id).values('is_compacted').afirst()
+    if translation is None:
+        return 404, ErrorResponse(detail=f"Translation with ID {translation_id} not found")
+
+    limit = max(1, min(limit, MAX_CHUNK_PAGE_SIZE))
+
+    if translation['is_compacted']:
+        rows = []
+        if status in (None, TranslationStatus.COMPLETED):
+            store = await sync_to_async(CompactedChunkStore.for_translation)(translation_id)
+            rows = await sync_to_async(store.chunk_rows)(since_chunk_index, limit + 1, include_text=include_text)
+    else:
+        chunks = TranslationChunk.objects.filter(translation_id=translation_id)
+        if since_chunk_index is not None:
+            chunks = chunks.filter(chunk_index__gt=since_chunk_index)
+        if status is not None:
+            chunks = chunks.filter(status=status.value)
+
+        fields = list(CHUNK_VALUE_FIELDS)
+        if include_text:
+            fields.append('translated_text')
+        rows = [row async for row in chunks.order_by('chunk_index').values(*fields)[:limit + 1]]
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return orjson_response({
+        'translation_id': translation_id,
+        'chunks': [serialize_chunk_row(row) for row in rows],
+        'next_since_chunk_index': rows[-1]['chunk_index'] if has_more else None,
+        'has_more': has_more,
+    })
+
+@translations_async_api.get("/{translation_id}/events", response={404: ErrorResponse})
+async def stream_translation_events(request: HttpRequest, translation_id: int, last_event_id: Optional[int] = None):
+    """Stream translation progress as Server-Sent Events, without holding a thread per stream"""
+    if not await Translation.objects.filter(id=translation_id).aexists():
+        return 404, ErrorResponse(detail=f"Translation with ID {translation_id} not found")
+
+    header_event_id = request.headers.get('Last-Event-ID')
+    if header_event_id and header_event_id.isdigit():
+        last_event_id = int(header_event_id)
+
+    response = StreamingHttpResponse(
+        astream_events(translation_id, last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+@translations_async_api.get("/{translation_id}/paginated", response={200: TranslationPaginatedOut, 404: ErrorResponse})
+async def get_paginated_translation(
+    request: HttpRequest,
+    translation_id: int,
+    page: int = 1,
+    page_size: int = 2000
+):
+    """Get a paginated view of a translation's content"""
+    page_size = max(1, page_size)
+
+    async def build():
+        translation = await Translation.objects.filter(id=translation_id).values(
+            'id', 'book_id', 'status', 'mode', 'is_compacted', 'readable_until'
+        ).afirst()
+        if translation is None:
+            return 404, {'detail': f"Translation with ID {translation_id} not found"}, False
+
+        if (translation['mode'] == TranslationMode.LAZY.value
+                and translation['status'] != TranslationStatus.COMPLETED.value):
+            # Queues and waits for the page's chunks
+            status, payload = await sync_to_async(lazy_page)(translation, page, page_size)
+            return status, payload, False
+
+        if translation['is_compacted']:
+            store = await sync_to_async(CompactedChunkStore.for_translation)(translation_id)
+            texts = await sync_to_async(lambda: list(store.iter_texts()))()
+        else:
+            texts = [text async for text in TranslationChunk.objects.filter(
+                translation_id=translation_id,
+                chunk_index__lt=translation['readable_until']
+            ).order_by('chunk_index').values_list('translated_text', flat=True)]
+
+        status, payload = paginate_translation_text(translation, texts, page, page_size)
+        return status, payload, status == 200 and translation['status'] == TranslationStatus.COMPLETED.value
+
+    status, body = await acached_response(
+        'translation', translation_id, 'paginated', {'page': page, 'page_size': page_size}, build
+    )
+    return json_bytes_response(body, status=status)
+
+@translations_async_api.get("/{translation_id}/chunk/{chunk_index}", response={200: TranslationChunkOut, 404: ErrorResponse})
+async def get_translation_chunk(request: HttpRequest, translation_id: int, chunk_index: int):
+    """Get a specific chunk from a translation"""
+    async def build():
+        translation = await Translation.objects.filter(id=translation_id).values(
+            'status', 'mode', 'is_compacted'
+        ).afirst()
+        if translation is None:
+            return 404, {'detail': "Translation chunk not found"}, False
+        if (translation['mode'] == TranslationMode.LAZY.value
+                and translation['status'] != TranslationStatus.COMPLETED.value):
+            await sync_to_async(ensure_chunk)(translation_id, chunk_index)
+        if translation['is_compacted']:
+            store = await sync_to_async(CompactedChunkStore.for_translation)(translation_id)
+            chunk = await sync_to_async(store.get_chunk)(chunk_index)
+        else:
+            chunk = await TranslationChunk.objects.filter(
+                translation_id=translation_id,
+                chunk_index=chunk_index
+            ).values(*CHUNK_VALUE_FIELDS, 'translated_text').afirst()
+        if chunk is None:
+            return 404, {'detail': "Translation chunk not found"}, False
+        return 200, serialize_chunk_row(chunk), translation['status'] == TranslationStatus.COMPLETED.value
+
+    status, body = await acached_response('translation', translation_id, 'chunk', {'chunk_index': chunk_index}, build)
+    return json_bytes_response(body, status=status)
+
+async def _stream_full_translation(key: str, head: Dict, translation_ids: List[int], cacheable: bool):
+    """
+    Yield the full translation JSON piece by piece as chunks are read from the
+    database, storing the assembled body in the response cache when complete
+    """
+    # {"book": {...}, "target_language": "..", "content": "<escaped chunk texts>"}
+    prefix = dump_json(head)[:-1] + b',"content":"'
+    pieces = [prefix]
+    yield prefix
+
+    separator = b''
+    texts = TranslationChunk.objects.filter(
+        translation_id__in=translation_ids,
+        status=TranslationStatus.COMPLETED.value
+    ).order_by('chunk_index').values_list('translated_text', flat=True)
+    async for text in texts.aiterator(chunk_size=500):
+        if not text:
+            continue
+        piece = separator + dump_json(text)[1:-1]
+        separator = b'\\n\\n'
+        if cacheable:
+            pieces.append(piece)
+        yield piece
+
+    yield b'"}'
+    if cacheable:
+        pieces.append(b'"}')
+        await cache.aset(key, b''.join(pieces), timeout=settings.TRANSLATION_CACHE_TIMEOUT)
+
+@translations_async_api.get("/book/{book_id}/language/{language_code}", response={200: Dict[str, Any], 404: ErrorResponse})
+async def get_full_translation(request: HttpRequest, book_id: int, language_code: str):
+    """
+    Retrieve the full translation text for a book by language
+
+    The text is streamed as it is read from the chunk table instead of being
+    assembled in memory first. Searches and compacted translations are built
+    in a thread as in the sync endpoint.
+    """
+    search_query = request.GET.get('search')
+    key, body = await aget_cached_response(
+        'book', book_id, 'full', {'language': language_code, 'search': search_query or ''}
+    )
+    if body is not None:
+        return json_bytes_response(body)
+
+    book = await Book.objects.filter(id=book_id).values('id', 'title', 'author', 'source_language').afirst()
+    if book is None:
+        return 404, ErrorResponse(detail=f"Book with ID {book_id} not found")
+    translations = [t async for t in Translation.objects.filter(
+        book_id=book_id,
+        target_language=language_code
+    ).values('id', 'status', 'is_compacted')]
+    if not translations:
+        return 404, ErrorResponse(detail=f"Book {book_id} is not available in language {language_code}")
+    cacheable = all(t['status'] == TranslationStatus.COMPLETED.value for t in translations)
+
+    if search_query or any(t['is_compacted'] for t in translations):
+        status, payload, _ = await sync_to_async(build_full_translation)(book_id, language_code, search_query)
+        body = dump_json(payload)
+        if status == 200 and cacheable:
+            await cache.aset(key, body, timeout=settings.TRANSLATION_CACHE_TIMEOUT)
+        return json_bytes_response(body, status=status)
+
+    head = {'book': book, 'target_language': language_code}
+    return StreamingHttpResponse(
+        _stream_full_translation(key, head, [t['id'] for t in translations], cacheable),
+        content_type='application/json'
+    )
@@ -0,0 +1,153 @@
+import hashlib
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+
+from core.renderers import dump_json
+
+logger = logging.getLogger(__name__)
+
+# Responses are cached under a per-object generation number, so invalidating
+# a translation (or book) is a single counter bump instead of a key scan.
+KEY_PREFIX = 'translation_response'
+CACHE_ENDPOINTS = ('translation', 'paginated', 'chunk', 'full')
+
+
+def _generation_key(scope: str, object_id: int) -> str:
+    return f"{KEY_PREFIX}:gen:{scope}:{object_id}"
+
+
+def _stats_key(endpoint: str, outcome: str) -> str:
+    return f"{KEY_PREFIX}:stats:{endpoint}:{outcome}"
+
+
+def _incr(key: str):
+    """Increment a counter, creating it on first use"""
+    try:
+        return cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            return cache.incr(key)
+        return 1
+
+
+def _generation(scope: str, object_id: int) -> int:
+    key = _generation_key(scope, object_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, 1, timeout=None)
+        generation = cache.get(key, 1)
+    return generation
+
+
+def _response_key(scope: str, object_id: int, endpoint: str, params: Dict) -> str:
+    generation = _generation(scope, object_id)
+    encoded_params = "&".join(f"{name}={value}" for name, value in sorted(params.items()))
+    params_hash = hashlib.md5(encoded_params.encode('utf-8')).hexdigest()
+    return f"{KEY_PREFIX}:{scope}:{object_id}:{generation}:{endpoint}:{params_hash}"
+
+
+def cached_response(
+    scope: str,
+    object_id: int,
+    endpoint: str,
+    params: Dict,
+    build: Callable[[], Tuple[int, object, bool]]
+) -> Tuple[int, bytes]:
+    """
+    Read-through cache for JSON responses of completed translations.
+    
+    build() returns (status, payload, cacheable); the encoded payload is only
+    stored when the status is 200 and the builder marks it as cacheable.
+    Returns (status, encoded JSON body).
+    """
+    key = _response_key(scope, object_id, endpoint, params)
+    body = cache.get(key)
+    if body is not None:
+        _incr(_stats_key(endpoint, 'hits'))
+        return 200, body
+
+    _incr(_stats_key(endpoint, 'misses'))
+    status, payload, cacheable = build()
+    body = dump_json(payload)
+    if status == 200 and cacheable:
+        cache.set(key, body, timeout=settings.TRANSLATION_CACHE_TIMEOUT)
+    return status, body
+
+
+async def _aincr(key: str):
+    try:
+        return await cache.aincr(key)
+    except ValueError:
+        if not await cache.aadd(key, 1, timeout=None):
+            return await cache.aincr(key)
+        return 1
+
+
+async def _ageneration(scope: str, object_id: int) -> int:
+    key = _generation_key(scope, object_id)
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, 1, timeout=None)
+        generation = await cache.aget(key, 1)
+    return generation
+
+
+async def _aresponse_key(scope: str, object_id: int, endpoint: str, params: Dict) -> str:
+    generation = await _ageneration(scope, object_id)
+    encoded_params = "&".join(f"{name}={value}" for name, value in sorted(params.items()))
+    params_hash = hashlib.md5(encoded_params.encode('utf-8')).hexdigest()
+    return f"{KEY_PREFIX}:{scope}:{object_id}:{generation}:{endpoint}:{params_hash}"
+
+
+async def aget_cached_response(scope: str, object_id: int, endpoint: str, params: Dict) -> Tuple[str, Optional[bytes]]:
+    """Async cache lookup: return (key, body or None), counting the hit or miss"""
+    key = await _aresponse_key(scope, object_id, endpoint, params)
+    body = await cache.aget(key)
+    await _aincr(_stats_key(endpoint, 'hits' if body is not None else 'misses'))
+    return key, body
+
+
+async def acached_response(
+    scope: str,
+    object_id: int,
+    endpoint: str,
+    params: Dict,
+    build: Callable[[], Awaitable[Tuple[int, object, bool]]]
+) -> Tuple[int, bytes]:
+    """Async variant of cached_response, for builders using the async ORM"""
+    key, body = await aget_cached_response(scope, object_id, endpoint, params)
+    if body is not None:
+        return 200, body
+
+    status, payload, cacheable = await build()
+    body = dump_json(payload)
+    if status == 200 and cacheable:
+        await cache.aset(key, body, timeout=settings.TRANSLATION_CACHE_TIMEOUT)
+    return status, body
+
+
+def invalidate_translation(translation_id: int, book_id: int = None):
+    """Drop all cached responses of a translation and of its book's full-text view"""
+    _incr(_generation_key('translation', translation_id))
+    if book_id is not None:
+        _incr(_generation_key('book', book_id))
+    logger.info(f"Invalidated cached responses for translation {translation_id}")
+
+
+def get_cache_stats() -> Dict[str, Dict[str, float]]:
+    """Return hit/miss counters per cached endpoint"""
+    keys = [_stats_key(endpoint, outcome) for endpoint in CACHE_ENDPOINTS for outcome in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    stats = {}
+    for endpoint in CACHE_ENDPOINTS:
+        hits = values.get(_stats_key(endpoint, 'hits'), 0)
+        misses = values.get(_stats_key(endpoint, 'misses'), 0)
+        total = hits + misses
+        stats[endpoint] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+    return stats
@@ -0,0 +1,171 @@
+import bisect
+import logging
+import zlib
+from typing import Dict, Iterator, List, Optional
+from django.conf import settings
+from django.db import transaction
+
+from .cache import invalidate_translation
+from .models import CompactedTranslation, Translation, TranslationChunk
+from .schemas import TranslationStatus
+
+logger = logging.getLogger(__name__)
+
+# Version of the offsets index layout stored in CompactedTranslation.index
+INDEX_VERSION = 1
+
+
+def compact_translation_chunks(translation_id: int) -> Dict:
+    """
+    Pack the chunks of a completed translation into a single compressed row.
+
+    Translated texts are grouped into blocks of roughly
+    TRANSLATION_COMPACTION_BLOCK_CHARS characters; each block is compressed
+    independently so a single chunk can be served without inflating the whole
+    book. The per-chunk TranslationChunk rows are deleted afterwards.
+    """
+    block_chars = settings.TRANSLATION_COMPACTION_BLOCK_CHARS
+
+    with transaction.atomic():
+        translation = Translation.objects.select_for_update().get(id=translation_id)
+        if translation.is_compacted:
+            return {"compacted": False, "reason": "already compacted"}
+        if translation.status != TranslationStatus.COMPLETED.value:
+            raise ValueError(f"Translation {translation_id} is not completed (status: {translation.status})")
+
+        rows = list(TranslationChunk.objects.filter(
+            translation_id=translation_id
+        ).order_by('chunk_index').values_list('id', 'chunk_index', 'status', 'translated_text'))
+
+        if any(status != TranslationStatus.COMPLETED.value for _, _, status, _ in rows):
+            raise ValueError(f"Translation {translation_id} has chunks that are not completed")
+
+        data = bytearray()
+        blocks = []
+        chunks = []
+        block_texts: List[str] = []
+        block_length = 0
+        original_size = 0
+
+        def flush_block():
+            compressed = zlib.compress("".join(block_texts).encode('utf-8'), 6)
+            blocks.append([len(data), len(compressed)])
+            data.extend(compressed)
+
+        for chunk_id, chunk_index, _, text in rows:
+            text = text or ""
+            if block_texts and block_length + len(text) > block_chars:
+                flush_block()
+                block_texts = []
+                block_length = 0
+            chunks.append([chunk_id, chunk_index, len(blocks), block_length, block_length + len(text)])
+            block_texts.append(text)
+            block_length += len(text)
+            original_size += len(text.encode('utf-8'))
+
+        if block_texts:
+            flush_block()
+
+        CompactedTranslation.objects.create(
+            translation=translation,
+            data=bytes(data),
+            index={"version": INDEX_VERSION, "blocks": blocks, "chunks": chunks},
+            chunk_count=len(chunks),
+            original_size=original_size
+        )
+
+        # Chunks have no dependents, so this is a single DELETE statement
+        TranslationChunk.objects.filter(translation_id=translation_id).delete()
+        Translation.objects.filter(id=translation_id).update(is_compacted=True)
+
+    invalidate_translation(translation_id, translation.book_id)
+
+    logger.info(
+        f"Compacted translation {translation_id}: {len(chunks)} chunks, "
+        f"{original_size} bytes into {len(data)} bytes"
+    )
+
+    return {
+        "compacted": True,
+        "chunk_count": len(chunks),
+        "original_size": original_size,
+        "compressed_size": len(data)
+    }
+
+
+class CompactedChunkStore:
+    """Read access to the chunks of a compacted translation"""
+
+    def __init__(self, compacted: CompactedTranslation, created_at=None, updated_at=None):
+        self._data = bytes(compacted.data)
+        self._blocks = compacted.index["blocks"]
+        self._chunks = compacted.index["chunks"]
+        self._chunk_indexes = [chunk[1] for chunk in self._chunks]
+        self._block_cache: Dict[int, str] = {}
+        # Per-chunk timestamps are not kept, report the translation's instead
+        self._created_at = created_at or compacted.created_at
+        self._updated_at = updated_at or compacted.created_at
+
+    @classmethod
+    def for_translation(cls, translation_id: int) -> Optional['CompactedChunkStore']:
+        """Load the store of a translation, or None if it has not been compacted"""
+        compacted = (CompactedTranslation.objects
+                     .select_related('translation')
+                     .filter(translation_id=translation_id)
+                     .first())
+        if compacted is None:
+            return None
+        return cls(
+            compacted,
+            created_at=compacted.translation.created_at,
+            updated_at=compacted.translation.updated_at
+        )
+
+    def __len__(self) -> int:
+        return len(self._chunks)
+
+    def _block(self, block: int) -> str:
+        if block not in self._block_cache:
+            offset, length = self._blocks[block]
+            self._block_cache[block] = zlib.decompress(self._data[offset:offset + length]).decode('utf-8')
+        return self._block_cache[block]
+
+    def _row(self, position: int, include_text: bool) -> Dict:
+        chunk_id, chunk_index, block, start, end = self._chunks[position]
+        row = {
+            'id': chunk_id,
+            'chunk_index': chunk_index,
+            'status': TranslationStatus.COMPLETED.value,
+            'created_at': self._created_at,
+            'updated_at': self._updated_at,
+            'error_message': "",
+        }
+        if include_text:
+            row['translated_text'] = self._block(block)[start:end]
+        return row
+
+    def get_chunk(self, chunk_index: int) -> Optional[Dict]:
+        """Return a chunk row (with text) by chunk_index, or None"""
+        position = bisect.bisect_left(self._chunk_indexes, chunk_index)
+        if position == len(self._chunk_indexes) or self._chunk_indexes[position] != chunk_index:
+            return None
+        return self._row(position, include_text=True)
+
+    def chunk_rows(self, since_chunk_index: Optional[int] = None, limit: Optional[int] = None,
+                   include_text: bool = False) -> List[Dict]:
+        """Return chunk rows ordered by chunk_index, starting after since_chunk_index"""
+        start = 0
+        if since_chunk_index is not None:
+            start = bisect.bisect_right(self._chunk_indexes, since_chunk_index)
+        end = len(self._chunks) if limit is None else min(len(self._chunks), start + limit)
+        return [self._row(position, include_text) for position in range(start, end)]
+
+    def iter_texts(self) -> Iterator[str]:
+        """Yield the translated texts in chunk order"""
+        for chunk_id, chunk_index, block, start, end in self._chunks:
+            yield self._block(block)[start:end]
+
+    def iter_indexed_texts(self) -> Iterator:
+        """Yield (chunk_index, translated_text) pairs in chunk order"""
+        for chunk_id, chunk_index, block, start, end in self._chunks:
+            yield chunk_index, self._block(block)[start:end]
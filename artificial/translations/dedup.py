@@ -0,0 +1,81 @@
+import logging
+from typing import Optional
+from django.db import transaction
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from books.models import Book
+from .models import CompactedTranslation, Translation, TranslationChunk
+from .schemas import TranslationStatus
+
+logger = logging.getLogger(__name__)
+
+
+def find_reusable_translation(book: Book, target_language: str, model_version: str,
+                              max_length: int) -> Optional[Translation]:
+    """
+    Return a completed translation of another book with the same file content,
+    language pair, model version and max_length, if there is one
+    """
+    if not book.content_hash:
+        return None
+    return Translation.objects.filter(
+        book__content_hash=book.content_hash,
+        book__source_language=book.source_language,
+        target_language=target_language,
+        model_version=model_version,
+        max_length=max_length,
+        status=TranslationStatus.COMPLETED.value
+    ).exclude(book_id=book.id).order_by('-updated_at').first()
+
+
+def clone_translation(source: Translation, book: Book) -> Translation:
+    """
+    Copy a completed translation to a duplicate book instead of translating it again.
+    The translated file is shared; chunks (or the compacted row) are copied so the
+    clone does not depend on the source book staying around.
+    """
+    with transaction.atomic():
+        clone = Translation.objects.create(
+            book=book,
+            target_language=source.target_language,
+            status=TranslationStatus.COMPLETED.value,
+            mode=source.mode,
+            max_length=source.max_length,
+            model_version=source.model_version,
+            translated_file=source.translated_file.name if source.translated_file else None,
+            total_chunks=source.total_chunks,
+            completed_chunks=source.completed_chunks,
+            skipped_chunks=source.skipped_chunks,
+            skip_stats=source.skip_stats,
+            readable_until=source.readable_until,
+            first_page_ready_at=timezone.now(),
+            is_compacted=source.is_compacted
+        )
+
+        if source.is_compacted:
+            compacted = CompactedTranslation.objects.get(translation_id=source.id)
+            CompactedTranslation.objects.create(
+                translation=clone,
+                data=compacted.data,
+                index=compacted.index,
+                chunk_count=compacted.chunk_count,
+                original_size=compacted.original_size
+            )
+        else:
+            rows = TranslationChunk.objects.filter(translation_id=source.id).annotate(
+                source_text_value=Coalesce('source_segment__text', 'original_text')
+            ).order_by('chunk_index').values_list('chunk_index', 'source_text_value', 'translated_text', 'status')
+            TranslationChunk.objects.bulk_create((
+                TranslationChunk(
+                    translation=clone,
+                    chunk_index=chunk_index,
+                    original_text=text,
+                    translated_text=translated_text,
+                    status=status
+                )
+                for chunk_index, text, translated_text, status in rows.iterator(chunk_size=2000)
+            ), batch_size=1000)
+
+    logger.info(f"Cloned translation {source.id} to translation {clone.id} of duplicate book {book.id}")
+    return clone
@@ -0,0 +1,70 @@
+import logging
+import math
+from datetime import timedelta
+from typing import Dict
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from books.models import Book
+from books.segmentation import get_or_create_segments
+from core.ml_translator import count_tokens
+from core.segment_classifier import SegmentKind, classify_segment
+from .admission import cluster_tokens_per_second, pair_calibration, pending_tokens
+
+logger = logging.getLogger(__name__)
+
+# Token counts only change if the segments do, which never happens for a chunk size
+TOKEN_COUNT_CACHE_SECONDS = 24 * 60 * 60
+
+
+def _token_count_key(book_id: int, chunk_size: int, max_length: int, source_lang: str, target_lang: str) -> str:
+    return f"estimate_tokens:{book_id}:{chunk_size}:{max_length}:{source_lang}-{target_lang}"
+
+
+def estimate_translation(book: Book, target_lang: str, chunk_size: int = 1, max_length: int = 400) -> Dict:
+    """
+    Estimate the cost and ETA of translating a book into a language.
+
+    The book is segmented as prepare_translation would do it (and the segments
+    are kept for the actual translation), segments that skip inference are left
+    out, and the rest are counted with the pair's tokenizer. Output tokens and
+    CPU-seconds come from the pair's calibration measured on completed chunks;
+    the ETA adds the wait behind the pending eager work.
+    """
+    source_lang = book.source_language
+    segments = get_or_create_segments(book, chunk_size)
+
+    texts = []
+    for _, _, text in segments:
+        if settings.TRANSLATION_SKIP_CLASSIFIER_ENABLED and \
+                classify_segment(text, source_lang, target_lang) != SegmentKind.TEXT:
+            continue
+        texts.append(text)
+
+    key = _token_count_key(book.id, chunk_size, max_length, source_lang, target_lang)
+    source_tokens = cache.get(key)
+    if source_tokens is None:
+        source_tokens = sum(count_tokens(texts, source_lang, target_lang, max_length=max_length))
+        cache.set(key, source_tokens, timeout=TOKEN_COUNT_CACHE_SECONDS)
+
+    calibration = pair_calibration(source_lang, target_lang)
+    cpu_seconds = source_tokens * calibration['seconds_per_token']
+    queue_wait_seconds = pending_tokens() / cluster_tokens_per_second()
+    # Chunks of one job run in parallel on every worker slot
+    run_seconds = cpu_seconds / settings.ADMISSION_WORKER_SLOTS
+
+    return {
+        'book_id': book.id,
+        'source_language': source_lang,
+        'target_language': target_lang,
+        'chunk_size': chunk_size,
+        'segments': len(segments),
+        'segments_to_translate': len(texts),
+        'source_tokens': source_tokens,
+        'expected_output_tokens': math.ceil(source_tokens * calibration['output_ratio']),
+        'estimated_cpu_seconds': round(cpu_seconds, 1),
+        'queue_wait_seconds': round(queue_wait_seconds, 1),
+        'eta': timezone.now() + timedelta(seconds=queue_wait_seconds + run_seconds),
+        'calibration_samples': calibration['samples'],
+    }
@@ -0,0 +1,234 @@
+import asyncio
+import json
+import logging
+import time
+import weakref
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+import redis
+import redis.asyncio
+from django.conf import settings
+
+from .models import Translation
+from .schemas import TranslationStatus
+
+logger = logging.getLogger(__name__)
+
+# Statuses after which no further progress events are published
+TERMINAL_STATUSES = (TranslationStatus.COMPLETED.value, TranslationStatus.FAILED.value)
+
+_redis_client = None
+# One asyncio client per event loop (a WSGI server runs async views in short-lived loops)
+_async_redis_clients = weakref.WeakKeyDictionary()
+
+
+def get_redis() -> redis.Redis:
+    """Return the shared Redis client used for progress events"""
+    global _redis_client
+    if _redis_client is None:
+        _redis_client = redis.Redis.from_url(settings.TRANSLATION_EVENTS_REDIS_URL)
+    return _redis_client
+
+
+def get_async_redis() -> redis.asyncio.Redis:
+    """Return the asyncio Redis client of the running event loop"""
+    loop = asyncio.get_running_loop()
+    client = _async_redis_clients.get(loop)
+    if client is None:
+        client = redis.asyncio.Redis.from_url(settings.TRANSLATION_EVENTS_REDIS_URL)
+        _async_redis_clients[loop] = client
+    return client
+
+
+def _channel(translation_id: int) -> str:
+    return f"translation_events:{translation_id}"
+
+
+def _sequence_key(translation_id: int) -> str:
+    return f"translation_events:seq:{translation_id}"
+
+
+def _history_key(translation_id: int) -> str:
+    return f"translation_events:history:{translation_id}"
+
+
+# KEYS: sequence, history, channel; ARGV: history length, ttl, event JSON
+# without its id. Numbering, history and publication happen in one step, so
+# concurrent publishers can never push the history out of sequence order.
+_PUBLISH_SCRIPT = """
+local event_id = redis.call('INCR', KEYS[1])
+local payload = '{"id": ' .. event_id .. ', ' .. string.sub(ARGV[3], 2)
+redis.call('RPUSH', KEYS[2], payload)
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[1]), -1)
+redis.call('EXPIRE', KEYS[2], ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[2])
+redis.call('PUBLISH', KEYS[3], payload)
+return event_id
+"""
+
+
+def publish_event(translation_id: int, event: str, data: Dict):
+    """
+    Publish a progress event for a translation.
+
+    Every event gets a per-translation sequence number that clients send back
+    as Last-Event-ID, and is kept in a capped history list for replay.
+    Failures are logged and swallowed so progress reporting never breaks a task.
+    """
+    if not settings.TRANSLATION_EVENTS_ENABLED:
+        return
+    try:
+        get_redis().register_script(_PUBLISH_SCRIPT)(
+            keys=[_sequence_key(translation_id), _history_key(translation_id), _channel(translation_id)],
+            args=[settings.TRANSLATION_EVENTS_HISTORY, settings.TRANSLATION_EVENTS_TTL_SECONDS,
+                  json.dumps({'event': event, 'data': data})]
+        )
+    except redis.RedisError as e:
+        logger.warning(f"Could not publish {event} event for translation {translation_id}: {str(e)}")
+
+
+def publish_status(translation_id: int):
+    """Publish the current status and counters of a translation"""
+    translation = Translation.objects.filter(id=translation_id).values(
+        'status', 'total_chunks', 'completed_chunks', 'error_message'
+    ).first()
+    if translation is not None:
+        publish_event(translation_id, 'status', translation)
+
+
+def _replay(translation_id: int, last_event_id: int) -> Optional[List[Dict]]:
+    """
+    Return the events published after last_event_id, or None when the history
+    no longer reaches back that far and the client needs a fresh snapshot.
+    """
+    history = [json.loads(item) for item in get_redis().lrange(_history_key(translation_id), 0, -1)]
+    if not history or history[0]['id'] > last_event_id + 1:
+        return None
+    if history[-1]['id'] < last_event_id:
+        # The sequence was reset after the history expired
+        return None
+    return [event for event in history if event['id'] > last_event_id]
+
+
+async def _areplay(client: redis.asyncio.Redis, translation_id: int, last_event_id: int) -> Optional[List[Dict]]:
+    """Async variant of _replay"""
+    history = [json.loads(item) for item in await client.lrange(_history_key(translation_id), 0, -1)]
+    if not history or history[0]['id'] > last_event_id + 1:
+        return None
+    if history[-1]['id'] < last_event_id:
+        return None
+    return [event for event in history if event['id'] > last_event_id]
+
+
+def _format_event(event_id: int, event: str, data: Dict) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_events(translation_id: int, last_event_id: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield Server-Sent Events for a translation until it reaches a terminal
+    status or the maximum stream duration elapses (the client then reconnects
+    with Last-Event-ID).
+    """
+    client = get_redis()
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    # Subscribe before reading the snapshot so no event can fall in between
+    pubsub.subscribe(_channel(translation_id))
+
+    try:
+        yield f"retry: {settings.TRANSLATION_EVENTS_RETRY_MS}\n\n"
+
+        events = _replay(translation_id, last_event_id) if last_event_id is not None else None
+        if events is None:
+            sent_id = int(client.get(_sequence_key(translation_id)) or 0)
+            snapshot = Translation.objects.filter(id=translation_id).values(
+                'status', 'total_chunks', 'completed_chunks', 'error_message'
+            ).first()
+            if snapshot is None:
+                return
+            yield _format_event(sent_id, 'snapshot', snapshot)
+            if snapshot['status'] in TERMINAL_STATUSES:
+                return
+        else:
+            sent_id = last_event_id
+            for event in events:
+                sent_id = event['id']
+                yield _format_event(event['id'], event['event'], event['data'])
+                if event['event'] == 'status' and event['data']['status'] in TERMINAL_STATUSES:
+                    return
+
+        started = time.monotonic()
+        last_write = started
+        while time.monotonic() - started < settings.TRANSLATION_EVENTS_MAX_STREAM_SECONDS:
+            message = pubsub.get_message(timeout=1.0)
+            now = time.monotonic()
+            if message is None:
+                if now - last_write >= settings.TRANSLATION_EVENTS_HEARTBEAT_SECONDS:
+                    yield ": heartbeat\n\n"
+                    last_write = now
+                continue
+
+            event = json.loads(message['data'])
+            if event['id'] <= sent_id:
+                # Already delivered through the snapshot or the replay
+                continue
+            sent_id = event['id']
+            last_write = now
+            yield _format_event(event['id'], event['event'], event['data'])
+            if event['event'] == 'status' and event['data']['status'] in TERMINAL_STATUSES:
+                return
+    finally:
+        pubsub.close()
+
+
+async def astream_events(translation_id: int, last_event_id: Optional[int] = None) -> AsyncIterator[str]:
+    """
+    Async variant of stream_events: waits on the Redis subscription without
+    holding a thread, so an ASGI worker can serve many idle event streams
+    """
+    client = get_async_redis()
+    pubsub = client.pubsub(ignore_subscribe_messages=True)
+    await pubsub.subscribe(_channel(translation_id))
+
+    try:
+        yield f"retry: {settings.TRANSLATION_EVENTS_RETRY_MS}\n\n"
+
+        events = await _areplay(client, translation_id, last_event_id) if last_event_id is not None else None
+        if events is None:
+            sent_id = int(await client.get(_sequence_key(translation_id)) or 0)
+            snapshot = await Translation.objects.filter(id=translation_id).values(
+                'status', 'total_chunks', 'completed_chunks', 'error_message'
+            ).afirst()
+            if snapshot is None:
+                return
+            yield _format_event(sent_id, 'snapshot', snapshot)
+            if snapshot['status'] in TERMINAL_STATUSES:
+                return
+        else:
+            sent_id = last_event_id
+            for event in events:
+                sent_id = event['id']
+                yield _format_event(event['id'], event['event'], event['data'])
+                if event['event'] == 'status' and event['data']['status'] in TERMINAL_STATUSES:
+                    return
+
+        started = time.monotonic()
+        last_write = started
+        while time.monotonic() - started < settings.TRANSLATION_EVENTS_MAX_STREAM_SECONDS:
+            message = await pubsub.get_message(timeout=1.0)
+            now = time.monotonic()
+            if message is None:
+                if now - last_write >= settings.TRANSLATION_EVENTS_HEARTBEAT_SECONDS:
+                    yield ": heartbeat\n\n"
+                    last_write = now
+                continue
+
+            event = json.loads(message['data'])
+            if event['id'] <= sent_id:
+                continue
+            sent_id = event['id']
+            last_write = now
+            yield _format_event(event['id'], event['event'], event['data'])
+            if event['event'] == 'status' and event['data']['status'] in TERMINAL_STATUSES:
+                return
+    finally:
+        await pubsub.aclose()
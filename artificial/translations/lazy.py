@@ -0,0 +1,191 @@
+import logging
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.db.models.functions import Coalesce, Length
+from django.utils import timezone
+
+from .models import Translation, TranslationChunk
+from .scheduling import HIGHEST_PRIORITY, chunk_queue
+from .schemas import TranslationStatus
+
+logger = logging.getLogger(__name__)
+
+# Priority of chunks translated ahead of the reader
+PREFETCH_PRIORITY = HIGHEST_PRIORITY + 1
+
+# Chunk statuses that still need to be waited for
+UNFINISHED_STATUSES = (TranslationStatus.PENDING.value, TranslationStatus.PROCESSING.value)
+
+
+def claimable_chunks() -> Q:
+    """
+    Chunks a translate_chunk task may take: pending ones, and processing ones
+    claimed longer ago than the task time limit, whose worker must have died
+    (killed for memory or by the hard time limit) without finishing them
+    """
+    stale_before = timezone.now() - timedelta(seconds=settings.CELERY_TASK_TIME_LIMIT)
+    return Q(status=TranslationStatus.PENDING.value) | Q(
+        status=TranslationStatus.PROCESSING.value, updated_at__lt=stale_before
+    )
+
+
+def _dispatch_key(chunk_id: int) -> str:
+    return f"lazy_dispatch:{chunk_id}"
+
+
+def request_chunks(translation_id: int, start_index: Optional[int] = None, end_index: Optional[int] = None,
+                   priority: int = HIGHEST_PRIORITY, max_length: Optional[int] = None) -> int:
+    """
+    Queue the pending (or abandoned, see claimable_chunks) chunks of a
+    translation between start_index and end_index (inclusive) and return how
+    many tasks were queued. A chunk that is already
+    queued is only queued again when the new request has a higher priority.
+    """
+    from .tasks import translate_chunk
+
+    translation = Translation.objects.filter(id=translation_id).values(
+        'max_length', 'target_language', 'book__source_language'
+    ).get()
+    if max_length is None:
+        max_length = translation['max_length']
+    options = {'priority': priority}
+    queue = chunk_queue(translation['book__source_language'], translation['target_language'])
+    if queue:
+        options['queue'] = queue
+
+    chunks = TranslationChunk.objects.filter(claimable_chunks(), translation_id=translation_id)
+    if start_index is not None:
+        chunks = chunks.filter(chunk_index__gte=start_index)
+    if end_index is not None:
+        chunks = chunks.filter(chunk_index__lte=end_index)
+    chunk_ids = list(chunks.order_by('chunk_index').values_list('id', flat=True))
+
+    queued = 0
+    batch_size = 500
+    for offset in range(0, len(chunk_ids), batch_size):
+        batch = chunk_ids[offset:offset + batch_size]
+        queued_priorities = cache.get_many([_dispatch_key(chunk_id) for chunk_id in batch])
+        to_queue = [
+            chunk_id for chunk_id in batch
+            if queued_priorities.get(_dispatch_key(chunk_id), priority + 1) > priority
+        ]
+        cache.set_many(
+            {_dispatch_key(chunk_id): priority for chunk_id in to_queue},
+            timeout=settings.LAZY_TRANSLATION_DISPATCH_TTL
+        )
+        for chunk_id in to_queue:
+            translate_chunk.apply_async(args=[chunk_id, max_length], **options)
+        queued += len(to_queue)
+    return queued
+
+
+def prefetch_opening_chunks(translation_id: int) -> int:
+    """Queue the first page of a lazy translation so it is ready for the first read"""
+    return request_chunks(translation_id, 0, settings.TRANSLATION_FIRST_PAGE_CHUNKS - 1, priority=PREFETCH_PRIORITY)
+
+
+def wait_for_chunks(translation_id: int, start_index: int, end_index: int,
+                    timeout: Optional[float] = None) -> bool:
+    """Wait until no chunk in the range is pending or processing; returns False on timeout"""
+    if timeout is None:
+        timeout = settings.LAZY_TRANSLATION_WAIT_SECONDS
+    deadline = time.monotonic() + timeout
+    while TranslationChunk.objects.filter(
+        translation_id=translation_id,
+        chunk_index__gte=start_index,
+        chunk_index__lte=end_index,
+        status__in=UNFINISHED_STATUSES
+    ).exists():
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.25)
+    return True
+
+
+def page_chunk_ranges(translation_id: int, page_size: int) -> List[Tuple[int, int]]:
+    """
+    Split a translation into pages of whole chunks. The translated length is not
+    known before translating, so pages are sized using the original text length.
+    """
+    lengths = TranslationChunk.objects.filter(
+        translation_id=translation_id
+    ).order_by('chunk_index').annotate(
+        length=Coalesce(Length('source_segment__text'), Length('original_text'))
+    ).values_list('chunk_index', 'length')
+
+    ranges = []
+    first_index = None
+    last_index = None
+    size = 0
+    for chunk_index, length in lengths:
+        if first_index is not None and size + length > page_size:
+            ranges.append((first_index, last_index))
+            first_index = None
+            size = 0
+        if first_index is None:
+            first_index = chunk_index
+        last_index = chunk_index
+        size += length + 2  # Chunks are joined with a blank line
+    if first_index is not None:
+        ranges.append((first_index, last_index))
+    return ranges
+
+
+def lazy_page(translation: Dict, page: int, page_size: int) -> Tuple[int, Dict]:
+    """
+    Build a page of a lazy translation, translating its chunks on demand and
+    prefetching the following pages. Returns (status, payload).
+    """
+    translation_id = translation['id']
+    ranges = page_chunk_ranges(translation_id, page_size)
+    if not ranges:
+        return 404, {'detail': "No chunks found for this translation"}
+
+    total_pages = len(ranges)
+    current_page = max(1, min(page, total_pages))
+    start_index, end_index = ranges[current_page - 1]
+
+    request_chunks(translation_id, start_index, end_index, priority=HIGHEST_PRIORITY)
+    prefetch_end = min(total_pages, current_page + settings.LAZY_TRANSLATION_PREFETCH_PAGES)
+    if prefetch_end > current_page:
+        request_chunks(translation_id, end_index + 1, ranges[prefetch_end - 1][1], priority=PREFETCH_PRIORITY)
+
+    if not wait_for_chunks(translation_id, start_index, end_index):
+        logger.warning(f"Timed out waiting for page {current_page} of lazy translation {translation_id}")
+
+    texts = TranslationChunk.objects.filter(
+        translation_id=translation_id,
+        chunk_index__gte=start_index,
+        chunk_index__lte=end_index,
+        status=TranslationStatus.COMPLETED.value
+    ).order_by('chunk_index').values_list('translated_text', flat=True)
+
+    readable_until = Translation.objects.values_list('readable_until', flat=True).get(id=translation_id)
+
+    return 200, {
+        'id': translation_id,
+        'book_id': translation['book_id'],
+        'page_content': "\n\n".join(text for text in texts if text),
+        'readable_until': readable_until,
+        'total_pages': total_pages,
+        'current_page': current_page,
+        'has_next': current_page < total_pages,
+        'has_previous': current_page > 1,
+    }
+
+
+def ensure_chunk(translation_id: int, chunk_index: int):
+    """Translate a chunk of a lazy translation on demand and prefetch the chunks after it"""
+    request_chunks(translation_id, chunk_index, chunk_index, priority=HIGHEST_PRIORITY)
+    request_chunks(
+        translation_id,
+        chunk_index + 1,
+        chunk_index + settings.LAZY_TRANSLATION_PREFETCH_CHUNKS,
+        priority=PREFETCH_PRIORITY
+    )
+    if not wait_for_chunks(translation_id, chunk_index, chunk_index):
+        logger.warning(f"Timed out waiting for chunk {chunk_index} of lazy translation {translation_id}")
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translations', '0002_alter_translation_status_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='is_compacted',
+            field=models.BooleanField(default=False, help_text='Whether the chunks were packed into a CompactedTranslation'),
+        ),
+        migrations.CreateModel(
+            name='CompactedTranslation',
+            fields=[
+                ('translation', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='compacted', serialize=False, to='translations.translation')),
+                ('data', models.BinaryField(help_text='Independently zlib-compressed blocks of translated chunk texts')),
+                ('index', models.JSONField(help_text='Offsets index of the blocks and of each chunk within its block')),
+                ('chunk_count', models.IntegerField(default=0)),
+                ('original_size', models.BigIntegerField(default=0, help_text='Uncompressed size of the translated texts in bytes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 10:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translations', '0003_translation_is_compacted_compactedtranslation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='readable_until',
+            field=models.IntegerField(default=0, help_text='Chunks before this index are all completed (contiguous readable prefix)'),
+        ),
+        migrations.AddField(
+            model_name='translation',
+            name='first_page_ready_at',
+            field=models.DateTimeField(blank=True, help_text='When the first page of chunks became readable', null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 11:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translations', '0004_translation_readable_until_first_page_ready_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='mode',
+            field=models.CharField(choices=[('eager', 'EAGER'), ('lazy', 'LAZY')], default='eager', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='translation',
+            name='max_length',
+            field=models.IntegerField(default=400, help_text='Maximum token length used when translating chunks'),
+        ),
+    ]
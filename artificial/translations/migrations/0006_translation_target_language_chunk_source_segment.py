@@ -0,0 +1,41 @@
+# Generated by Django 5.1.7 on 2026-10-19 12:00
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def copy_book_target_language(apps, schema_editor):
+    Book = apps.get_model('books', 'Book')
+    Translation = apps.get_model('translations', 'Translation')
+    Translation.objects.update(
+        target_language=Subquery(Book.objects.filter(id=OuterRef('book_id')).values('target_language')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_sourcesegment'),
+        ('translations', '0005_translation_mode_max_length'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='target_language',
+            field=models.CharField(db_index=True, default='', help_text='Language this translation is into', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copy_book_target_language, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='translationchunk',
+            name='source_segment',
+            field=models.ForeignKey(blank=True, help_text='Shared source segment translated by this chunk', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='chunks', to='books.sourcesegment'),
+        ),
+        migrations.AlterField(
+            model_name='translationchunk',
+            name='original_text',
+            field=models.TextField(blank=True, help_text='The original text of this chunk before translation (legacy chunks without a source segment)'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-19 13:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translations', '0006_translation_target_language_chunk_source_segment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='skipped_chunks',
+            field=models.IntegerField(default=0, help_text='Chunks passed through without running the model'),
+        ),
+        migrations.AddField(
+            model_name='translation',
+            name='skip_stats',
+            field=models.JSONField(blank=True, default=dict, help_text='Number of skipped chunks per segment kind'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 14:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translations', '0007_translation_skipped_chunks_skip_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='model_version',
+            field=models.CharField(blank=True, help_text='Model and revision the chunks are translated with', max_length=200),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.7 on 2026-10-19 16:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translations', '0008_translation_model_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TraceStage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(max_length=50)),
+                ('count', models.IntegerField(default=0, help_text='Number of spans of the stage')),
+                ('total_seconds', models.FloatField(default=0, help_text='Time spent in the stage summed over its spans')),
+                ('max_seconds', models.FloatField(default=0, help_text='Longest span of the stage')),
+                ('first_started_at', models.DateTimeField()),
+                ('last_ended_at', models.DateTimeField()),
+                ('translation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trace_stages', to='translations.translation')),
+            ],
+            options={
+                'unique_together': {('translation', 'stage')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TraceSpan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(max_length=50)),
+                ('chunk_index', models.IntegerField(blank=True, null=True)),
+                ('started_at', models.DateTimeField()),
+                ('seconds', models.FloatField()),
+                ('worker', models.CharField(blank=True, help_text='Host and process the span ran in', max_length=100)),
+                ('translation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trace_spans', to='translations.translation')),
+            ],
+            options={
+                'ordering': ['started_at'],
+                'indexes': [models.Index(fields=['translation', 'started_at'], name='tracespan_translation_idx')],
+            },
+        ),
+    ]
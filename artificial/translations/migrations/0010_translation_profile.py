@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-19 17:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('translations', '0009_tracestage_tracespan'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='translation',
+            name='profile',
+            field=models.BooleanField(default=False, help_text='Profile the tasks of this translation (reports in MEDIA_ROOT/profiles)'),
+        ),
+    ]
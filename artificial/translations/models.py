@@ -1,10 +1,11 @@
 from django.db import models
-from books.models import Book
-from .schemas import TranslationStatus
+from books.models import Book, SourceSegment
+from .schemas import TranslationStatus, TranslationMode
 
 class Translation(models.Model):
     """Model representing a translation of a book"""
     book = models.ForeignKey(Book, on_delete=models.CASCADE, related_name='translations')
+    target_language = models.CharField(max_length=50, db_index=True, help_text="Language this translation is into")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     status = models.CharField(
@@ -12,10 +13,23 @@ class Translation(models.Model):
         choices=[(status.value, status.name) for status in TranslationStatus],
         default=TranslationStatus.PENDING.value
     )
+    mode = models.CharField(
+        max_length=10,
+        choices=[(mode.value, mode.name) for mode in TranslationMode],
+        default=TranslationMode.EAGER.value
+    )
+    max_length = models.IntegerField(default=400, help_text="Maximum token length used when translating chunks")
+    model_version = models.CharField(max_length=200, blank=True, help_text="Model and revision the chunks are translated with")
     translated_file = models.FileField(upload_to='translations/', null=True, blank=True)
     error_message = models.TextField(blank=True)
     total_chunks = models.IntegerField(default=0)
     completed_chunks = models.IntegerField(default=0)
+    skipped_chunks = models.IntegerField(default=0, help_text="Chunks passed through without running the model")
+    skip_stats = models.JSONField(default=dict, blank=True, help_text="Number of skipped chunks per segment kind")
+    readable_until = models.IntegerField(default=0, help_text="Chunks before this index are all completed (contiguous readable prefix)")
+    first_page_ready_at = models.DateTimeField(null=True, blank=True, help_text="When the first page of chunks became readable")
+    is_compacted = models.BooleanField(default=False, help_text="Whether the chunks were packed into a CompactedTranslation")
+    profile = models.BooleanField(default=False, help_text="Profile the tasks of this translation (reports in MEDIA_ROOT/profiles)")
     
     def __str__(self):
         return f"Translation of {self.book.title} - {self.status}"
@@ -24,7 +38,15 @@ class TranslationChunk(models.Model):
     """Model representing a chunk of a translated book"""
     translation = models.ForeignKey(Translation, on_delete=models.CASCADE, related_name='chunks')
     chunk_index = models.IntegerField(help_text="The index of this chunk in the translation sequence")
-    original_text = models.TextField(help_text="The original text of this chunk before translation")
+    source_segment = models.ForeignKey(
+        SourceSegment,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='chunks',
+        help_text="Shared source segment translated by this chunk"
+    )
+    original_text = models.TextField(blank=True, help_text="The original text of this chunk before translation (legacy chunks without a source segment)")
     translated_text = models.TextField(null=True, blank=True, help_text="The translated text of this chunk")
     status = models.CharField(
         max_length=20,
@@ -40,4 +62,55 @@ class TranslationChunk(models.Model):
         unique_together = ['translation', 'chunk_index']
         
     def __str__(self):
-        return f"Chunk {self.chunk_index} of {self.translation}"
\ No newline at end of file
+        return f"Chunk {self.chunk_index} of {self.translation}"
+    
+    @property
+    def source_text(self):
+        """The text to translate, from the shared source segment when there is one"""
+        if self.source_segment_id is not None:
+            return self.source_segment.text
+        return self.original_text
+
+class CompactedTranslation(models.Model):
+    """Compressed storage of the chunks of a completed translation"""
+    translation = models.OneToOneField(Translation, on_delete=models.CASCADE, primary_key=True, related_name='compacted')
+    data = models.BinaryField(help_text="Independently zlib-compressed blocks of translated chunk texts")
+    index = models.JSONField(help_text="Offsets index of the blocks and of each chunk within its block")
+    chunk_count = models.IntegerField(default=0)
+    original_size = models.BigIntegerField(default=0, help_text="Uncompressed size of the translated texts in bytes")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"Compacted {self.translation}"
+
+class TraceStage(models.Model):
+    """Time spent in one stage of the pipeline of a translation, aggregated over all its spans"""
+    translation = models.ForeignKey(Translation, on_delete=models.CASCADE, related_name='trace_stages')
+    stage = models.CharField(max_length=50)
+    count = models.IntegerField(default=0, help_text="Number of spans of the stage")
+    total_seconds = models.FloatField(default=0, help_text="Time spent in the stage summed over its spans")
+    max_seconds = models.FloatField(default=0, help_text="Longest span of the stage")
+    first_started_at = models.DateTimeField()
+    last_ended_at = models.DateTimeField()
+    
+    class Meta:
+        unique_together = ['translation', 'stage']
+    
+    def __str__(self):
+        return f"{self.stage} of translation {self.translation_id}"
+
+class TraceSpan(models.Model):
+    """A single recorded span of a translation's pipeline (per-chunk stages are sampled)"""
+    translation = models.ForeignKey(Translation, on_delete=models.CASCADE, related_name='trace_spans')
+    stage = models.CharField(max_length=50)
+    chunk_index = models.IntegerField(null=True, blank=True)
+    started_at = models.DateTimeField()
+    seconds = models.FloatField()
+    worker = models.CharField(max_length=100, blank=True, help_text="Host and process the span ran in")
+    
+    class Meta:
+        ordering = ['started_at']
+        indexes = [models.Index(fields=['translation', 'started_at'], name='tracespan_translation_idx')]
+    
+    def __str__(self):
+        return f"{self.stage} of translation {self.translation_id}"
@@ -0,0 +1,95 @@
+import logging
+from typing import Dict, Optional
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import Translation, TranslationChunk
+from .schemas import SchedulingMode, TranslationStatus
+
+logger = logging.getLogger(__name__)
+
+# Celery priorities on the Redis transport: 0 is served first, 9 last
+HIGHEST_PRIORITY = 0
+LOWEST_PRIORITY = 9
+UNORDERED_PRIORITY = 5
+
+
+def chunk_priority(chunk_index: int, mode: str) -> int:
+    """
+    Return the Celery priority of a chunk task.
+
+    In in-order mode the first page of every translation gets the highest
+    priority and each following bucket doubles in size, so the beginning of
+    a newly submitted book overtakes the tail of books that are already running.
+    """
+    if mode != SchedulingMode.IN_ORDER.value:
+        return UNORDERED_PRIORITY
+    bucket = (chunk_index // settings.TRANSLATION_FIRST_PAGE_CHUNKS).bit_length()
+    return min(HIGHEST_PRIORITY + bucket, LOWEST_PRIORITY)
+
+
+def chunk_queue(source_lang: str, target_lang: str) -> Optional[str]:
+    """
+    Return the Celery queue for chunk tasks of a language pair, or None to use
+    the default queue. Pairs listed in TRANSLATION_PAIR_QUEUES get their own
+    queue so their tasks only reach workers that already have the model loaded.
+    """
+    pair = f"{source_lang}-{target_lang}"
+    if pair in settings.TRANSLATION_PAIR_QUEUES:
+        return f"translate.{pair}"
+    return None
+
+
+def chunk_task_options(chunk_index: int, mode: str, source_lang: str, target_lang: str) -> Dict:
+    """Return the apply_async options (priority and queue) of a chunk task"""
+    options = {'priority': chunk_priority(chunk_index, mode)}
+    queue = chunk_queue(source_lang, target_lang)
+    if queue:
+        options['queue'] = queue
+    return options
+
+
+def advance_readable_until(translation_id: int) -> int:
+    """
+    Move the readable_until watermark to the end of the contiguous prefix of
+    completed chunks and return it. The watermark never moves backwards, so
+    concurrent chunk tasks can call this without locking.
+    """
+    translation = Translation.objects.filter(id=translation_id).values(
+        'readable_until', 'created_at', 'first_page_ready_at'
+    ).get()
+    readable_until = translation['readable_until']
+
+    first_gap = TranslationChunk.objects.filter(
+        translation_id=translation_id,
+        chunk_index__gte=readable_until
+    ).exclude(
+        status=TranslationStatus.COMPLETED.value
+    ).order_by('chunk_index').values_list('chunk_index', flat=True).first()
+
+    if first_gap is None:
+        last_index = TranslationChunk.objects.filter(
+            translation_id=translation_id
+        ).aggregate(last=Max('chunk_index'))['last']
+        watermark = last_index + 1 if last_index is not None else 0
+    else:
+        watermark = first_gap
+
+    if watermark <= readable_until:
+        return readable_until
+
+    Translation.objects.filter(id=translation_id, readable_until__lt=watermark).update(readable_until=watermark)
+
+    # Time-to-first-page: the first page of chunks (or the whole book if shorter) is readable
+    if translation['first_page_ready_at'] is None and (
+        watermark >= settings.TRANSLATION_FIRST_PAGE_CHUNKS or first_gap is None
+    ):
+        now = timezone.now()
+        if Translation.objects.filter(
+            id=translation_id, first_page_ready_at__isnull=True
+        ).update(first_page_ready_at=now):
+            elapsed = (now - translation['created_at']).total_seconds()
+            logger.info(f"Translation {translation_id} first page readable after {elapsed:.1f}s")
+
+    return watermark
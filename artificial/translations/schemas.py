@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Dict, Optional, List
 from datetime import datetime
 from enum import Enum
 from books.schemas import BookOut
@@ -10,12 +10,36 @@ class TranslationStatus(str, Enum):
     COMPLETED = "completed" 
     FAILED = "failed"
 
+class SchedulingMode(str, Enum):
+    IN_ORDER = "in_order"    # Lowest chunk indexes first, so the beginning is readable early
+    UNORDERED = "unordered"  # All chunks at the same priority
+
+class TranslationMode(str, Enum):
+    EAGER = "eager"  # Translate every chunk up front
+    LAZY = "lazy"    # Segment up front, translate chunks when they are read
+
 class TranslationBase(BaseModel):
     book_id: int
 
 class TranslationCreate(TranslationBase):
     max_length: Optional[int] = 400  # Maximum length of tokens for translation
     chunk_size: Optional[int] = 1    # Sentence per chunk
+    scheduling: Optional[SchedulingMode] = None  # Defaults to TRANSLATION_SCHEDULING_MODE
+    mode: TranslationMode = TranslationMode.EAGER
+    background_fill: bool = False    # Lazy mode: translate remaining chunks at idle priority
+    target_language: Optional[str] = None  # Defaults to the book's target language
+    reuse_existing: bool = True      # Clone a completed translation of a book with the same file content
+    profile: bool = False            # Profile this translation's tasks (see TASK_PROFILING_TASKS)
+
+class MultiTranslationCreate(TranslationBase):
+    target_languages: List[str]      # One translation per language, sharing the book's segmentation
+    max_length: Optional[int] = 400
+    chunk_size: Optional[int] = 1
+    scheduling: Optional[SchedulingMode] = None
+    mode: TranslationMode = TranslationMode.EAGER
+    background_fill: bool = False
+    reuse_existing: bool = True
+    profile: bool = False
 
 class TranslationChunkOut(BaseModel):
     id: int
@@ -29,15 +53,36 @@ class TranslationChunkOut(BaseModel):
 class TranslationOut(BaseModel):
     id: int
     book: BookOut
+    target_language: str
     created_at: datetime
     updated_at: datetime
     status: TranslationStatus
+    mode: TranslationMode = TranslationMode.EAGER
+    model_version: str = ""
     total_chunks: int
     completed_chunks: int
+    skipped_chunks: int = 0  # Chunks passed through without running the model (page numbers, URLs...)
+    skip_stats: Dict[str, int] = {}
+    readable_until: int = 0  # Chunks before this index are all translated
+    first_page_ready_at: Optional[datetime] = None
     error_message: Optional[str] = None
 
-class TranslationDetailOut(TranslationOut):
+class AdmissionOut(BaseModel):
+    decision: str            # accepted, queued or rejected
+    estimated_tokens: int    # Estimated source tokens of the new job
+    pending_tokens: int      # Tokens of eager work already queued or running
+    tokens_per_second: float # Measured throughput of all workers
+    wait_seconds: float      # Expected wait before the job starts
+    eta: datetime            # Expected completion time
+
+class TranslationQueuedOut(TranslationOut):
+    admission: AdmissionOut
+
+class TranslationChunkListOut(BaseModel):
+    translation_id: int
     chunks: List[TranslationChunkOut]
+    next_since_chunk_index: Optional[int] = None  # Cursor for the next page, None when exhausted
+    has_more: bool
 
 class TranslationChunkRequest(BaseModel):
     translation_id: int
@@ -47,11 +92,56 @@ class TranslationPaginatedOut(BaseModel):
     id: int
     book_id: int
     page_content: str
+    readable_until: int  # Pages cover the contiguous translated prefix of the book
     total_pages: int
     current_page: int
     has_next: bool
     has_previous: bool
 
+class SnippetTranslationIn(BaseModel):
+    text: str
+    source_language: str = "en"
+    target_language: str
+    max_length: int = 400
+    stream: bool = False  # Stream the translation as Server-Sent Events while it is generated
+
+class SnippetTranslationOut(BaseModel):
+    translated_text: str
+    source_language: str
+    target_language: str
+    elapsed_ms: float
+
+class TraceStageOut(BaseModel):
+    stage: str
+    count: int               # Spans of the stage (one per chunk for chunk stages)
+    total_seconds: float     # Time spent in the stage, summed over its spans
+    mean_seconds: float
+    max_seconds: float
+    start_offset: float      # Seconds after the translation was created
+    end_offset: float
+
+class TraceSpanOut(BaseModel):
+    stage: str
+    chunk_index: Optional[int] = None
+    start_offset: float
+    seconds: float
+    worker: str
+
+class CriticalPathPhaseOut(BaseModel):
+    phase: str
+    seconds: float             # Wall time charged to the phase
+    stages: Dict[str, float]   # Share of each stage of the phase
+
+class TranslationTraceOut(BaseModel):
+    translation_id: int
+    status: TranslationStatus
+    created_at: datetime
+    wall_seconds: float
+    stages: List[TraceStageOut]
+    critical_path: List[CriticalPathPhaseOut]
+    dominant_phase: Optional[str] = None
+    spans: List[TraceSpanOut] = []  # Sampled spans (one chunk in TRACE_CHUNK_SAMPLE_EVERY)
+
 class TranslationList(BaseModel):
     translations: List[TranslationOut]
 
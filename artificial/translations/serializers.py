@@ -0,0 +1,66 @@
+from books.serializers import book_value_fields, serialize_book, serialize_book_row
+
+# Columns needed to render a translation with its nested book, for use with QuerySet.values()
+TRANSLATION_VALUE_FIELDS = (
+    'id', 'target_language', 'created_at', 'updated_at', 'status', 'mode', 'model_version',
+    'total_chunks', 'completed_chunks', 'skipped_chunks', 'skip_stats', 'readable_until', 'first_page_ready_at', 'error_message',
+    *book_value_fields('book__')
+)
+
+# Columns needed to render a chunk; translated_text is opt-in
+CHUNK_VALUE_FIELDS = ('id', 'chunk_index', 'status', 'created_at', 'updated_at', 'error_message')
+
+
+def serialize_translation_row(row: dict) -> dict:
+    """Serialize a QuerySet.values(*TRANSLATION_VALUE_FIELDS) row into the TranslationOut shape"""
+    return {
+        'id': row['id'],
+        'book': serialize_book_row(row, prefix='book__'),
+        'target_language': row['target_language'],
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at'],
+        'status': row['status'],
+        'mode': row['mode'],
+        'model_version': row['model_version'],
+        'total_chunks': row['total_chunks'],
+        'completed_chunks': row['completed_chunks'],
+        'skipped_chunks': row['skipped_chunks'],
+        'skip_stats': row['skip_stats'],
+        'readable_until': row['readable_until'],
+        'first_page_ready_at': row['first_page_ready_at'],
+        'error_message': row['error_message'],
+    }
+
+
+def serialize_translation(translation) -> dict:
+    """Serialize a Translation instance into the TranslationOut shape"""
+    return {
+        'id': translation.id,
+        'book': serialize_book(translation.book),
+        'target_language': translation.target_language,
+        'created_at': translation.created_at,
+        'updated_at': translation.updated_at,
+        'status': translation.status,
+        'mode': translation.mode,
+        'model_version': translation.model_version,
+        'total_chunks': translation.total_chunks,
+        'completed_chunks': translation.completed_chunks,
+        'skipped_chunks': translation.skipped_chunks,
+        'skip_stats': translation.skip_stats,
+        'readable_until': translation.readable_until,
+        'first_page_ready_at': translation.first_page_ready_at,
+        'error_message': translation.error_message,
+    }
+
+
+def serialize_chunk_row(row: dict) -> dict:
+    """Serialize a QuerySet.values() chunk row into the TranslationChunkOut shape"""
+    return {
+        'id': row['id'],
+        'chunk_index': row['chunk_index'],
+        'status': row['status'],
+        'translated_text': row.get('translated_text'),
+        'created_at': row['created_at'],
+        'updated_at': row['updated_at'],
+        'error_message': row['error_message'],
+    }
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import invalidate_translation
+from .models import Translation
+
+
+@receiver(post_save, sender=Translation)
+@receiver(post_delete, sender=Translation)
+def invalidate_translation_cache(sender, instance: Translation, **kwargs):
+    """Drop cached responses whenever a translation is re-run, updated or deleted"""
+    invalidate_translation(instance.id, instance.book_id)
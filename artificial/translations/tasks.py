@@ -1,87 +1,178 @@
-from celery import shared_task, group
+from celery import current_task, shared_task, group
 import os
+import time
 import uuid
 import logging
 from django.conf import settings
 from django.db import transaction
-from django.db.models import Count, Q
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import Length
+from django.utils import timezone
 
 from books.models import Book
 from .models import Translation, TranslationChunk
-from core.ml_translator import translate_text, split_text_into_chunks
-from core.extractor import BookExtractor
-from .schemas import TranslationStatus
+from .admission import record_chunk_stats
+from .compaction import compact_translation_chunks
+from .events import publish_event, publish_status
+from .tracing import (
+    ASSEMBLY, CHUNK_QUEUE, CHUNK_SAVE, CHUNKS_CREATE, COMPACTION, COMPLETION_CHECK, INFERENCE, PREPARE_QUEUE, SEGMENTS,
+    flush_trace_stages, is_sampled_chunk, trace_translation
+)
+from .scheduling import advance_readable_until, chunk_task_options, LOWEST_PRIORITY
+from .lazy import claimable_chunks, prefetch_opening_chunks, request_chunks
+from books.segmentation import get_or_create_segments
+from core.metrics import record_translation_completed
+from core.ml_translator import translate_text_with_stats
+from core.profiling import profile_task
+from core.segment_classifier import classify_and_passthrough
+from core.tracing import record_span, trace_stage
+from .schemas import TranslationStatus, TranslationMode
 
 logger = logging.getLogger(__name__)
 
+def _create_and_dispatch_chunks(translation, segments, max_length, scheduling, mode, background_fill):
+    """
+    Create the chunk records of a translation from the book's source segments
+    and queue their translation (or only the opening pages in lazy mode)
+    """
+    translation_id = translation.id
+    source_lang = translation.book.source_language
+    target_lang = translation.target_language
+    
+    # Segments that need no model (page numbers, URLs, text already in the
+    # target language...) are completed right away with their passthrough text
+    chunks = []
+    skip_stats = {}
+    for segment_id, segment_index, text in segments:
+        chunk = TranslationChunk(
+            translation_id=translation_id,
+            chunk_index=segment_index,
+            source_segment_id=segment_id,
+            status=TranslationStatus.PENDING.value
+        )
+        if settings.TRANSLATION_SKIP_CLASSIFIER_ENABLED:
+            kind, output = classify_and_passthrough(text, source_lang, target_lang)
+            if output is not None:
+                chunk.status = TranslationStatus.COMPLETED.value
+                chunk.translated_text = output
+                skip_stats[kind.value] = skip_stats.get(kind.value, 0) + 1
+        chunks.append(chunk)
+    
+    # Create chunk records in the database; the text stays in the shared segments
+    with transaction.atomic():
+        TranslationChunk.objects.filter(translation_id=translation_id).delete()
+        chunks = TranslationChunk.objects.bulk_create(chunks, batch_size=1000)
+    pending_chunks = [
+        (chunk.chunk_index, chunk.id) for chunk in chunks
+        if chunk.status == TranslationStatus.PENDING.value
+    ]
+    total_chunks = len(chunks)
+    skipped_chunks = total_chunks - len(pending_chunks)
+    if skipped_chunks:
+        logger.info(f"Translation {translation_id}: {skipped_chunks} of {total_chunks} chunk(s) skip inference {skip_stats}")
+    
+    # Save translation details before any chunk task can report progress
+    translation.total_chunks = total_chunks
+    translation.completed_chunks = skipped_chunks
+    translation.skipped_chunks = skipped_chunks
+    translation.skip_stats = skip_stats
+    translation.save()
+    if skipped_chunks:
+        advance_readable_until(translation_id)
+    publish_status(translation_id)
+    
+    if not pending_chunks:
+        # Nothing needs the model; finalize the translation directly
+        check_translation_completion.delay(translation_id)
+        return {
+            "success": True,
+            "translation_id": translation_id,
+            "total_chunks": total_chunks,
+            "skipped_chunks": skipped_chunks
+        }
+    
+    if mode == TranslationMode.LAZY.value:
+        # Translate the opening pages ahead of the first read, the rest on demand
+        prefetch_opening_chunks(translation_id)
+        if background_fill:
+            fill_translation.apply_async(args=[translation_id, max_length], priority=LOWEST_PRIORITY)
+        return {
+            "success": True,
+            "translation_id": translation_id,
+            "total_chunks": total_chunks,
+            "skipped_chunks": skipped_chunks,
+            "mode": mode
+        }
+    
+    # Create a group of tasks to translate each chunk, in chunk order and
+    # with reader-first priorities when scheduling in order. Pairs with a
+    # dedicated queue are routed to the workers that keep that model loaded.
+    translation_tasks = group(
+        translate_chunk.s(chunk_id, max_length).set(
+            **chunk_task_options(chunk_index, scheduling, source_lang, target_lang)
+        )
+        for chunk_index, chunk_id in pending_chunks
+    )
+    
+    # Launch the group of tasks and add a callback to finalize the translation
+    result = translation_tasks.apply_async()
+    
+    return {
+        "success": True,
+        "translation_id": translation_id,
+        "total_chunks": total_chunks,
+        "skipped_chunks": skipped_chunks,
+        "task_group_id": result.id
+    }
+
+def _mark_translation_failed(translation_id, error):
+    try:
+        Translation.objects.filter(id=translation_id).update(
+            status=TranslationStatus.FAILED.value,
+            error_message=str(error)
+        )
+        publish_status(translation_id)
+    except:
+        pass
+
 @shared_task
-def prepare_translation(translation_id, max_length=400, chunk_size=1):
+def prepare_translation(translation_id, max_length=400, chunk_size=1, scheduling=None,
+                        mode=TranslationMode.EAGER.value, background_fill=False):
     """
-    Prepare a translation by extracting the book content and creating chunk tasks
+    Prepare a translation by segmenting the book content and creating chunk tasks.
+    Segments are shared between the translations of a book, so the book is only
+    extracted once per chunk size. In lazy mode only the chunk records are
+    created; chunks are translated when read.
     """
+    scheduling = scheduling or settings.TRANSLATION_SCHEDULING_MODE
     logger.info(f"Starting prepare_translation task for translation_id={translation_id}")
     try:
         # Get the translation and related book
-        translation = Translation.objects.get(id=translation_id)
+        translation = Translation.objects.select_related('book').get(id=translation_id)
         book = translation.book
         
         # Log translation details
         logger.info(f"Found translation {translation_id} for book '{book.title}' (ID: {book.id})")
         
-        # Update translation status
-        translation.status = TranslationStatus.PROCESSING.value
-        translation.save()
-        
-        # Extract content from book
-        logger.info(f"Extracting content from book {book.id}")
-        content = BookExtractor.extract_from_book(book)
-        
-        # Split content into chunks
-        chunks = split_text_into_chunks(content, chunk_size=chunk_size)
-        total_chunks = len(chunks)
-        
-        # Create chunk records in the database
-        chunk_ids = []
-        with transaction.atomic():
-            for i, chunk_text in enumerate(chunks):
-                chunk = TranslationChunk.objects.create(
-                    translation=translation,
-                    chunk_index=i,
-                    original_text=chunk_text,
-                    status=TranslationStatus.PENDING.value
-                )
-                chunk_ids.append(chunk.id)
-        
-        # Create a group of tasks to translate each chunk
-        translation_tasks = group(
-            translate_chunk.s(chunk_id, max_length) for chunk_id in chunk_ids
-        )
-        
-        # Launch the group of tasks and add a callback to finalize the translation
-        result = translation_tasks.apply_async()
-        
-        # Save translation details
-        translation.total_chunks = total_chunks
-        translation.save()
-        
-        return {
-            "success": True,
-            "translation_id": translation_id,
-            "total_chunks": total_chunks,
-            "task_group_id": result.id
-        }
+        with profile_task('prepare_translation', f"translation_{translation_id}", force=translation.profile), \
+                trace_translation(translation_id):
+            record_span(PREPARE_QUEUE, translation.created_at.timestamp(),
+                        time.time() - translation.created_at.timestamp())
+            
+            # Update translation status
+            translation.status = TranslationStatus.PROCESSING.value
+            translation.save()
+            
+            with trace_stage(SEGMENTS):
+                segments = get_or_create_segments(book, chunk_size)
+            with trace_stage(CHUNKS_CREATE):
+                return _create_and_dispatch_chunks(translation, segments, max_length, scheduling, mode, background_fill)
     
     except Exception as e:
         logger.error(f"Error preparing translation {translation_id}: {str(e)}")
         
         # Update translation with error
-        try:
-            translation = Translation.objects.get(id=translation_id)
-            translation.status = TranslationStatus.FAILED.value
-            translation.error_message = str(e)
-            translation.save()
-        except:
-            pass
+        _mark_translation_failed(translation_id, e)
             
         return {
             "success": False,
@@ -89,48 +180,134 @@ def prepare_translation(translation_id, max_length=400, chunk_size=1):
             "error": str(e)
         }
 
+@shared_task
+def prepare_multi_translation(book_id, translation_ids, max_length=400, chunk_size=1, scheduling=None,
+                              mode=TranslationMode.EAGER.value, background_fill=False):
+    """
+    Prepare several translations of one book (one per target language).
+    The book is extracted and segmented once and every translation's chunks
+    reference the same source segments.
+    """
+    scheduling = scheduling or settings.TRANSLATION_SCHEDULING_MODE
+    logger.info(f"Starting prepare_multi_translation task for book_id={book_id}, translations={translation_ids}")
+    try:
+        book = Book.objects.get(id=book_id)
+        Translation.objects.filter(id__in=translation_ids).update(status=TranslationStatus.PROCESSING.value)
+        with trace_translation(translation_ids), trace_stage(SEGMENTS):
+            segments = get_or_create_segments(book, chunk_size)
+    except Exception as e:
+        logger.error(f"Error segmenting book {book_id} for translations {translation_ids}: {str(e)}")
+        for translation_id in translation_ids:
+            _mark_translation_failed(translation_id, e)
+        return {
+            "success": False,
+            "book_id": book_id,
+            "error": str(e)
+        }
+    
+    results = []
+    for translation in Translation.objects.select_related('book').filter(id__in=translation_ids).order_by('id'):
+        try:
+            with trace_translation(translation.id), trace_stage(CHUNKS_CREATE):
+                results.append(
+                    _create_and_dispatch_chunks(translation, segments, max_length, scheduling, mode, background_fill)
+                )
+        except Exception as e:
+            logger.error(f"Error preparing translation {translation.id}: {str(e)}")
+            _mark_translation_failed(translation.id, e)
+            results.append({
+                "success": False,
+                "translation_id": translation.id,
+                "error": str(e)
+            })
+    
+    return {
+        "success": all(result["success"] for result in results),
+        "book_id": book_id,
+        "total_segments": len(segments),
+        "translations": results
+    }
+
 @shared_task
 def translate_chunk(chunk_id, max_length=400):
     """
     Translate a specific chunk of text
     """
     try:
+        # Claim the chunk; lazy reads and prefetches may queue the same chunk more than once.
+        # updated_at dates the claim, so a chunk left processing by a dead worker can be claimed again.
+        claimed = TranslationChunk.objects.filter(claimable_chunks(), id=chunk_id).update(
+            status=TranslationStatus.PROCESSING.value,
+            updated_at=timezone.now()
+        )
+        if not claimed:
+            logger.info(f"Chunk {chunk_id} is already translated or in progress, skipping")
+            return {
+                "success": True,
+                "chunk_id": chunk_id,
+                "skipped": True
+            }
+        
         # Get the chunk and related translation/book
-        chunk = TranslationChunk.objects.get(id=chunk_id)
+        chunk = TranslationChunk.objects.select_related('translation__book', 'source_segment').get(id=chunk_id)
         translation = chunk.translation
         book = translation.book
         
-        logger.info(f"Starting translation of chunk {chunk_id} for translation {translation.id}")
-        
-        # Update chunk status
-        chunk.status = TranslationStatus.PROCESSING.value
-        chunk.save()
-        
-        # Translate the chunk
-        translated_text = translate_text(
-            chunk.original_text,
-            book.source_language,
-            book.target_language,
-            max_length=max_length
-        )
-        
-        # Update the chunk with translation
-        chunk.translated_text = translated_text
-        chunk.status = TranslationStatus.COMPLETED.value
-        chunk.save()
-        
-        logger.info(f"Completed translation of chunk {chunk_id}, updating translation status")
-        
-        # Directly update completed chunks count to avoid race conditions
-        Translation.objects.filter(id=translation.id).update(
-            completed_chunks=TranslationChunk.objects.filter(
-                translation_id=translation.id,
-                status=TranslationStatus.COMPLETED.value
-            ).count()
-        )
-        
-        # Check if all chunks are completed to update the translation status
-        check_translation_completion.delay(translation.id)
+        # Profiling every chunk of a book would mostly measure the profiler; the
+        # chunks whose trace spans are kept are a representative sample
+        with profile_task('translate_chunk', f"translation_{translation.id}_chunk_{chunk.chunk_index}",
+                          force=translation.profile and is_sampled_chunk(chunk.chunk_index)), \
+                trace_translation(translation.id, chunk.chunk_index):
+            published_at = getattr(current_task.request, 'published_at', None) if current_task else None
+            if published_at is not None:
+                record_span(CHUNK_QUEUE, published_at, time.time() - published_at)
+            
+            logger.info(f"Starting translation of chunk {chunk_id} for translation {translation.id}")
+            
+            # Translate the chunk; the inference span is the generate time, model loading has its own
+            translated_text, stats = translate_text_with_stats(
+                chunk.source_text,
+                book.source_language,
+                translation.target_language,
+                max_length=max_length
+            )
+            record_span(INFERENCE, time.time() - stats['seconds'], stats['seconds'])
+            
+            # Feed the throughput and per-pair calibration used by admission control and estimates
+            record_chunk_stats(stats, book.source_language, translation.target_language)
+            
+            with trace_stage(CHUNK_SAVE):
+                # Update the chunk with translation
+                chunk.translated_text = translated_text
+                chunk.status = TranslationStatus.COMPLETED.value
+                chunk.save()
+                
+                logger.info(f"Completed translation of chunk {chunk_id}, updating translation status")
+                
+                # Directly update completed chunks count to avoid race conditions
+                Translation.objects.filter(id=translation.id).update(
+                    completed_chunks=TranslationChunk.objects.filter(
+                        translation_id=translation.id,
+                        status=TranslationStatus.COMPLETED.value
+                    ).count()
+                )
+                
+                # Extend the contiguous readable prefix
+                readable_until = advance_readable_until(translation.id)
+                
+                # Notify progress stream subscribers
+                completed_chunks, total_chunks = Translation.objects.filter(
+                    id=translation.id
+                ).values_list('completed_chunks', 'total_chunks').get()
+                publish_event(translation.id, 'progress', {
+                    'chunk_index': chunk.chunk_index,
+                    'completed_chunks': completed_chunks,
+                    'total_chunks': total_chunks,
+                    'readable_until': readable_until
+                })
+                
+                # Check if all chunks are completed to update the translation status
+                check_translation_completion.delay(translation.id)
         
         return {
             "success": True,
@@ -160,6 +337,40 @@ def translate_chunk(chunk_id, max_length=400):
             "error": str(e)
         }
 
+@shared_task
+def fill_translation(translation_id, max_length=400):
+    """
+    Queue every untranslated chunk of a lazy translation at idle priority
+    """
+    try:
+        queued = request_chunks(translation_id, priority=LOWEST_PRIORITY, max_length=max_length)
+        logger.info(f"Background fill queued {queued} chunk(s) for translation {translation_id}")
+        return {
+            "success": True,
+            "translation_id": translation_id,
+            "queued_chunks": queued
+        }
+    except Exception as e:
+        logger.error(f"Error filling translation {translation_id}: {str(e)}")
+        return {
+            "success": False,
+            "translation_id": translation_id,
+            "error": str(e)
+        }
+
+def _record_completion_metrics(translation):
+    """Observe the duration and source characters per second of a translation that just completed"""
+    chars = TranslationChunk.objects.filter(translation_id=translation.id).aggregate(
+        segments=Sum(Length('source_segment__text')),
+        legacy=Sum(Length('original_text'))
+    )
+    record_translation_completed(
+        f"{translation.book.source_language}-{translation.target_language}",
+        translation.mode,
+        (timezone.now() - translation.created_at).total_seconds(),
+        (chars['segments'] or 0) + (chars['legacy'] or 0)
+    )
+
 @shared_task
 def check_translation_completion(translation_id):
     """
@@ -167,39 +378,72 @@ def check_translation_completion(translation_id):
     """
     try:
         logger.info(f"Checking completion status for translation {translation_id}")
-        translation = Translation.objects.get(id=translation_id)
-        
-        # Count chunks by status
-        chunk_counts = TranslationChunk.objects.filter(translation=translation).aggregate(
-            total=Count('id'),
-            completed=Count('id', filter=Q(status=TranslationStatus.COMPLETED.value)),
-            failed=Count('id', filter=Q(status=TranslationStatus.FAILED.value))
-        )
-        
-        total = chunk_counts.get('total', 0)
-        completed = chunk_counts.get('completed', 0)
-        failed = chunk_counts.get('failed', 0)
-        
-        logger.info(f"Translation {translation_id} status: total={total}, completed={completed}, failed={failed}")
-        
-        # Update translation using update() to avoid race conditions
-        translation_update = {
-            'completed_chunks': completed
-        }
-        
-        # Update translation status based on chunk counts
-        if failed > 0:
-            translation_update['status'] = TranslationStatus.FAILED.value
-            translation_update['error_message'] = f"{failed} chunk(s) failed to translate"
-        elif completed == total:
-            translation_update['status'] = TranslationStatus.COMPLETED.value
-        else:
-            translation_update['status'] = TranslationStatus.PROCESSING.value
-        
-        Translation.objects.filter(id=translation_id).update(**translation_update)
-        
-        # If translation is completed, trigger the file creation
-        if completed == total and failed == 0:
+        translation = Translation.objects.select_related('book').get(id=translation_id)
+        
+        # A late check of a compacted translation would count no chunks left
+        if translation.is_compacted:
+            logger.info(f"Translation {translation_id} is already compacted, skipping completion check")
+            return {
+                "success": True,
+                "translation_id": translation_id,
+                "skipped": True
+            }
+        
+        # Aggregated only: one span per finished chunk would outnumber the sampled chunk spans
+        with trace_translation(translation_id, keep_spans=False), trace_stage(COMPLETION_CHECK):
+            # Count chunks by status
+            chunk_counts = TranslationChunk.objects.filter(translation=translation).aggregate(
+                total=Count('id'),
+                completed=Count('id', filter=Q(status=TranslationStatus.COMPLETED.value)),
+                failed=Count('id', filter=Q(status=TranslationStatus.FAILED.value))
+            )
+            
+            total = chunk_counts.get('total', 0)
+            completed = chunk_counts.get('completed', 0)
+            failed = chunk_counts.get('failed', 0)
+            
+            logger.info(f"Translation {translation_id} status: total={total}, completed={completed}, failed={failed}")
+            
+            # Update translation using update() to avoid race conditions
+            translation_update = {
+                'completed_chunks': completed
+            }
+            
+            # Update translation status based on chunk counts
+            if failed > 0:
+                translation_update['status'] = TranslationStatus.FAILED.value
+                translation_update['error_message'] = f"{failed} chunk(s) failed to translate"
+            elif completed == total:
+                translation_update['status'] = TranslationStatus.COMPLETED.value
+            else:
+                translation_update['status'] = TranslationStatus.PROCESSING.value
+            
+            # Only the check that changes the status sees it as changed, even when
+            # the last chunks finish at the same time
+            status_changed = Translation.objects.filter(id=translation_id).exclude(
+                status=translation_update['status']
+            ).update(**translation_update)
+            if not status_changed:
+                Translation.objects.filter(id=translation_id).update(**translation_update)
+            
+            # Status changes are pushed to progress streams only once they are final
+            if status_changed and translation_update['status'] in (
+                TranslationStatus.COMPLETED.value, TranslationStatus.FAILED.value
+            ):
+                publish_status(translation_id)
+            
+            if status_changed and translation_update['status'] == TranslationStatus.COMPLETED.value:
+                _record_completion_metrics(translation)
+        
+        # The chunk stages were buffered in Redis while the chunks ran
+        if status_changed and translation_update['status'] in (
+            TranslationStatus.COMPLETED.value, TranslationStatus.FAILED.value
+        ):
+            flush_trace_stages(translation_id)
+        
+        # Only the check that completed the translation builds its file; chunk
+        # tasks finishing together queue several checks that all see it complete
+        if status_changed and translation_update['status'] == TranslationStatus.COMPLETED.value:
             create_complete_translation_file.delay(translation_id)
         
         return {
@@ -226,29 +470,44 @@ def create_complete_translation_file(translation_id):
     try:
         translation = Translation.objects.get(id=translation_id)
         
-        # Get all completed chunks, ordered by index
-        chunks = TranslationChunk.objects.filter(
-            translation=translation, 
-            status=TranslationStatus.COMPLETED.value
-        ).order_by('chunk_index')
-        
-        # Create output file
-        output_filename = f"translation_{translation.id}_{uuid.uuid4()}.txt"
-        output_path = os.path.join(settings.MEDIA_ROOT, 'translations', output_filename)
-        
-        # Ensure the directory exists
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        
-        # Combine all translated chunks into a single file
-        with open(output_path, 'w', encoding='utf-8') as f:
-            for i, chunk in enumerate(chunks):
-                if i > 0:
-                    f.write("\n\n")
-                f.write(chunk.translated_text)
+        # Built once: after compaction no chunks are left to rebuild it from
+        if translation.is_compacted or translation.translated_file:
+            logger.info(f"Translation {translation_id} already has its file, skipping")
+            return {
+                "success": True,
+                "translation_id": translation_id,
+                "skipped": True
+            }
+        
+        with profile_task('create_complete_translation_file', f"translation_{translation_id}", force=translation.profile), \
+                trace_translation(translation_id), trace_stage(ASSEMBLY):
+            # Get all completed chunks, ordered by index
+            chunks = TranslationChunk.objects.filter(
+                translation=translation, 
+                status=TranslationStatus.COMPLETED.value
+            ).order_by('chunk_index')
+            
+            # Create output file
+            output_filename = f"translation_{translation.id}_{uuid.uuid4()}.txt"
+            output_path = os.path.join(settings.MEDIA_ROOT, 'translations', output_filename)
+            
+            # Ensure the directory exists
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            
+            # Combine all translated chunks into a single file
+            with open(output_path, 'w', encoding='utf-8') as f:
+                for i, chunk in enumerate(chunks):
+                    if i > 0:
+                        f.write("\n\n")
+                    f.write(chunk.translated_text)
+            
+            # Update the translation record with the file path
+            translation.translated_file = f"translations/{output_filename}"
+            translation.save()
         
-        # Update the translation record with the file path
-        translation.translated_file = f"translations/{output_filename}"
-        translation.save()
+        # Move the chunks out of the chunk table now that the translation is final
+        if settings.TRANSLATION_COMPACTION_ENABLED:
+            compact_translation.delay(translation_id)
         
         return {
             "success": True,
@@ -262,4 +521,25 @@ def create_complete_translation_file(translation_id):
             "success": False,
             "translation_id": translation_id,
             "error": str(e)
-        }
\ No newline at end of file
+        }
+
+@shared_task
+def compact_translation(translation_id):
+    """
+    Pack the chunks of a completed translation into a compressed segment row
+    """
+    try:
+        with trace_translation(translation_id), trace_stage(COMPACTION):
+            result = compact_translation_chunks(translation_id)
+        return {
+            "success": True,
+            "translation_id": translation_id,
+            **result
+        }
+    except Exception as e:
+        logger.error(f"Error compacting translation {translation_id}: {str(e)}")
+        return {
+            "success": False,
+            "translation_id": translation_id,
+            "error": str(e)
+        }
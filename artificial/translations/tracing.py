@@ -0,0 +1,332 @@
+import logging
+import os
+import socket
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+import redis
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest, Least
+
+from core.cache_redis import get_cache_redis
+from core.tracing import collect_spans
+from .models import Translation, TraceSpan, TraceStage
+
+logger = logging.getLogger(__name__)
+
+# Stages of a translation's pipeline, in pipeline order
+API_CREATE = 'api.create'              # POST /translations request
+PREPARE_QUEUE = 'prepare.queue'        # Translation created -> prepare task started
+SEGMENTS = 'prepare.segments'          # Extraction and splitting, or reuse of existing segments
+EXTRACT = 'prepare.extract'            # Text extraction from the file (within prepare.segments, recorded in books.segmentation)
+CHUNKS_CREATE = 'prepare.chunks'       # Chunk records created and chunk tasks dispatched
+CHUNK_QUEUE = 'chunk.queue'            # Chunk task published -> started on a worker
+MODEL_LOAD = 'chunk.model_load'        # Model and tokenizer loaded into the worker (recorded in core.ml_translator)
+INFERENCE = 'chunk.inference'          # model.generate of a chunk
+CHUNK_SAVE = 'chunk.save'              # Chunk stored, progress counters and events updated
+COMPLETION_CHECK = 'completion.check'
+ASSEMBLY = 'assembly'                  # Translated file written from the chunks
+COMPACTION = 'compaction'              # Chunks packed into the compacted translation
+
+STAGES = [
+    API_CREATE, PREPARE_QUEUE, SEGMENTS, EXTRACT, CHUNKS_CREATE,
+    CHUNK_QUEUE, MODEL_LOAD, INFERENCE, CHUNK_SAVE, COMPLETION_CHECK, ASSEMBLY, COMPACTION,
+]
+
+# Consecutive phases of the pipeline used for the critical path; the chunk
+# phase runs its stages in parallel over many workers
+PHASES = [
+    ('request', [API_CREATE]),
+    ('queue', [PREPARE_QUEUE]),
+    ('segmentation', [SEGMENTS]),
+    ('chunk creation', [CHUNKS_CREATE]),
+    ('chunk translation', [CHUNK_QUEUE, MODEL_LOAD, INFERENCE, CHUNK_SAVE, COMPLETION_CHECK]),
+    ('assembly', [ASSEMBLY, COMPACTION]),
+]
+
+# Stages run for every chunk, by all workers at once. Their aggregates are
+# accumulated in a Redis hash of the translation (one script call per chunk)
+# and folded into the TraceStage rows when the translation finishes, instead
+# of one UPDATE of the same few rows per stage and chunk.
+CHUNK_STAGES = dict(PHASES)['chunk translation']
+BUFFER_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# KEYS[1]: hash of the translation; ARGV: ttl, then per stage: name, count,
+# total, max, start, end. Fields are "<stage>:<aggregate>".
+_ACCUMULATE_SCRIPT = """
+local function keep(field, value, larger)
+    local current = redis.call('HGET', KEYS[1], field)
+    if not current or (larger and tonumber(value) > tonumber(current))
+            or (not larger and tonumber(value) < tonumber(current)) then
+        redis.call('HSET', KEYS[1], field, value)
+    end
+end
+for i = 2, #ARGV, 6 do
+    local stage = ARGV[i]
+    redis.call('HINCRBY', KEYS[1], stage .. ':count', ARGV[i + 1])
+    redis.call('HINCRBYFLOAT', KEYS[1], stage .. ':total', ARGV[i + 2])
+    keep(stage .. ':max', ARGV[i + 3], true)
+    keep(stage .. ':start', ARGV[i + 4], false)
+    keep(stage .. ':end', ARGV[i + 5], true)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+"""
+
+
+def _worker() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _datetime(epoch: float) -> datetime:
+    return datetime.fromtimestamp(epoch, tz=dt_timezone.utc)
+
+
+def is_sampled_chunk(chunk_index: Optional[int]) -> bool:
+    """Whether the chunk is one of the one in TRACE_CHUNK_SAMPLE_EVERY traced (and profiled) in detail"""
+    every = settings.TRACE_CHUNK_SAMPLE_EVERY
+    return chunk_index is None or (every > 0 and chunk_index % every == 0)
+
+
+def save_spans(translation_ids: Iterable[int], spans: List[Tuple[str, float, float]],
+               chunk_index: Optional[int] = None, keep_spans: bool = True):
+    """
+    Add spans to the per-stage aggregates of the translations and, when
+    keep_spans, store them individually as well
+    """
+    if not spans:
+        return
+    stages = {}
+    for stage, started_at, seconds in spans:
+        aggregate = stages.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0,
+                                              'start': started_at, 'end': started_at + seconds})
+        aggregate['count'] += 1
+        aggregate['total'] += seconds
+        aggregate['max'] = max(aggregate['max'], seconds)
+        aggregate['start'] = min(aggregate['start'], started_at)
+        aggregate['end'] = max(aggregate['end'], started_at + seconds)
+
+    buffered = {stage: aggregate for stage, aggregate in stages.items() if stage in CHUNK_STAGES}
+    worker = _worker()
+    for translation_id in translation_ids:
+        if buffered and not _buffer_stages(translation_id, buffered):
+            # Without Redis the chunk stages go straight to their rows as well
+            for stage, aggregate in buffered.items():
+                _add_to_stage(translation_id, stage, aggregate)
+        for stage, aggregate in stages.items():
+            if stage not in buffered:
+                _add_to_stage(translation_id, stage, aggregate)
+        if keep_spans:
+            TraceSpan.objects.bulk_create([
+                TraceSpan(translation_id=translation_id, stage=stage, chunk_index=chunk_index,
+                          started_at=_datetime(started_at), seconds=seconds, worker=worker)
+                for stage, started_at, seconds in spans
+            ])
+
+
+def _add_to_stage(translation_id: int, stage: str, aggregate: Dict):
+    """Fold an aggregate into the stage row with a single UPDATE, creating the row the first time"""
+    started_at, ended_at = _datetime(aggregate['start']), _datetime(aggregate['end'])
+
+    def update():
+        return TraceStage.objects.filter(translation_id=translation_id, stage=stage).update(
+            count=F('count') + aggregate['count'],
+            total_seconds=F('total_seconds') + aggregate['total'],
+            max_seconds=Greatest(F('max_seconds'), aggregate['max']),
+            first_started_at=Least(F('first_started_at'), started_at),
+            last_ended_at=Greatest(F('last_ended_at'), ended_at)
+        )
+
+    if update():
+        return
+    try:
+        with transaction.atomic():
+            TraceStage.objects.create(
+                translation_id=translation_id, stage=stage, count=aggregate['count'],
+                total_seconds=aggregate['total'], max_seconds=aggregate['max'],
+                first_started_at=started_at, last_ended_at=ended_at
+            )
+    except IntegrityError:
+        # Created concurrently by another worker
+        update()
+
+
+def _buffer_key(translation_id: int) -> str:
+    return f"trace_stages:{translation_id}"
+
+
+def _buffer_stages(translation_id: int, stages: Dict[str, Dict]) -> bool:
+    """Accumulate chunk stage aggregates in Redis; False when there is no Redis cache to hold them"""
+    key = _buffer_key(translation_id)
+    client = get_cache_redis(key)
+    if client is None:
+        return False
+    args = [BUFFER_TTL_SECONDS]
+    for stage, aggregate in stages.items():
+        args += [stage, aggregate['count'], repr(aggregate['total']), repr(aggregate['max']),
+                 repr(aggregate['start']), repr(aggregate['end'])]
+    try:
+        client.register_script(_ACCUMULATE_SCRIPT)(keys=[key], args=args)
+    except redis.RedisError as e:
+        logger.warning(f"Could not buffer the trace of translation {translation_id}: {str(e)}")
+        return False
+    return True
+
+
+def _parse_buffer(fields: Dict[bytes, bytes]) -> Dict[str, Dict]:
+    stages = {}
+    for field, value in fields.items():
+        stage, _, name = field.decode().rpartition(':')
+        stages.setdefault(stage, {})[name] = int(value) if name == 'count' else float(value)
+    return stages
+
+
+def buffered_stages(translation_id: int) -> Dict[str, Dict]:
+    """Chunk stage aggregates accumulated in Redis and not flushed yet"""
+    key = _buffer_key(translation_id)
+    client = get_cache_redis(key)
+    if client is None:
+        return {}
+    try:
+        return _parse_buffer(client.hgetall(key))
+    except redis.RedisError as e:
+        logger.warning(f"Could not read the buffered trace of translation {translation_id}: {str(e)}")
+        return {}
+
+
+def flush_trace_stages(translation_id: int):
+    """Fold the chunk stage aggregates buffered in Redis into the TraceStage rows"""
+    if not settings.TRACING_ENABLED:
+        return
+    key = _buffer_key(translation_id)
+    client = get_cache_redis(key)
+    if client is None:
+        return
+    try:
+        pipe = client.pipeline()
+        pipe.hgetall(key)
+        pipe.delete(key)
+        fields, _ = pipe.execute()
+        for stage, aggregate in _parse_buffer(fields).items():
+            _add_to_stage(translation_id, stage, aggregate)
+    except Exception as e:
+        logger.warning(f"Could not flush the trace of translation {translation_id}: {str(e)}")
+
+
+@contextmanager
+def trace_translation(translation_ids: Union[int, List[int]], chunk_index: Optional[int] = None,
+                      keep_spans: Optional[bool] = None):
+    """
+    Trace the stages run in the block (see core.tracing.trace_stage) for one
+    or several translations and save them when the block ends. Spans of a
+    chunk are kept individually for one chunk in TRACE_CHUNK_SAMPLE_EVERY;
+    the stage aggregates always include them. Tracing errors are logged and
+    never fail the traced task.
+    """
+    if not settings.TRACING_ENABLED:
+        yield
+        return
+    if isinstance(translation_ids, int):
+        translation_ids = [translation_ids]
+    if keep_spans is None:
+        keep_spans = is_sampled_chunk(chunk_index)
+
+    with collect_spans() as spans:
+        try:
+            yield
+        finally:
+            try:
+                save_spans(translation_ids, spans, chunk_index=chunk_index, keep_spans=keep_spans)
+            except Exception as e:
+                logger.warning(f"Could not save the trace of translation(s) {translation_ids}: {str(e)}")
+
+
+def _offset(moment: datetime, origin: datetime) -> float:
+    return round((moment - origin).total_seconds(), 3)
+
+
+def critical_path(stages: Dict[str, Dict]) -> List[Dict]:
+    """
+    Split the wall time of a translation between the consecutive phases of its
+    pipeline. Each phase is charged from where the previous one ended to its
+    last span's end; the chunk translation phase is shared between its stages
+    in proportion to the time spent in each, as its chunks run in parallel.
+    """
+    path = []
+    cursor = 0.0
+    for phase, phase_stages in PHASES:
+        present = [stages[stage] for stage in phase_stages if stage in stages]
+        if not present:
+            continue
+        end = max(stage['end_offset'] for stage in present)
+        seconds = max(0.0, end - cursor)
+        cursor = max(cursor, end)
+        busy = sum(stage['total_seconds'] for stage in present) or 1.0
+        path.append({
+            'phase': phase,
+            'seconds': round(seconds, 3),
+            'stages': {
+                stage['stage']: round(seconds * stage['total_seconds'] / busy, 3)
+                for stage in present
+            },
+        })
+    return path
+
+
+def build_trace(translation: Translation, include_spans: bool = True) -> Dict:
+    """Timeline of a translation's stages and sampled spans (offsets in seconds from its creation) with its critical path"""
+    origin = translation.created_at
+    rows = {
+        row.stage: {
+            'count': row.count, 'total': row.total_seconds, 'max': row.max_seconds,
+            'start': row.first_started_at.timestamp(), 'end': row.last_ended_at.timestamp(),
+        }
+        for row in TraceStage.objects.filter(translation_id=translation.id)
+    }
+    # Chunk stages of a translation still running are partly in Redis
+    for stage, aggregate in buffered_stages(translation.id).items():
+        row = rows.get(stage)
+        if row is None:
+            rows[stage] = aggregate
+        else:
+            row.update(count=row['count'] + aggregate['count'], total=row['total'] + aggregate['total'],
+                       max=max(row['max'], aggregate['max']), start=min(row['start'], aggregate['start']),
+                       end=max(row['end'], aggregate['end']))
+    stages = {}
+    for stage, row in rows.items():
+        stages[stage] = {
+            'stage': stage,
+            'count': row['count'],
+            'total_seconds': round(row['total'], 3),
+            'mean_seconds': round(row['total'] / row['count'], 4) if row['count'] else 0.0,
+            'max_seconds': round(row['max'], 3),
+            'start_offset': _offset(_datetime(row['start']), origin),
+            'end_offset': _offset(_datetime(row['end']), origin),
+        }
+    order = {stage: position for position, stage in enumerate(STAGES)}
+    timeline = sorted(stages.values(), key=lambda stage: (order.get(stage['stage'], len(STAGES)), stage['start_offset']))
+
+    path = critical_path(stages)
+    wall_seconds = max((stage['end_offset'] for stage in timeline), default=0.0)
+    trace = {
+        'translation_id': translation.id,
+        'status': translation.status,
+        'created_at': origin,
+        'wall_seconds': wall_seconds,
+        'stages': timeline,
+        'critical_path': path,
+        'dominant_phase': max(path, key=lambda phase: phase['seconds'])['phase'] if path else None,
+    }
+    if include_spans:
+        trace['spans'] = [
+            {
+                'stage': span.stage,
+                'chunk_index': span.chunk_index,
+                'start_offset': _offset(span.started_at, origin),
+                'seconds': round(span.seconds, 4),
+                'worker': span.worker,
+            }
+            for span in TraceSpan.objects.filter(translation_id=translation.id).order_by('started_at')
+        ]
+    return trace